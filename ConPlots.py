@@ -35,3 +35,15 @@ Conf["PLOT_C1_RATE_STEP"] = 1
 Conf["PLOT_L1_RATE_STEP"] = 1
 Conf["PLOT_VTEC"] = 1
 Conf["PLOT_AATR_INDEX"] = 1
+
+# Number of processes rendering the plots (0: in the main process)
+Conf["PLOT_WORKERS"] = 0
+
+# Maximum number of days waiting to be plotted in background while
+# the next ones are processed (0: plots are generated synchronously)
+Conf["PLOT_QUEUE"] = 0
+
+# Time between refreshes of the visibility, number of satellites, VTEC
+# and AATR figures while a day is processed in the real-time modes [s]
+# (0: figures generated only when the day is completed)
+Conf["PLOT_LIVE"] = 0
@@ -0,0 +1,721 @@
+#!/usr/bin/env python
+
+########################################################################
+# PETRUS/SRC/Engine.py:
+# This is the Engine Module of PETRUS tool: real-time preprocessing of
+# many receivers in one process, with asyncio
+#
+#  Project:        PETRUS
+#  File:           Engine.py
+#  Date(YY/MM/DD): 01/02/21
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+# -----------------------------------------------------------------
+# Date       | Author             | Action
+# -----------------------------------------------------------------
+#
+########################################################################
+
+# Import External and Internal functions and Libraries
+#----------------------------------------------------------------------
+import sys
+import time
+import socket
+import asyncio
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+from InputOutput import buildObsFilter
+from InputOutput import initObsFilterStats
+from InputOutput import openPreproOutputs
+from InputOutput import generatePreproOutputs
+from InputOutput import flushPreproOutputs
+from InputOutput import tailObsEpochs
+from InputOutput import selectObsEpoch
+from InputOutput import ObsIdx
+from Preprocessing import runPreProcMeas
+from PreprocessingPlots import updateLivePlots
+from PreprocessingPlots import checkForkSafe
+from PreprocessingPlots import startPreproPlotPool
+from PreprocessingPlots import initPreproPlotWorker
+from Stream import STREAM_OPEN
+from Stream import STREAM_BAD
+from Stream import STREAM_END
+from Stream import STREAM_POLL
+from Stream import getStreamAddress
+from Stream import removeStreamAddress
+from Stream import isStreamIdle
+from Stream import initStreamStats
+from Stream import initStreamEpochs
+from Stream import addStreamItem
+from Stream import completeStreamEpochs
+from Stream import parseStreamLine
+from PetrusJobs import initPrevPreproObsInfo
+from PetrusJobs import getObsFile
+from PetrusJobs import initLatencyStats
+from PetrusJobs import updateLatencyStats
+from PetrusJobs import closeLiveDay
+from PetrusJobs import openLivePlots
+from PetrusJobs import ShedLevels
+from PetrusJobs import initShedStats
+from PetrusJobs import updateShedLevel
+from PetrusJobs import isShedEpochDropped
+from PetrusJobs import reportShedStats
+
+# Engine items
+#----------------------------------------------------------------------
+# End of the epochs of a receiver
+ENGINE_END = None
+
+def getEngineReceivers(Spec, RcvrInfo):
+
+    # Purpose: get the receivers processed by the engine
+
+    # Parameters
+    # ==========
+    # Spec: str
+    #       Comma separated list of RCVR (following its OBS files) or
+    #       RCVR@ADDRESS (receiving its OBS lines on ADDRESS, see
+    #       getStreamAddress), or ALL to follow the OBS files of every
+    #       receiver
+    # RcvrInfo: dict
+    #           Receivers information
+
+    # Returns
+    # =======
+    # EngineRcvrs: dict
+    #              Address per receiver (None to follow its OBS files),
+    #              None if a receiver is unknown or repeated
+
+    if Spec == "ALL":
+        return OrderedDict((Rcvr, None) for Rcvr in RcvrInfo.keys())
+
+    EngineRcvrs = OrderedDict({})
+    for Item in Spec.split(','):
+        Rcvr, Sep, Address = Item.partition('@')
+        if Rcvr not in RcvrInfo or Rcvr in EngineRcvrs or (Sep and not Address):
+            sys.stderr.write("ERROR: Wrong receiver in engine: %s\n" % Item)
+            return None
+
+        EngineRcvrs[Rcvr] = Address if Sep else None
+
+    return EngineRcvrs
+
+# End of getEngineReceivers()
+
+def initEngineReceiver(Conf, Rcvr, RcvrPos, Address):
+
+    # Purpose: initialize the state of a receiver processed by the
+    #          engine
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Address: str
+    #          Address of its OBS stream, None to follow its OBS files
+
+    # Returns
+    # =======
+    # Receiver: dict
+    #           Receiver state: queue of the epochs completed, OBS
+    #           reader filters, last connection identifier given, per
+    #           satellite Preprocessing state, outputs and live figures
+    #           of the day, lag statistics and load shedding state
+
+    Receiver = OrderedDict({})
+    Receiver["RCVR"] = Rcvr
+    Receiver["POS"] = RcvrPos
+    Receiver["ADDRESS"] = Address
+    Receiver["QUEUE"] = asyncio.Queue(maxsize=int(Conf["ENGINE_DEPTH"]))
+    Receiver["LOCK"] = asyncio.Lock()
+    Receiver["FILTER"] = buildObsFilter(Conf, RcvrPos)
+    Receiver["FILTERSTATS"] = initObsFilterStats()
+    Receiver["STREAMSTATS"] = initStreamStats()
+    Receiver["CONNID"] = 0
+    Receiver["PREV"] = None
+    Receiver["DAY"] = None
+    Receiver["SOD"] = None
+    Receiver["PREPROOUT"] = None
+    Receiver["LIVEPLOTS"] = None
+    Receiver["FAILED"] = False
+
+    # Lag of the epochs, from completed to written [s], over the day
+    # and since the previous report
+    Receiver["LATENCY"] = initLatencyStats()
+    Receiver["LAG"] = initLatencyStats()
+    Receiver["SHED"] = initShedStats(Rcvr)
+
+    # Satellites masked in the epochs dropped by the load shedding,
+    # flagged with the next epoch preprocessed
+    Receiver["MASKED"] = []
+
+    return Receiver
+
+# End of initEngineReceiver()
+
+async def putEngineEpoch(Receiver, EpochInfo):
+
+    # Function queuing an epoch completed with its arrival time. The
+    # satellites masked by the OBS reader travel with the epoch, and
+    # the source waits while the queue is full (back-pressure)
+
+    Item = (time.time(), EpochInfo, list(Receiver["FILTERSTATS"]["MASKED"]))
+    del Receiver["FILTERSTATS"]["MASKED"][:]
+
+    await Receiver["QUEUE"].put(Item)
+
+    # Let the other receivers run
+    await asyncio.sleep(0)
+
+async def runEngineTail(Scen, Conf, Receiver):
+
+    # Purpose: source of a receiver following its OBS files while they
+    #          are being written, from INI_DATE to END_DATE (see
+    #          tailObsEpochs)
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Receiver: dict
+    #           Receiver state (see initEngineReceiver)
+
+    # Returns
+    # =======
+    # Nothing
+
+    try:
+        for Jd in range(Conf["INI_DATE_JD"], Conf["END_DATE_JD"] + 1):
+            ObsFile = getObsFile(Scen, Receiver["RCVR"], Jd)[0]
+            NextObsFile = getObsFile(Scen, Receiver["RCVR"], Jd + 1)[0]
+
+            for EpochInfo in tailObsEpochs(ObsFile, NextObsFile, None, Conf["OBS_WINDOW"],
+                Receiver["FILTER"], Receiver["FILTERSTATS"]):
+                # Nothing new written yet
+                if EpochInfo is None:
+                    await asyncio.sleep(Conf["TAIL_POLL"])
+                    continue
+
+                await putEngineEpoch(Receiver, EpochInfo)
+
+    except Exception:
+        sys.stderr.write("ERROR: %s: Failed following the OBS files:\n%s" %
+        (Receiver["RCVR"], traceback.format_exc()))
+        Receiver["FAILED"] = True
+
+    await Receiver["QUEUE"].put(ENGINE_END)
+
+# End of runEngineTail()
+
+async def queueEngineStreamEpochs(Conf, Receiver, EpochsInfo):
+
+    # Function queuing the epochs completed from the stream of a
+    # receiver
+
+    for EpochInfo in EpochsInfo:
+        EpochInfo = selectObsEpoch(EpochInfo, Conf["OBS_WINDOW"], Receiver["FILTER"],
+            Receiver["FILTERSTATS"])
+        if len(EpochInfo) > 0:
+            Receiver["STREAMSTATS"]["EPOCHS"] = Receiver["STREAMSTATS"]["EPOCHS"] + 1
+            await putEngineEpoch(Receiver, EpochInfo)
+
+async def addEngineStreamItem(Conf, Receiver, Assembler, ConnId, Item):
+
+    # Function adding an item received from a connection to the epochs
+    # being assembled and queuing the epochs completed. The lock keeps
+    # the epochs in order when several connections complete them
+
+    async with Receiver["LOCK"]:
+        await queueEngineStreamEpochs(Conf, Receiver, addStreamItem(Assembler, ConnId, Item,
+            Receiver["STREAMSTATS"], Conf["STREAM_STALE"]))
+
+async def completeEngineStreamEpochs(Conf, Receiver, Assembler):
+
+    # Function queuing the epochs held back by connections silent for
+    # more than STREAM_STALE seconds
+
+    async with Receiver["LOCK"]:
+        await queueEngineStreamEpochs(Conf, Receiver, completeStreamEpochs(Assembler,
+            Conf["STREAM_STALE"]))
+
+async def runEngineConnection(Conf, Receiver, Assembler, Reader, Writer):
+
+    # Purpose: read the OBS lines of a connection to a receiver stream.
+    #          While the epochs queue is full the socket is not read,
+    #          so the sender is slowed down (back-pressure)
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # Receiver: dict
+    #           Receiver state (see initEngineReceiver)
+    # Assembler: dict
+    #            Epochs being assembled (see initStreamEpochs)
+    # Reader, Writer: StreamReader, StreamWriter
+    #                 Connection
+
+    # Returns
+    # =======
+    # Nothing
+
+    # Identifier given before any await, so that every connection gets
+    # its own
+    Receiver["CONNID"] = Receiver["CONNID"] + 1
+    ConnId = Receiver["CONNID"]
+    await addEngineStreamItem(Conf, Receiver, Assembler, ConnId, STREAM_OPEN)
+
+    NBad = 0
+    try:
+        while True:
+            Line = await Reader.readline()
+            if not Line:
+                break
+
+            # Incomplete line at the end of the connection
+            if not Line.endswith(b"\n"):
+                sys.stderr.write("WARNING: %s: Ignoring incomplete line of connection %d\n" %
+                (Receiver["RCVR"], ConnId))
+                break
+
+            LineSplit = parseStreamLine(Line)
+
+            # Skip blank and header lines
+            if LineSplit == []:
+                continue
+
+            # Malformed lines are dropped, and only counted
+            if LineSplit is None:
+                NBad = NBad + 1
+                if NBad == 1:
+                    sys.stderr.write("WARNING: %s: Dropping malformed lines of connection "\
+                        "%d, first: %r\n" % (Receiver["RCVR"], ConnId, Line[:80]))
+                LineSplit = STREAM_BAD
+
+            await addEngineStreamItem(Conf, Receiver, Assembler, ConnId, LineSplit)
+
+    except Exception as Error:
+        sys.stderr.write("WARNING: %s: Connection %d: %s\n" % (Receiver["RCVR"], ConnId, Error))
+
+    finally:
+        # Always added, or the connection would hold back all the epochs
+        Writer.close()
+        await addEngineStreamItem(Conf, Receiver, Assembler, ConnId, STREAM_END)
+
+# End of runEngineConnection()
+
+async def runEngineStream(Conf, Receiver):
+
+    # Purpose: source of a receiver receiving its OBS lines on its
+    #          address from one or more senders (see addStreamItem),
+    #          until they are disconnected for STREAM_IDLE seconds
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # Receiver: dict
+    #           Receiver state (see initEngineReceiver)
+
+    # Returns
+    # =======
+    # Nothing
+
+    Address = Receiver["ADDRESS"]
+    Assembler = initStreamEpochs()
+    Handler = lambda Reader, Writer: runEngineConnection(Conf, Receiver, Assembler,
+        Reader, Writer)
+
+    try:
+        Family, SockAddr = getStreamAddress(Address)
+        if Family == socket.AF_UNIX:
+            # Remove the socket file left by a previous run
+            removeStreamAddress(Address)
+            Server = await asyncio.start_unix_server(Handler, path=SockAddr)
+        else:
+            Server = await asyncio.start_server(Handler, SockAddr[0], SockAddr[1],
+                reuse_address=True)
+
+        # Display Message
+        print("INFO: %s: Listening for OBS streams on: %s..." % (Receiver["RCVR"], Address))
+        sys.stdout.flush()
+
+        try:
+            while not isStreamIdle(Assembler, Receiver["STREAMSTATS"], Conf["STREAM_IDLE"]):
+                await asyncio.sleep(STREAM_POLL)
+
+                # Epochs held back by silent connections
+                await completeEngineStreamEpochs(Conf, Receiver, Assembler)
+
+        finally:
+            Server.close()
+            removeStreamAddress(Address)
+
+    except Exception:
+        sys.stderr.write("ERROR: %s: Failed receiving the OBS stream on %s:\n%s" %
+        (Receiver["RCVR"], Address, traceback.format_exc()))
+        Receiver["FAILED"] = True
+
+    await Receiver["QUEUE"].put(ENGINE_END)
+
+# End of runEngineStream()
+
+def runEngineBatch(Conf, RcvrPos, Batch, PrevPreproObsInfo, Optional=True):
+
+    # Purpose: preprocess a batch of consecutive epochs of a receiver,
+    #          in the engine process or in a worker process
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Batch: list
+    #        [ObsInfo, MaskedSats] of the epochs
+    # PrevPreproObsInfo: dict
+    #                    Preprocessed observations for previous epoch
+    #                    per sat
+    # Optional: bool
+    #           Compute the VTEC Rate and iAATR (see runPreProcMeas)
+
+    # Returns
+    # =======
+    # PreproObsInfos: list
+    #                 Preprocessed observations of the epochs
+    # PrevPreproObsInfo: dict
+    #                    Preprocessed observations for previous epoch
+    #                    per sat, after the batch
+
+    PreproObsInfos = []
+    for ObsInfo, MaskedSats in Batch:
+        PreproObsInfos.append(runPreProcMeas(Conf, RcvrPos, ObsInfo, PrevPreproObsInfo,
+            MaskedSats, Optional))
+
+    return PreproObsInfos, PrevPreproObsInfo
+
+# End of runEngineBatch()
+
+def getEngineDay(Item):
+
+    # Function returning the [Year, Doy] of a queued epoch
+
+    return [int(Item[1][0][ObsIdx["YEAR"]]), int(Item[1][0][ObsIdx["DOY"]])]
+
+async def closeEngineDay(Conf, Receiver, Closer, PlotQueue):
+
+    # Function completing the outputs and plots of the day of a
+    # receiver (see closeLiveDay) in the closer thread, while the
+    # other receivers keep running. A single thread keeps the plots
+    # generated by pyplot one at a time
+
+    print("\n*** %s: Day of Year %03d completed ***" % (Receiver["RCVR"], Receiver["DAY"][1]))
+    sys.stdout.flush()
+
+    PreproOut = Receiver["PREPROOUT"]
+    Receiver["PREPROOUT"] = None
+    Receiver["LIVEPLOTS"] = None
+
+    await asyncio.get_running_loop().run_in_executor(Closer, closeLiveDay, Conf, PreproOut,
+        Receiver["PREV"], Receiver["LATENCY"], PlotQueue)
+    sys.stdout.flush()
+
+async def openEngineDay(Scen, Conf, Receiver, Day, Closer, PlotQueue):
+
+    # Function starting a new day of a receiver: the outputs of the
+    # previous day are completed, the outputs of the new day opened
+    # and the state reset unless it is carried over midnight
+
+    if Receiver["DAY"] is not None:
+        await closeEngineDay(Conf, Receiver, Closer, PlotQueue)
+
+    Receiver["DAY"] = Day
+
+    if Conf["PREPRO_OUT"] == 1:
+        Receiver["PREPROOUT"] = openPreproOutputs(Scen, Conf, Receiver["RCVR"], Day[0], Day[1])
+    Receiver["LIVEPLOTS"] = openLivePlots(Receiver["PREPROOUT"])
+
+    if Receiver["PREV"] is None or Conf["CONTINUOUS"] == 0:
+        Receiver["PREV"] = initPrevPreproObsInfo(Conf)
+
+    Receiver["LATENCY"] = initLatencyStats()
+
+async def runEngineReceiver(Scen, Conf, Receiver, Executor, Closer, PlotQueue):
+
+    # Purpose: preprocess the epochs of a receiver as they are queued
+    #          by its source, in batches of up to ENGINE_BATCH epochs
+    #          of the same day. The batches are offloaded to the
+    #          executor if any, while the other receivers keep running.
+    #          The load shedding level follows the lag of the oldest
+    #          epoch of every batch (see updateShedLevel)
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Receiver: dict
+    #           Receiver state (see initEngineReceiver)
+    # Executor: ProcessPoolExecutor
+    #           Worker processes, None to preprocess in the engine
+    # Closer: ThreadPoolExecutor
+    #         Thread completing the outputs and plots of the days
+    # PlotQueue: dict
+    #            Background plot process (see startPreproPlotQueue),
+    #            None to generate the plots at the end of every day
+
+    # Returns
+    # =======
+    # Nothing
+
+    Loop = asyncio.get_running_loop()
+    Queue = Receiver["QUEUE"]
+    Pending = None
+
+    while True:
+        if Pending is not None:
+            Item = Pending
+            Pending = None
+        else:
+            Item = await Queue.get()
+
+        if Item is ENGINE_END:
+            break
+
+        # After a failure the epochs are discarded, so that the source
+        # never blocks on the queue
+        if Receiver["FAILED"]:
+            continue
+
+        # Take the epochs already waiting, up to the end of the day
+        Batch = [Item]
+        Day = getEngineDay(Item)
+        while len(Batch) < Conf["ENGINE_BATCH"] and not Queue.empty():
+            Item = Queue.get_nowait()
+            if Item is ENGINE_END or getEngineDay(Item) != Day:
+                Pending = Item
+                break
+            Batch.append(Item)
+
+        try:
+            # New day
+            if Day != Receiver["DAY"]:
+                await openEngineDay(Scen, Conf, Receiver, Day, Closer, PlotQueue)
+
+            Level = updateShedLevel(Conf, Receiver["SHED"], time.time() - Batch[0][0])
+
+            # Epochs kept by the decimation
+            Kept = []
+            for Arrival, ObsInfo, MaskedSats in Batch:
+                Receiver["MASKED"].extend(MaskedSats)
+                if not isShedEpochDropped(Conf, Receiver["SHED"]):
+                    Kept.append((Arrival, ObsInfo, Receiver["MASKED"]))
+                    Receiver["MASKED"] = []
+            Batch = Kept
+
+            Epochs = [(ObsInfo, MaskedSats) for Arrival, ObsInfo, MaskedSats in Batch]
+            Optional = Level < ShedLevels["OPTIONAL"]
+            if len(Epochs) == 0:
+                PreproObsInfos = []
+            elif Executor is None:
+                PreproObsInfos, Receiver["PREV"] = runEngineBatch(Conf, Receiver["POS"],
+                    Epochs, Receiver["PREV"], Optional)
+            else:
+                PreproObsInfos, Receiver["PREV"] = await Loop.run_in_executor(Executor,
+                    runEngineBatch, Conf, Receiver["POS"], Epochs, Receiver["PREV"], Optional)
+
+            # Write the epochs straight away
+            if Receiver["PREPROOUT"] is not None and Level < ShedLevels["NOWRITE"]:
+                for PreproObsInfo in PreproObsInfos:
+                    generatePreproOutputs(Receiver["PREPROOUT"], PreproObsInfo)
+                if Level < ShedLevels["FLUSH"]:
+                    flushPreproOutputs(Receiver["PREPROOUT"])
+                    updateLivePlots(Receiver["LIVEPLOTS"])
+
+        except Exception:
+            sys.stderr.write("ERROR: %s: Failed preprocessing the epochs:\n%s" %
+            (Receiver["RCVR"], traceback.format_exc()))
+            Receiver["FAILED"] = True
+            continue
+
+        Now = time.time()
+        for Arrival, ObsInfo, MaskedSats in Batch:
+            updateLatencyStats(Receiver["LATENCY"], Now - Arrival)
+            updateLatencyStats(Receiver["LAG"], Now - Arrival)
+            Receiver["SOD"] = float(ObsInfo[0][ObsIdx["SOD"]])
+
+    # End of while True:
+
+    if Receiver["DAY"] is not None and not Receiver["FAILED"]:
+        await closeEngineDay(Conf, Receiver, Closer, PlotQueue)
+
+# End of runEngineReceiver()
+
+def reportEngineLag(Receivers):
+
+    # Function displaying the lag of every receiver since the previous
+    # report: epochs written, epochs queued and lag from completed to
+    # written
+
+    for Receiver in Receivers:
+        Lag = Receiver["LAG"]
+        Status = " FAILED" if Receiver["FAILED"] else ""
+
+        # Last epoch preprocessed, without SoD while all the epochs of
+        # the receiver have been dropped by the load shedding
+        Epoch = ""
+        if Receiver["DAY"] is not None:
+            Epoch = "DoY %03d" % Receiver["DAY"][1]
+        if Receiver["SOD"] is not None:
+            Epoch = Epoch + " SoD %d" % Receiver["SOD"]
+
+        if Receiver["DAY"] is None:
+            print("INFO: %s: waiting for epochs%s" % (Receiver["RCVR"], Status))
+
+        elif Lag["NEPOCHS"] > 0:
+            print("INFO: %s: %s: %d epochs, %d queued, lag mean %.1f ms, max %.1f ms%s" %
+            (Receiver["RCVR"], Epoch, Lag["NEPOCHS"], Receiver["QUEUE"].qsize(),
+            1000.0 * Lag["SUM"] / Lag["NEPOCHS"], 1000.0 * Lag["MAX"], Status))
+
+        else:
+            print("INFO: %s: %s: no new epochs, %d queued%s" %
+            (Receiver["RCVR"], Epoch, Receiver["QUEUE"].qsize(), Status))
+
+        Receiver["LAG"] = initLatencyStats()
+
+    sys.stdout.flush()
+
+async def runEngineReport(Conf, Receivers, Done):
+
+    # Function reporting the lag of the receivers every ENGINE_REPORT
+    # seconds until Done is set
+
+    while not Done.is_set():
+        try:
+            await asyncio.wait_for(Done.wait(), Conf["ENGINE_REPORT"])
+
+        except asyncio.TimeoutError:
+            reportEngineLag(Receivers)
+
+async def runEngine(Scen, Conf, RcvrInfo, EngineRcvrs, Executor, PlotQueue):
+
+    # Function running the source and the preprocessing of every
+    # receiver concurrently, with the lag reports
+
+    Receivers = [initEngineReceiver(Conf, Rcvr, RcvrInfo[Rcvr], Address) \
+        for Rcvr, Address in EngineRcvrs.items()]
+
+    # Outputs and plots of the days completed off the event loop
+    Closer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="PetrusCloser")
+
+    Tasks = []
+    for Receiver in Receivers:
+        if Receiver["ADDRESS"] is None:
+            Tasks.append(runEngineTail(Scen, Conf, Receiver))
+        else:
+            Tasks.append(runEngineStream(Conf, Receiver))
+        Tasks.append(runEngineReceiver(Scen, Conf, Receiver, Executor, Closer, PlotQueue))
+
+    Done = asyncio.Event()
+    Report = asyncio.ensure_future(runEngineReport(Conf, Receivers, Done))
+
+    try:
+        await asyncio.gather(*Tasks)
+
+    finally:
+        Done.set()
+        await Report
+        Closer.shutdown()
+
+    return Receivers
+
+def runPreproEngine(Scen, Conf, RcvrInfo, EngineRcvrs, PlotQueue=None):
+
+    # Purpose: real-time mode for many receivers in one process: the
+    #          OBS files being written or the OBS streams of every
+    #          receiver are followed concurrently with asyncio, each
+    #          receiver with its own per satellite state, and every
+    #          epoch is written to its PREPRO outputs as soon as it is
+    #          preprocessed. With ENGINE_WORKERS the batches of epochs
+    #          are preprocessed in worker processes
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # RcvrInfo: dict
+    #           Receivers information
+    # EngineRcvrs: dict
+    #              Address per receiver (see getEngineReceivers)
+    # PlotQueue: dict
+    #            Background plot process (see startPreproPlotQueue),
+    #            None to generate the plots at the end of every day
+
+    # Returns
+    # =======
+    # NFailed: int
+    #          Number of receivers that could not be processed
+
+    # Display Message
+    print("INFO: Running %d receivers in real time (%d worker processes)..." %
+    (len(EngineRcvrs), Conf["ENGINE_WORKERS"]))
+    sys.stdout.flush()
+
+    # Forked before the event loop and any other thread are started:
+    # the fork context starts all the workers on the first job
+    Executor = None
+    if Conf["ENGINE_WORKERS"] > 0:
+        checkForkSafe("Engine worker processes")
+        Executor = ProcessPoolExecutor(max_workers=int(Conf["ENGINE_WORKERS"]),
+            mp_context=get_context("fork"), initializer=initPreproPlotWorker,
+            initargs=(sys.argv,))
+        Executor.submit(int).result()
+
+    # Plot worker processes, if figures are generated in this process:
+    # the engine workers if any, as no other process can be forked once
+    # their threads are running
+    if PlotQueue is None:
+        startPreproPlotPool(Executor)
+
+    try:
+        Receivers = asyncio.run(runEngine(Scen, Conf, RcvrInfo, EngineRcvrs, Executor,
+            PlotQueue))
+
+    finally:
+        if Executor is not None:
+            Executor.shutdown()
+
+    # Display the final statistics
+    NFailed = 0
+    for Receiver in Receivers:
+        Stats = Receiver["STREAMSTATS"]
+        if Receiver["ADDRESS"] is not None:
+            print("INFO: %s: %d connections, %d lines, %d epochs, %d late, %d malformed" %
+            (Receiver["RCVR"], Stats["CONNECTIONS"], Stats["LINES"], Stats["EPOCHS"],
+            Stats["LATE"], Stats["BAD"]))
+        reportShedStats(Receiver["SHED"])
+
+        if Receiver["FAILED"]:
+            NFailed = NFailed + 1
+
+    return NFailed
+
+# End of runPreproEngine()
+
+########################################################################
+# End of Engine.py
+########################################################################
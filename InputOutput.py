@@ -20,7 +20,20 @@
 # Import External and Internal functions and Libraries
 #----------------------------------------------------------------------
 import sys, os
+import time
+import shutil
+import gzip, bz2, lzma
+import mmap
+import zlib
+import json
+from io import BytesIO
+from array import array
+from hashlib import sha1
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pandas import read_csv
+from pandas import DataFrame
 from COMMON.Dates import convertYearMonthDay2JulianDay
 from COMMON import GnssConstants as Const
 from COMMON.Coordinates import llh2xyz
@@ -33,6 +46,45 @@ VALUE = 1
 TH = 1
 CSNEPOCHS = 2
 
+# Compressed input files: extension and function to open them
+CompressedOpen = OrderedDict({})
+CompressedOpen[".gz"] = gzip.open
+CompressedOpen[".bz2"] = bz2.open
+CompressedOpen[".xz"] = lzma.open
+
+# Optional configuration parameters and their default values
+ConfDefaults = OrderedDict({})
+ConfDefaults["OBS_READER"] = "BULK"
+ConfDefaults["OBS_INDEX"] = 0
+ConfDefaults["OBS_WINDOW"] = [0, Const.S_IN_D]
+ConfDefaults["OBS_CACHE"] = 0
+ConfDefaults["OBS_CACHE_DIR"] = "CACHE"
+ConfDefaults["OBS_CACHE_SIZE"] = 4096
+ConfDefaults["OBS_SATS"] = "ALL"
+ConfDefaults["OBS_MASK_FILTER"] = 0
+ConfDefaults["OBS_COLUMNS"] = "ALL"
+ConfDefaults["PREPRO_FORMAT"] = "TXT"
+ConfDefaults["PREPRO_BIN_COMPRESS"] = "NONE"
+ConfDefaults["PREPRO_SEGMENTS"] = [0, 3600]
+ConfDefaults["PREPRO_BLOCK"] = 1
+ConfDefaults["PIPELINE"] = 0
+ConfDefaults["PIPELINE_DEPTH"] = [64, 64]
+ConfDefaults["CONTINUOUS"] = 0
+ConfDefaults["WARMUP_TIME"] = Const.S_IN_D
+ConfDefaults["CHECKPOINT"] = 0
+ConfDefaults["TAIL_POLL"] = 1
+ConfDefaults["STREAM_DEPTH"] = 1024
+ConfDefaults["STREAM_IDLE"] = 0
+ConfDefaults["STREAM_STALE"] = 60
+ConfDefaults["ENGINE_DEPTH"] = 64
+ConfDefaults["ENGINE_BATCH"] = 16
+ConfDefaults["ENGINE_WORKERS"] = 0
+ConfDefaults["ENGINE_REPORT"] = 10
+ConfDefaults["SHED_LAG"] = [0, 1, 5, 10, 30]
+ConfDefaults["SHED_DECIMATION"] = 2
+ConfDefaults["JOB_HEARTBEAT"] = 30
+ConfDefaults["JOB_TIMEOUT"] = 300
+
 # RCVR file columns
 RcvrIdx = OrderedDict({})
 RcvrIdx["ACR"]=0
@@ -61,6 +113,27 @@ ObsIdx["L2"]=10
 ObsIdx["S1"]=11
 ObsIdx["S2"]=12
 
+# OBS file columns types
+ObsType = OrderedDict({})
+ObsType["SOD"]=np.float64
+ObsType["DOY"]=np.int32
+ObsType["YEAR"]=np.int32
+ObsType["CONST"]=str
+ObsType["PRN"]=np.int32
+ObsType["ELEV"]=np.float64
+ObsType["AZIM"]=np.float64
+ObsType["C1"]=np.float64
+ObsType["L1"]=np.float64
+ObsType["P2"]=np.float64
+ObsType["L2"]=np.float64
+ObsType["S1"]=np.float64
+ObsType["S2"]=np.float64
+
+# OBS file columns always read, even if not in OBS_COLUMNS: those used
+# by the readers filters, the epochs assembly and the Preprocessing
+ObsFilterCols = ["SOD", "DOY", "YEAR", "CONST", "PRN", "ELEV", "AZIM", "C1", "L1",
+    "L2", "S1"]
+
 # Output interfaces
 #----------------------------------------------------------------------
 # PREPRO OBS 
@@ -73,6 +146,14 @@ PreproFmt = "%05d %03d %s %02d %8.3f %8.3f %4d %4d %4d "\
     "%15.3f %15.3f %15.3f %8.3f %10.3f %10.3f %10.3f %10.3f "\
     "%8.3f %8.3f %8.3f".split()
 
+# Whole line format, each field followed by a blank
+PreproLineFmt = " ".join(PreproFmt) + " \n"
+
+# Preprocessing info keys of the columns after SOD, DOY, CONST and PRN
+PreproInfoKeys = ["Elevation", "Azimuth", "ValidL1", "RejectionCause", "Status",
+    "C1", "SmoothC1", "L1Meters", "S1", "RangeRateL1", "RangeRateStepL1",
+    "PhaseRateL1", "PhaseRateStepL1", "GeomFree", "VtecRate", "iAATR"]
+
 # File columns
 PreproIdx = OrderedDict({})
 PreproIdx["SOD"]=0
@@ -96,6 +177,57 @@ PreproIdx["GEOM FREE"]=17
 PreproIdx["VTEC RATE"]=18
 PreproIdx["iAATR"]=19
 
+# Binary PREPRO OBS file
+# File identifier
+PreproBinMagic = b"PPROBIN1"
+
+# Column types
+PreproBinType = OrderedDict({})
+PreproBinType["SOD"] = "<i4"
+PreproBinType["DOY"] = "<i2"
+PreproBinType["CONST"] = "S1"
+PreproBinType["PRN"] = "<i1"
+PreproBinType["ELEV"] = "<f8"
+PreproBinType["AZIM"] = "<f8"
+PreproBinType["VALID"] = "<i1"
+PreproBinType["REJECT"] = "<i1"
+PreproBinType["STATUS"] = "<i1"
+PreproBinType["C1"] = "<f8"
+PreproBinType["C1SMOOTHED"] = "<f8"
+PreproBinType["L1"] = "<f8"
+PreproBinType["S1"] = "<f8"
+PreproBinType["CODE RATE"] = "<f8"
+PreproBinType["CODE ACC"] = "<f8"
+PreproBinType["PHASE RATE"] = "<f8"
+PreproBinType["PHASE ACC"] = "<f8"
+PreproBinType["GEOM FREE"] = "<f8"
+PreproBinType["VTEC RATE"] = "<f8"
+PreproBinType["iAATR"] = "<f8"
+
+# Compact column types, enough for plotting (code and phase
+# measurements keep double precision)
+PreproCompactType = OrderedDict({})
+PreproCompactType["SOD"] = "int32"
+PreproCompactType["DOY"] = "int16"
+PreproCompactType["CONST"] = "str"
+PreproCompactType["PRN"] = "int16"
+PreproCompactType["ELEV"] = "float32"
+PreproCompactType["AZIM"] = "float32"
+PreproCompactType["VALID"] = "int8"
+PreproCompactType["REJECT"] = "int8"
+PreproCompactType["STATUS"] = "int8"
+PreproCompactType["C1"] = "float64"
+PreproCompactType["C1SMOOTHED"] = "float64"
+PreproCompactType["L1"] = "float64"
+PreproCompactType["S1"] = "float32"
+PreproCompactType["CODE RATE"] = "float32"
+PreproCompactType["CODE ACC"] = "float32"
+PreproCompactType["PHASE RATE"] = "float32"
+PreproCompactType["PHASE ACC"] = "float32"
+PreproCompactType["GEOM FREE"] = "float32"
+PreproCompactType["VTEC RATE"] = "float32"
+PreproCompactType["iAATR"] = "float32"
+
 # Rejection causes flags
 REJECTION_CAUSE = OrderedDict({})
 REJECTION_CAUSE["NCHANNELS_GPS"]=1
@@ -400,6 +532,59 @@ def readConf(CfgFile):
                             # Increment number of read parameters
                             NReadParams = NReadParams + 1
 
+                        # Preprocessing outputs format
+                        #-----------------------------------------------
+                        # PREPRO_FORMAT: [TXT|BIN|BOTH|NONE]
+                        #   TXT: text file (.dat)
+                        #   BIN: binary columnar file (.bin)
+                        #   NONE: no file, results are only plotted
+                        # PREPRO_BIN_COMPRESS: binary columns to be
+                        #   compressed [NONE|ALL|list of columns, with
+                        #   blanks written as _ (e.g. CODE_RATE)]
+                        #-----------------------------------------------
+                        elif Key=='PREPRO_FORMAT':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [None], [None])
+
+                            # Check the format is known
+                            if Conf[Key] not in ["TXT", "BIN", "BOTH", "NONE"]:
+                                sys.stderr.write("ERROR: Unknown PREPRO_FORMAT %s\n" % Conf[Key])
+                                sys.exit(-1)
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # PREPRO_SEGMENTS: activation flag [0:off|1:on]
+                        #           and duration [s] of the segments in
+                        #           which the PREPRO OBS outputs are also
+                        #           written (SEGMENTS folder), multiple
+                        #           of 60
+                        elif Key=='PREPRO_SEGMENTS':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 2, 2, [0, 60], [1, 86400])
+
+                            if Conf[Key][1] % 60 != 0:
+                                sys.stderr.write("ERROR: Duration of configuration parameter %s "\
+                                "must be a multiple of 60\n" % Key)
+                                sys.exit(-1)
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key=='PREPRO_BIN_COMPRESS':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, len(PreproIdx), 
+                            [None] * len(PreproIdx), [None] * len(PreproIdx))
+
+                            # Check the columns are known
+                            if Conf[Key] not in ["NONE", "ALL"] and \
+                                any(Col.replace("_", " ") not in PreproIdx for Col in Fields[1:]):
+                                sys.stderr.write("ERROR: Unknown column in PREPRO_BIN_COMPRESS\n")
+                                sys.exit(-1)
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
                         # Corrected outputs selection [0:OFF|1:ON]
                         #--------------------------------------------------------------------       
                         elif Key=='CORR_OUT':
@@ -757,6 +942,340 @@ def readConf(CfgFile):
                             # Increment number of read parameters
                             NReadParams = NReadParams + 1
 
+                        # OBS file reader [LINE|BULK|MMAP]
+                        #-----------------------------------------------
+                        # LINE: read OBS file line by line
+                        # BULK: load whole OBS file in typed columns
+                        # MMAP: memory-map OBS file and parse it
+                        #       in blocks of epochs with numpy
+                        #-----------------------------------------------
+                        elif Key== 'OBS_READER':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [None], [None])
+
+                            # Check the reader is known
+                            if Conf[Key] not in ["LINE", "BULK", "MMAP"]:
+                                sys.stderr.write("ERROR: Unknown OBS_READER %s\n" % Conf[Key])
+                                sys.exit(-1)
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Use OBS epochs index file [0:OFF|1:ON]
+                        #-----------------------------------------------
+                        elif Key== 'OBS_INDEX':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [1])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # OBS time window to be processed
+                        #-----------------------------------------------
+                        # p1: First SoD [s]
+                        # p2: Last SoD [s]
+                        #-----------------------------------------------
+                        elif Key== 'OBS_WINDOW':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 2, 2, 
+                            [0, 0], [Const.S_IN_D, Const.S_IN_D])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Binary cache of parsed OBS files
+                        #-----------------------------------------------
+                        # OBS_CACHE: use the cache [0:OFF|1:ON]
+                        # OBS_CACHE_DIR: cache directory (relative
+                        #                paths are under SCEN_PATH)
+                        # OBS_CACHE_SIZE: maximum cache size [MB]
+                        #-----------------------------------------------
+                        elif Key== 'OBS_CACHE':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [1])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'OBS_CACHE_DIR':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [None], [None])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'OBS_CACHE_SIZE':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [1], [1e7])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # OBS reader filters
+                        #-----------------------------------------------
+                        # OBS_SATS: satellites to read [ALL|list of
+                        #           constellations (G) or sats (G01)]
+                        # OBS_MASK_FILTER: skip the satellites below the
+                        #           RCVR mask angle when reading [0|1]
+                        # OBS_COLUMNS: columns to read [ALL|list of
+                        #           columns], the others are set to 0.
+                        #           Only the columns not used by the
+                        #           Preprocessing (P2, S2) can be left
+                        #           out
+                        #-----------------------------------------------
+                        elif Key== 'OBS_SATS':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 64, 
+                            [None] * 64, [None] * 64)
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'OBS_MASK_FILTER':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [1])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'OBS_COLUMNS':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, len(ObsIdx), 
+                            [None] * len(ObsIdx), [None] * len(ObsIdx))
+
+                            # Check the columns are known
+                            if Conf[Key] != "ALL" and \
+                                any(Col not in ObsIdx for Col in Fields[1:]):
+                                sys.stderr.write("ERROR: Unknown column in OBS_COLUMNS\n")
+                                sys.exit(-1)
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Number of epochs written to PREPRO OBS file
+                        # at once
+                        #-----------------------------------------------
+                        elif Key== 'PREPRO_BLOCK':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [1], [100000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Pipelined processing of each OBS file
+                        #-----------------------------------------------
+                        # PIPELINE: read, preprocess and write in
+                        #           concurrent stages [0:OFF|1:ON]
+                        # PIPELINE_DEPTH: maximum number of epochs
+                        #           waiting between stages
+                        #   p1: read queue
+                        #   p2: write queue
+                        #-----------------------------------------------
+                        elif Key== 'PIPELINE':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [1])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'PIPELINE_DEPTH':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 2, 2, 
+                            [1, 1], [100000, 100000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Continuous results over consecutive days
+                        #-----------------------------------------------
+                        # CONTINUOUS: carry the per satellite state
+                        #           (Hatch filter, cycle slips...) over
+                        #           midnight [0:OFF|1:ON]
+                        # WARMUP_TIME: seconds at the end of the
+                        #           previous day replayed by parallel
+                        #           jobs (--jobs, --batch) to warm up
+                        #           the state of their day [s]. The
+                        #           results match the continuous run
+                        #           if it covers the last appearance
+                        #           of every satellite (whole day by
+                        #           default). Only the previous day is
+                        #           replayed: a satellite last seen
+                        #           before it starts the day as never
+                        #           seen, without the data gap flag
+                        #           of the continuous run
+                        #-----------------------------------------------
+                        elif Key== 'CONTINUOUS':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [1])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'WARMUP_TIME':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [Const.S_IN_D])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Checkpoint of the Preprocessing every
+                        # CHECKPOINT epochs [0:OFF], to be resumed
+                        # with Petrus.py --resume
+                        #-----------------------------------------------
+                        elif Key== 'CHECKPOINT':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [Const.S_IN_D])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Seconds between reads of a growing OBS file
+                        # in real-time mode (Petrus.py --tail)
+                        #-----------------------------------------------
+                        elif Key== 'TAIL_POLL':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0.001], [3600])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # OBS streams received over sockets in
+                        # real-time mode (Petrus.py --stream)
+                        #-----------------------------------------------
+                        # STREAM_DEPTH: maximum number of lines waiting
+                        #           to be assembled in epochs. Senders
+                        #           are slowed down when reached
+                        # STREAM_IDLE: seconds to wait for a new sender
+                        #           once all of them are disconnected
+                        #           before ending [0:forever]
+                        # STREAM_STALE: seconds a sender may be silent
+                        #           before its epochs are completed
+                        #           without it [0:until disconnected]
+                        #-----------------------------------------------
+                        elif Key== 'STREAM_DEPTH':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [1], [10000000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'STREAM_IDLE':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [864000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'STREAM_STALE':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [864000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Real-time engine of many receivers
+                        # (Petrus.py --engine, see Engine.py)
+                        #-----------------------------------------------
+                        # ENGINE_DEPTH: maximum number of epochs of a
+                        #           receiver waiting to be preprocessed.
+                        #           Its source is slowed down when reached
+                        # ENGINE_BATCH: maximum number of epochs of a
+                        #           receiver preprocessed at once
+                        # ENGINE_WORKERS: number of worker processes
+                        #           preprocessing the batches [0: in the
+                        #           engine process]
+                        # ENGINE_REPORT: seconds between the reports of
+                        #           the lag of every receiver
+                        #-----------------------------------------------
+                        elif Key== 'ENGINE_DEPTH':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [1], [1000000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'ENGINE_BATCH':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [1], [100000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'ENGINE_WORKERS':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0], [1024])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'ENGINE_REPORT':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [0.1], [86400])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Load shedding in real-time modes (--stream,
+                        # --engine) when the epochs pile up
+                        #-----------------------------------------------
+                        # SHED_LAG: activation flag [0:off|1:on] and
+                        #           lags [s] from completed to processed
+                        #           epoch entering each shedding level:
+                        #           1: outputs not flushed every epoch
+                        #           2: VTEC Rate and iAATR not computed
+                        #           3: epochs decimated
+                        #           4: epochs not written to outputs
+                        #           A level is left when the lag is below
+                        #           half its threshold
+                        # SHED_DECIMATION: one epoch of N is preprocessed
+                        #           from level 3. The dropped epochs are
+                        #           gaps to the Hatch filter and cycle
+                        #           slip detector, so N * SAMPLING_RATE
+                        #           should stay below HATCH_GAP_TH
+                        #-----------------------------------------------
+                        elif Key== 'SHED_LAG':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 5, 5,
+                            [0, 0, 0, 0, 0], [1, 86400, 86400, 86400, 86400])
+
+                            # The lags must increase with the level
+                            if sorted(Conf[Key][1:]) != Conf[Key][1:]:
+                                sys.stderr.write("ERROR: Lags of configuration parameter %s "\
+                                "must increase with the level\n" % Key)
+                                sys.exit(-1)
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'SHED_DECIMATION':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [2], [3600])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        # Batch mode job queue (see PetrusJobs.py)
+                        #-----------------------------------------------
+                        # JOB_HEARTBEAT: seconds between the heartbeats
+                        #           of a claimed job
+                        # JOB_TIMEOUT: seconds without heartbeat after
+                        #           which a claimed job is given back
+                        #           to the queue
+                        #-----------------------------------------------
+                        elif Key== 'JOB_HEARTBEAT':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [1], [86400])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
+                        elif Key== 'JOB_TIMEOUT':
+                            # Check parameter and load it in Conf
+                            Conf[Key] = checkConfParam(Key, Fields, 1, 1, [1], [864000])
+
+                            # Increment number of read parameters
+                            NReadParams = NReadParams + 1
+
                         else:
                             # Raise error
                             sys.stderr.write("ERROR: Incorrect conf file field " + Line)
@@ -789,6 +1308,11 @@ def processConf(Conf):
     #       Dictionary containing configuration with
     #       Julian Days
     
+    # Set default value of optional parameters not found in the conf
+    for Key, Value in ConfDefaults.items():
+        if Key not in Conf:
+            Conf[Key] = Value
+
     ConfCopy = Conf.copy()
     for Key in ConfCopy:
         Value = ConfCopy[Key]
@@ -807,6 +1331,58 @@ def processConf(Conf):
 
     return Conf
 
+def findInputFile(Path):
+    
+    # Purpose: find input file, either as given or compressed
+       
+    # Parameters
+    # ==========
+    # Path: str
+    #       Path to uncompressed input file
+
+    # Returns
+    # =======
+    # Path: str
+    #       Path to existing input file, with compression extension
+    #       if only the compressed file is found
+    
+    if not os.path.exists(Path):
+        for Ext in CompressedOpen:
+            if os.path.exists(Path + Ext):
+                return Path + Ext
+
+    return Path
+
+# End of findInputFile()
+
+def openInputFile(Path, Mode='r'):
+    
+    # Purpose: open input file, decompressing it on the fly if it
+    #          is gzip, bz2 or xz compressed
+       
+    # Parameters
+    # ==========
+    # Path: str
+    #       Path to input file
+    # Mode: str
+    #       'r' to read text, 'rb' to read bytes
+
+    # Returns
+    # =======
+    # f: File descriptor
+    #    Descriptor of input file
+    
+    Ext = os.path.splitext(Path)[1]
+    if Ext in CompressedOpen:
+        # Text mode needs to be explicit for compressed files
+        if 'b' not in Mode:
+            Mode = 'rt'
+        return CompressedOpen[Ext](Path, Mode)
+
+    return open(Path, Mode)
+
+# End of openInputFile()
+
 def readRcvr(RcvrFile):
     
     # Purpose: read the RCVR Positions file
@@ -825,7 +1401,7 @@ def readRcvr(RcvrFile):
     RcvrInfo = OrderedDict({})
 
     # Open the file
-    with open(RcvrFile, 'r') as f:
+    with openInputFile(RcvrFile) as f:
         # Read file
         Lines = f.readlines()
 
@@ -880,7 +1456,7 @@ def readRcvr(RcvrFile):
 
         # End of for Line in Lines:
 
-    # End of with open(RcvrFile, 'r') as f:
+    # End of with openInputFile(RcvrFile) as f:
 
     # Check receivers to process
     if len(RcvrInfo) > 0:
@@ -916,93 +1492,1537 @@ def splitLine(Line):
 # End of splitLine()
 
 
-def readObsEpoch(f):
+def readObsEpochs(f):
     
-    # Purpose: read one epoch of OBS file (all the LoS)
+    # Purpose: read OBS file epoch by epoch (all the LoS)
+    #          The first line of next epoch is kept instead of moving
+    #          the file pointer back, so f may be a compressed stream
        
     # Parameters
     # ==========
     # f: file descriptor
-    #         OBS file
+    #         OBS file, after its header line
 
     # Returns
     # =======
-    # EpochInfo: list
+    # EpochInfo: list (one per iteration)
     #            list of the split lines
     #            EpochInfo[1][1] is the second field of the 
     #            second line
     
-
     EpochInfo = []
-    
-    # Read one line
-    Line = f.readline()
-    if(not Line):
-        return []
-    LineSplit = splitLine(Line)
-    Sod = LineSplit[ObsIdx["SOD"]]
-    SodNext = Sod
+    Sod = None
 
-    while SodNext == Sod:
-        EpochInfo.append(LineSplit)
-        Pointer = f.tell()
-        Line = f.readline()
+    # Loop over lines
+    for Line in f:
         LineSplit = splitLine(Line)
-        try: 
-            SodNext = LineSplit[ObsIdx["SOD"]]
 
-        except:
-            return EpochInfo
+        # Skip blank lines
+        if len(LineSplit) == 0:
+            continue
 
-    f.seek(Pointer)
+        # When the SoD changes, the previous epoch is complete
+        if LineSplit[ObsIdx["SOD"]] != Sod and len(EpochInfo) > 0:
+            yield EpochInfo
+            EpochInfo = []
 
-    return EpochInfo
+        Sod = LineSplit[ObsIdx["SOD"]]
+        EpochInfo.append(LineSplit)
 
-# End of readObsEpoch()
+    # Last epoch
+    if len(EpochInfo) > 0:
+        yield EpochInfo
 
+# End of readObsEpochs()
 
-def createOutputFile(Path, Hdr):
+
+def readObsLineEpochs(ObsFile, SodWindow=None, ObsIndex=None, ObsFilter=None, FilterStats=None):
     
-    # Purpose: open output file and write its header
+    # Purpose: read OBS file epoch by epoch with readObsEpochs
        
     # Parameters
     # ==========
-    # Path: str
-    #       Path to file
-    # Hdr: str
-    #      File header
+    # ObsFile: str
+    #          Path to OBS file, possibly compressed
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to read (optional)
+    # ObsIndex: dict
+    #           OBS epochs index (see readObsIndex) used to go
+    #           straight to the window (optional)
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter) (optional)
+    # FilterStats: dict
+    #              OBS reader filters statistics, needed with ObsFilter
 
     # Returns
     # =======
-    # f: File descriptor
-    #    Descriptor of output file
+    # EpochInfo: list (one per iteration)
+    #            list of the split lines (see readObsEpochs)
     
-    # Display Message
-    print("INFO: Creating file: %s..." % Path)
+    # Open OBS file, decompressing it on the fly if needed
+    with openInputFile(ObsFile) as f:
+        # Read header line of OBS file
+        f.readline()
+
+        # If the index is available, go straight to the window. The
+        # compressed streams are read up to it instead, as seeking them
+        # means decompressing from the start every time
+        if SodWindow is not None and ObsIndex is not None and \
+            os.path.splitext(ObsFile)[1] not in CompressedOpen:
+            seekObsEpoch(f, ObsIndex, SodWindow[0])
+
+        # Loop over epochs
+        for EpochInfo in readObsEpochs(f):
+            # Skip the epochs outside the window
+            if SodWindow is not None:
+                Sod = float(EpochInfo[0][ObsIdx["SOD"]])
+                if Sod < SodWindow[0]:
+                    continue
+                if Sod > SodWindow[1]:
+                    break
+
+            # Apply the reader filters
+            if ObsFilter is not None:
+                EpochInfo = filterObsEpoch(EpochInfo, ObsFilter, FilterStats)
+                if len(EpochInfo) == 0:
+                    continue
+
+            yield EpochInfo
+
+# End of readObsLineEpochs()
+
+
+def selectObsEpoch(EpochInfo, SodWindow=None, ObsFilter=None, FilterStats=None):
+    
+    # Purpose: apply the time window and the OBS reader filters to one
+    #          epoch of split lines
+       
+    # Parameters
+    # ==========
+    # EpochInfo: list
+    #            list of the split lines (see readObsEpochs)
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to keep (optional)
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter) (optional)
+    # FilterStats: dict
+    #              OBS reader filters statistics, needed with ObsFilter
 
-    # Create output directory, if needed
-    if not os.path.exists(os.path.dirname(Path)):
-        os.makedirs(os.path.dirname(Path))
+    # Returns
+    # =======
+    # EpochInfo: list
+    #            list of the split lines selected, empty if none
+    
+    if SodWindow is not None:
+        Sod = float(EpochInfo[0][ObsIdx["SOD"]])
+        if Sod < SodWindow[0] or Sod > SodWindow[1]:
+            return []
 
-    # Open PREPRO OBS file
-    f = open(Path, 'w')
+    if ObsFilter is not None:
+        EpochInfo = filterObsEpoch(EpochInfo, ObsFilter, FilterStats)
+
+    return EpochInfo
+
+# End of selectObsEpoch()
+
+
+def tailObsEpochs(ObsFile, NextObsFile, Poll, SodWindow=None, ObsFilter=None, FilterStats=None):
+    
+    # Purpose: follow an OBS file while it is being written, yielding
+    #          every epoch as soon as it is complete, i.e. when the
+    #          first line of the next epoch is found. The last epoch is
+    #          complete when the OBS file of the next day appears. A
+    #          gzip, bz2 or xz compressed OBS file is not being written,
+    #          so it is read as a complete file
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file, waited for if it does not exist yet
+    # NextObsFile: str
+    #              Path to OBS file of the next day
+    # Poll: float
+    #       Seconds to wait when there are no new lines. If None, None
+    #       is yielded instead so that the caller can wait (asyncio)
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to read (optional)
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter) (optional)
+    # FilterStats: dict
+    #              OBS reader filters statistics, needed with ObsFilter
+
+    # Returns
+    # =======
+    # EpochInfo: list (one per iteration)
+    #            list of the split lines (see readObsEpochs), None
+    #            while waiting if Poll is None
+    
+    # Wait for the OBS file, unless the next day has already started
+    while not os.path.exists(ObsFile):
+        if os.path.exists(NextObsFile):
+            sys.stderr.write("WARNING: OBS file not found: %s\n" % ObsFile)
+            return
+        if Poll is None:
+            yield None
+        else:
+            time.sleep(Poll)
+
+    Complete = os.path.splitext(ObsFile)[1] in CompressedOpen
+
+    with openInputFile(ObsFile, 'rb') as f:
+        Header = True
+        Pending = b""
+        EpochInfo = []
+        Sod = None
+        Rollover = False
+
+        while True:
+            Line = f.readline()
+
+            # No new lines written yet
+            if not Line:
+                # Drained after the next day started, or end of a
+                # compressed file
+                if Rollover or Complete:
+                    break
+
+                # Read once more when the next day starts, as the last
+                # lines may have been written just before
+                Rollover = os.path.exists(NextObsFile)
+                if not Rollover:
+                    if Poll is None:
+                        yield None
+                    else:
+                        time.sleep(Poll)
+                continue
+
+            # Keep a partially written line until it is complete
+            Pending = Pending + Line
+            if not Pending.endswith(b"\n"):
+                continue
+
+            Line = Pending.decode()
+            Pending = b""
+            Rollover = False
+
+            # Header line of OBS file
+            if Header:
+                Header = False
+                continue
+
+            LineSplit = splitLine(Line)
+
+            # Skip blank lines
+            if len(LineSplit) == 0:
+                continue
+
+            # When the SoD changes, the previous epoch is complete
+            if LineSplit[ObsIdx["SOD"]] != Sod and len(EpochInfo) > 0:
+                EpochInfo = selectObsEpoch(EpochInfo, SodWindow, ObsFilter, FilterStats)
+                if len(EpochInfo) > 0:
+                    yield EpochInfo
+                EpochInfo = []
+
+            Sod = LineSplit[ObsIdx["SOD"]]
+            EpochInfo.append(LineSplit)
+
+        # End of while True:
+
+    if len(Pending) > 0:
+        sys.stderr.write("WARNING: Ignoring incomplete last line of %s\n" % ObsFile)
+
+    # Last epoch
+    if len(EpochInfo) > 0:
+        EpochInfo = selectObsEpoch(EpochInfo, SodWindow, ObsFilter, FilterStats)
+        if len(EpochInfo) > 0:
+            yield EpochInfo
+
+# End of tailObsEpochs()
+
+
+def mapObsFile(ObsFile):
+    
+    # Purpose: memory-map OBS file and locate its lines with numpy over
+    #          the mapped buffer, without splitting them into python
+    #          strings. The map must be closed with closeObsMap
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to uncompressed OBS file
+
+    # Returns
+    # =======
+    # ObsMap: dict
+    #         ObsMap["BUFFER"] is the mapped file
+    #         ObsMap["LINE_START"][i] is the byte offset of the i-th
+    #         line (header, blank and comment lines excluded) and its
+    #         last element is the size of the file
+    
+    ObsMap = OrderedDict({})
+
+    with open(ObsFile, 'rb') as f:
+        # An empty file cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            Buffer = b''
+        else:
+            Buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # View the mapped bytes as an array (no copy)
+    Bytes = np.frombuffer(Buffer, dtype=np.uint8)
+
+    # Find the line ends by chunks to bound the temporary memory
+    Chunk = 1 << 26
+    NewLines = np.concatenate([np.zeros(0, dtype=np.int64)] + \
+        [np.flatnonzero(Bytes[i:i + Chunk] == ord('\n')) + i \
+        for i in range(0, len(Bytes), Chunk)])
+
+    # Add the end of the last line if not terminated
+    if len(Bytes) > 0 and (len(NewLines) == 0 or NewLines[-1] != len(Bytes) - 1):
+        NewLines = np.append(NewLines, len(Bytes))
+
+    # Skip the header line
+    LineStart = NewLines[:-1] + 1
+    LineEnd = NewLines[1:]
+
+    # Locate the first field of every line, skipping leading blanks
+    FieldStart = LineStart.copy()
+    Active = np.flatnonzero(FieldStart < LineEnd)
+    while len(Active) > 0:
+        Blank = np.isin(Bytes[FieldStart[Active]], [ord(' '), ord('\t'), ord('\r')])
+        Active = Active[Blank]
+        FieldStart[Active] = FieldStart[Active] + 1
+        Active = Active[FieldStart[Active] < LineEnd[Active]]
+
+    # Remove blank and comment lines, as the parser does
+    Data = FieldStart < LineEnd
+    Data[Data] = Bytes[FieldStart[Data]] != ord('#')
+
+    ObsMap["BUFFER"] = Buffer
+    ObsMap["LINE_START"] = np.append(LineStart[Data], len(Bytes))
+
+    return ObsMap
+
+# End of mapObsFile()
+
+
+def closeObsMap(ObsMap):
+
+    # Function closing the memory map of a mapped OBS file
+
+    if isinstance(ObsMap["BUFFER"], mmap.mmap):
+        ObsMap["BUFFER"].close()
+
+
+# Type of the OBS lines parsed from a mapped OBS file
+ObsMapType = np.dtype([(Key, 'U4' if ObsType[Key] is str else ObsType[Key]) \
+    for Key in ObsIdx])
+
+# Number of lines parsed at once from a mapped OBS file
+OBS_MAP_BLOCK = 1 << 16
+
+def readObsMapLines(ObsMap, First, Last):
+    
+    # Purpose: parse some lines of a mapped OBS file into typed columns
+    #          with numpy, straight from the mapped bytes
+       
+    # Parameters
+    # ==========
+    # ObsMap: dict
+    #         Mapped OBS file (see mapObsFile)
+    # First, Last: int
+    #              First line and line after the last one to parse
+
+    # Returns
+    # =======
+    # ObsData: dict
+    #          OBS columns as numpy arrays, keyed as in ObsIdx (see
+    #          readObsFile), without EPOCH_OFFSET
+    
+    Ini = int(ObsMap["LINE_START"][First])
+    End = int(ObsMap["LINE_START"][Last])
+    Rows = np.loadtxt(BytesIO(ObsMap["BUFFER"][Ini:End]), dtype=ObsMapType, ndmin=1)
+
+    ObsData = OrderedDict({})
+    for Key in ObsIdx:
+        ObsData[Key] = Rows[Key]
+
+    return ObsData
+
+# End of readObsMapLines()
+
+
+def readObsMapEpochs(ObsFile, SodWindow=None, ObsFilter=None, FilterStats=None):
+    
+    # Purpose: read a memory-mapped OBS file epoch by epoch. The lines
+    #          are parsed in blocks of whole epochs into typed columns
+    
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to uncompressed OBS file
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to read (optional)
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter) (optional)
+    # FilterStats: dict
+    #              OBS reader filters statistics, needed with ObsFilter
+
+    # Returns
+    # =======
+    # EpochInfo: list (one per iteration)
+    #            list of typed rows laid out as in ObsIdx (see
+    #            iterObsEpochs)
+    
+    ObsMap = mapObsFile(ObsFile)
+    NLines = len(ObsMap["LINE_START"]) - 1
+
+    try:
+        First = 0
+        Block = OBS_MAP_BLOCK
+        while First < NLines:
+            Last = min(First + Block, NLines)
+            ObsData = readObsMapLines(ObsMap, First, Last)
+
+            # The last epoch of the block may go on in the next one:
+            # it is parsed again with it
+            if Last < NLines:
+                NewEpoch = np.flatnonzero(ObsData["SOD"][1:] != ObsData["SOD"][:-1])
+
+                # A single epoch in the block: parse a longer one
+                if len(NewEpoch) == 0:
+                    Block = 2 * Block
+                    continue
+
+                Last = First + NewEpoch[-1] + 1
+                ObsData = selectObsLines(ObsData, np.arange(len(ObsData["SOD"])) < Last - First)
+
+            First = Last
+
+            # Keep only the lines inside the window
+            if SodWindow is not None:
+                ObsData = selectObsWindow(ObsData, SodWindow)
+
+            # Apply the reader filters
+            if ObsFilter is not None:
+                ObsData = filterObsData(ObsData, ObsFilter, FilterStats)
+            else:
+                ObsData["EPOCH_OFFSET"] = computeObsEpochOffset(ObsData["SOD"])
+
+            for EpochInfo in iterObsEpochs(ObsData, FilterStats):
+                yield EpochInfo
+
+    finally:
+        closeObsMap(ObsMap)
+
+# End of readObsMapEpochs()
+
+
+def readObsFileEpochs(ObsFile, Conf, ObsIndex=None, CacheDir=None, ObsFilter=None, FilterStats=None):
+    
+    # Purpose: read the epochs of OBS file inside the configured
+    #          window with the configured reader (OBS_READER)
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file
+    # Conf: dict
+    #       Configuration dictionary
+    # ObsIndex: dict
+    #           OBS epochs index (see readObsIndex) (optional)
+    # CacheDir: str
+    #           Path to OBS cache directory, if OBS_CACHE is activated
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter) (optional)
+    # FilterStats: dict
+    #              OBS reader filters statistics, needed with ObsFilter
+
+    # Returns
+    # =======
+    # ObsEpochs: iterator
+    #            OBS epochs, each one being a list of lines or rows
+    #            laid out as in ObsIdx
+    
+    # Load the whole OBS file in typed columns
+    if Conf["OBS_READER"] == "BULK":
+        if Conf["OBS_CACHE"] == 1:
+            # Map the cached OBS file
+            ObsData = readObsFileCached(ObsFile, CacheDir,
+                Conf["OBS_CACHE_SIZE"], Conf["OBS_WINDOW"])
+
+        else:
+            ObsData = readObsFile(ObsFile, Conf["OBS_WINDOW"], ObsIndex,
+                ObsFilter["COLUMNS"] if ObsFilter is not None else None)
+
+        # Apply the reader filters
+        if ObsFilter is not None:
+            ObsData = filterObsData(ObsData, ObsFilter, FilterStats)
+
+        return iterObsEpochs(ObsData, FilterStats)
+
+    # Compressed files cannot be mapped and are read line by line
+    if Conf["OBS_READER"] == "MMAP" and \
+        os.path.splitext(ObsFile)[1] not in CompressedOpen:
+        return readObsMapEpochs(ObsFile, Conf["OBS_WINDOW"], ObsFilter, FilterStats)
+
+    return readObsLineEpochs(ObsFile, Conf["OBS_WINDOW"], ObsIndex, ObsFilter, FilterStats)
+
+# End of readObsFileEpochs()
+
+
+def readObsFile(ObsFile, SodWindow=None, ObsIndex=None, Columns=None):
+    
+    # Purpose: read a whole OBS file into typed column arrays
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to keep (optional)
+    # ObsIndex: dict
+    #           OBS epochs index (see readObsIndex) used to read only
+    #           the lines inside SodWindow (optional)
+    # Columns: list
+    #          Columns to parse, the others are filled with 0 (optional)
+
+    # Returns
+    # =======
+    # ObsData: dict
+    #          OBS columns as numpy arrays, keyed as in ObsIdx
+    #          ObsData["C1"][i] is the C1 of the i-th line
+    #          ObsData["EPOCH_OFFSET"][j] is the first line of the j-th
+    #          epoch and its last element is the number of lines
+    
+    # If the index is available, parse only the bytes of the epochs
+    # inside the window, up to the first line of the next epoch. The
+    # compressed files are parsed whole, as seeking them means
+    # decompressing from the start
+    if SodWindow is not None and ObsIndex is not None and \
+        os.path.splitext(ObsFile)[1] not in CompressedOpen:
+        First, Last = getObsIndexWindow(ObsIndex, SodWindow)
+        Window = b""
+        if Last > First:
+            with open(ObsFile, 'rb') as f:
+                f.seek(int(ObsIndex["OFFSET"][First]))
+                if Last < len(ObsIndex["OFFSET"]):
+                    Window = f.read(int(ObsIndex["OFFSET"][Last] - ObsIndex["OFFSET"][First]))
+                else:
+                    Window = f.read()
+
+        ObsFrame = read_csv(BytesIO(Window), sep=r'\s+', header=None, usecols=Columns,
+            names=list(ObsIdx.keys()), dtype=ObsType, float_precision='round_trip')
+
+    else:
+        # Parse the whole file at once (header line is skipped)
+        # Round-trip precision gives the same values as float()
+        ObsFrame = read_csv(ObsFile, sep=r'\s+', skiprows=1, header=None, usecols=Columns,
+            names=list(ObsIdx.keys()), dtype=ObsType, float_precision='round_trip')
+
+    # Store every column as a numpy array
+    ObsData = OrderedDict({})
+    for Key in ObsIdx:
+        if Key in ObsFrame:
+            ObsData[Key] = ObsFrame[Key].to_numpy(dtype=ObsType[Key])
+
+        else:
+            # Column not parsed
+            ObsData[Key] = np.zeros(len(ObsFrame), dtype=ObsType[Key])
+
+    # Keep only the lines inside the window
+    if SodWindow is not None:
+        ObsData = selectObsWindow(ObsData, SodWindow)
+
+    # Compute the offsets of the epochs
+    ObsData["EPOCH_OFFSET"] = computeObsEpochOffset(ObsData["SOD"])
+
+    return ObsData
+
+# End of readObsFile()
+
+
+def selectObsWindow(ObsData, SodWindow):
+    
+    # Purpose: keep only the OBS lines inside a time window
+       
+    # Parameters
+    # ==========
+    # ObsData: dict
+    #          OBS columns (see readObsFile)
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to keep
+
+    # Returns
+    # =======
+    # ObsData: dict
+    #          OBS columns inside the window, without EPOCH_OFFSET
+    
+    return selectObsLines(ObsData, (ObsData["SOD"] >= SodWindow[0]) & \
+        (ObsData["SOD"] <= SodWindow[1]))
+
+# End of selectObsWindow()
+
+
+def selectObsLines(ObsData, Keep):
+    
+    # Purpose: keep only some OBS lines
+       
+    # Parameters
+    # ==========
+    # ObsData: dict
+    #          OBS columns (see readObsFile)
+    # Keep: numpy array
+    #       True for the lines to keep
+
+    # Returns
+    # =======
+    # ObsData: dict
+    #          OBS columns of the kept lines, without EPOCH_OFFSET
+    
+    Inside = np.flatnonzero(Keep)
+
+    # Nothing to remove
+    if len(Inside) == len(ObsData["SOD"]):
+        Selection = slice(None)
+
+    # Contiguous lines: slice the columns to avoid copies
+    elif len(Inside) == 0 or Inside[-1] - Inside[0] + 1 == len(Inside):
+        Selection = slice(Inside[0], Inside[-1] + 1) if len(Inside) > 0 else slice(0, 0)
+
+    else:
+        Selection = Inside
+
+    WindowData = OrderedDict({})
+    for Key in ObsIdx:
+        WindowData[Key] = ObsData[Key][Selection]
+
+    return WindowData
+
+# End of selectObsLines()
+
+
+def computeObsEpochOffset(Sod):
+    
+    # Purpose: compute the offsets of the epochs, i.e. where the SoD changes
+       
+    # Parameters
+    # ==========
+    # Sod: numpy array
+    #      SoD column of OBS data
+
+    # Returns
+    # =======
+    # EpochOffset: numpy array
+    #              First line of every epoch, followed by the number of lines
+    
+    if len(Sod) == 0:
+        return np.zeros(1, dtype=np.int64)
+
+    NewEpoch = np.flatnonzero(Sod[1:] != Sod[:-1]) + 1
+
+    return np.concatenate(([0], NewEpoch, [len(Sod)])).astype(np.int64)
+
+# End of computeObsEpochOffset()
+
+
+def iterObsEpochs(ObsData, FilterStats=None):
+    
+    # Purpose: iterate over the epochs of OBS data loaded by readObsFile
+       
+    # Parameters
+    # ==========
+    # ObsData: dict
+    #          OBS columns as returned by readObsFile or filterObsData
+    # FilterStats: dict
+    #              Reader filters statistics (see initObsFilterStats),
+    #              updated with the satellites below the mask angle
+    #              removed up to each epoch (optional)
+
+    # Returns
+    # =======
+    # EpochInfo: list (one per iteration)
+    #            list of typed rows laid out as in ObsIdx
+    #            EpochInfo[1][1] is the second field of the 
+    #            second row
+    
+    Columns = [ObsData[Key] for Key in ObsIdx]
+    Offsets = ObsData["EPOCH_OFFSET"]
+
+    # Satellites removed below the mask angle, if any
+    MaskedSod = ObsData.get("MASKED_SOD")
+    MaskedSat = ObsData.get("MASKED_SAT")
+    MaskedElev = ObsData.get("MASKED_ELEV")
+    MaskedIdx = 0
+
+    # Loop over epochs
+    for Epoch in range(len(Offsets) - 1):
+        Ini = Offsets[Epoch]
+        End = Offsets[Epoch + 1]
+
+        # Report the satellites removed up to this epoch
+        if MaskedSod is not None and FilterStats is not None:
+            MaskedEnd = np.searchsorted(MaskedSod, ObsData["SOD"][Ini], 'right')
+            FilterStats["MASKED"].extend([list(Masked) for Masked in \
+                zip(MaskedSat[MaskedIdx:MaskedEnd].tolist(), MaskedElev[MaskedIdx:MaskedEnd].tolist())])
+            MaskedIdx = max(MaskedIdx, MaskedEnd)
+
+        # Build the rows with python types from the column slices
+        yield list(zip(*[Column[Ini:End].tolist() for Column in Columns]))
+
+    # Report the satellites removed after the last epoch, with the
+    # next epoch read (see readObsMapEpochs)
+    if MaskedSod is not None and FilterStats is not None:
+        FilterStats["MASKED"].extend([list(Masked) for Masked in \
+            zip(MaskedSat[MaskedIdx:].tolist(), MaskedElev[MaskedIdx:].tolist())])
+
+# End of iterObsEpochs()
+
+
+def buildObsFilter(Conf, Rcvr):
+    
+    # Purpose: build the OBS reader filters from the configuration
+       
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: list
+    #       Receiver information: position, masking angle...
+
+    # Returns
+    # =======
+    # ObsFilter: dict
+    #            ObsFilter["SATS"]: constellations and satellites to read
+    #            ObsFilter["MIN_ELEV"]: minimum elevation to read [deg]
+    #            ObsFilter["COLUMNS"]: columns to parse
+    #            Each of them is None if not filtered, and ObsFilter is
+    #            None if nothing is filtered
+    
+    ObsFilter = OrderedDict({})
+
+    # Satellites allow-list
+    ObsFilter["SATS"] = None
+    if Conf["OBS_SATS"] != "ALL":
+        if isinstance(Conf["OBS_SATS"], list):
+            ObsFilter["SATS"] = set(Conf["OBS_SATS"])
+        else:
+            ObsFilter["SATS"] = set([Conf["OBS_SATS"]])
+
+    # Minimum elevation: receiver mask angle
+    ObsFilter["MIN_ELEV"] = None
+    if Conf["OBS_MASK_FILTER"] == 1:
+        ObsFilter["MIN_ELEV"] = float(Rcvr[RcvrIdx["MASK"]])
+
+    # Columns projection
+    ObsFilter["COLUMNS"] = None
+    if Conf["OBS_COLUMNS"] != "ALL":
+        Columns = Conf["OBS_COLUMNS"]
+        if not isinstance(Columns, list):
+            Columns = [Columns]
+        ObsFilter["COLUMNS"] = [Key for Key in ObsIdx \
+            if Key in Columns or Key in ObsFilterCols]
+
+    # Nothing to filter
+    if all(Value is None for Value in ObsFilter.values()):
+        return None
+
+    return ObsFilter
+
+# End of buildObsFilter()
+
+
+def initObsFilterStats():
+    
+    # Purpose: initialize the OBS reader filters statistics
+       
+    # Parameters
+    # ==========
+    # None
+
+    # Returns
+    # =======
+    # FilterStats: dict
+    #              FilterStats["SATS"]: lines removed by satellite
+    #              FilterStats["MASK"]: lines removed below the mask angle
+    #              FilterStats["MASKED"]: satellites removed below the
+    #              mask angle, as [Sat, Elevation], to be consumed by
+    #              the preprocessing
+    
+    FilterStats = OrderedDict({})
+    FilterStats["SATS"] = 0
+    FilterStats["MASK"] = 0
+    FilterStats["MASKED"] = []
+
+    return FilterStats
+
+# End of initObsFilterStats()
+
+
+def filterObsEpoch(EpochInfo, ObsFilter, FilterStats):
+    
+    # Purpose: apply the OBS reader filters to one epoch of split lines,
+    #          before any of their fields is converted
+       
+    # Parameters
+    # ==========
+    # EpochInfo: list
+    #            list of the split lines (see readObsEpochs)
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter)
+    # FilterStats: dict
+    #              OBS reader filters statistics (see initObsFilterStats)
+
+    # Returns
+    # =======
+    # EpochInfo: list
+    #            list of the split lines passing the filters
+    
+    Sats = ObsFilter["SATS"]
+    MinElev = ObsFilter["MIN_ELEV"]
+    Columns = ObsFilter["COLUMNS"]
+
+    Filtered = []
+    for LineSplit in EpochInfo:
+        # Constellation and satellite allow-list
+        if Sats is not None:
+            Const = LineSplit[ObsIdx["CONST"]]
+            if Const not in Sats and \
+                Const + "%02d" % int(LineSplit[ObsIdx["PRN"]]) not in Sats:
+                FilterStats["SATS"] = FilterStats["SATS"] + 1
+                continue
+
+        # Mask angle
+        if MinElev is not None and float(LineSplit[ObsIdx["ELEV"]]) < MinElev:
+            FilterStats["MASK"] = FilterStats["MASK"] + 1
+            FilterStats["MASKED"].append([LineSplit[ObsIdx["CONST"]] + \
+                "%02d" % int(LineSplit[ObsIdx["PRN"]]),
+                float(LineSplit[ObsIdx["ELEV"]])])
+            continue
+
+        # Columns projection
+        if Columns is not None:
+            for Key in ObsIdx:
+                if Key not in Columns:
+                    LineSplit[ObsIdx[Key]] = 0.0
+
+        Filtered.append(LineSplit)
+
+    return Filtered
+
+# End of filterObsEpoch()
+
+
+def filterObsData(ObsData, ObsFilter, FilterStats):
+    
+    # Purpose: apply the OBS reader filters to OBS columns
+       
+    # Parameters
+    # ==========
+    # ObsData: dict
+    #          OBS columns (see readObsFile)
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter)
+    # FilterStats: dict
+    #              OBS reader filters statistics (see initObsFilterStats)
+
+    # Returns
+    # =======
+    # ObsData: dict
+    #          OBS columns passing the filters, plus MASKED_SOD,
+    #          MASKED_SAT and MASKED_ELEV with the lines removed below
+    #          the mask angle
+    
+    Keep = np.ones(len(ObsData["SOD"]), dtype=bool)
+
+    # Get the satellite labels only if needed
+    if ObsFilter["SATS"] is not None or ObsFilter["MIN_ELEV"] is not None:
+        SatLabels = np.char.add(ObsData["CONST"].astype(str),
+            np.char.zfill(ObsData["PRN"].astype(str), 2))
+
+    # Constellation and satellite allow-list
+    if ObsFilter["SATS"] is not None:
+        Sats = list(ObsFilter["SATS"])
+        Keep = np.isin(ObsData["CONST"].astype(str), Sats) | np.isin(SatLabels, Sats)
+        FilterStats["SATS"] = FilterStats["SATS"] + int(np.sum(~Keep))
+
+    # Mask angle
+    if ObsFilter["MIN_ELEV"] is not None:
+        Masked = Keep & (ObsData["ELEV"] < ObsFilter["MIN_ELEV"])
+        FilterStats["MASK"] = FilterStats["MASK"] + int(np.sum(Masked))
+        Keep = Keep & ~Masked
+
+    FilteredData = selectObsLines(ObsData, Keep)
+
+    # Columns projection
+    if ObsFilter["COLUMNS"] is not None:
+        for Key in ObsIdx:
+            if Key not in ObsFilter["COLUMNS"]:
+                FilteredData[Key] = np.zeros(len(FilteredData["SOD"]), dtype=ObsType[Key])
+
+    FilteredData["EPOCH_OFFSET"] = computeObsEpochOffset(FilteredData["SOD"])
+
+    # Keep track of the satellites removed below the mask angle
+    if ObsFilter["MIN_ELEV"] is not None:
+        FilteredData["MASKED_SOD"] = ObsData["SOD"][Masked]
+        FilteredData["MASKED_SAT"] = SatLabels[Masked]
+        FilteredData["MASKED_ELEV"] = ObsData["ELEV"][Masked]
+
+    return FilteredData
+
+# End of filterObsData()
+
+
+def buildObsIndex(ObsFile):
+    
+    # Purpose: scan OBS file and build the index of its epochs,
+    #          reporting malformed lines and out-of-order epochs
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file
+
+    # Returns
+    # =======
+    # ObsIndex: dict
+    #           ObsIndex["SOD"][j] is the SoD of the j-th epoch
+    #           ObsIndex["OFFSET"][j] is the byte offset of its first line
+    #           ObsIndex["NSATS"][j] is its number of lines (satellites)
+    #           ObsIndex["STAMP"] is the [size, mtime] of the OBS file
+    #           ObsIndex["ERRORS"] is the list of problems found
+    
+    Sods = []
+    Offsets = []
+    NSats = []
+    Errors = []
+
+    # Get the file stamp before reading it
+    Stat = os.stat(ObsFile)
+
+    # Offsets are computed in the uncompressed file
+    with openInputFile(ObsFile, 'rb') as f:
+        # Skip header line
+        Offset = len(f.readline())
+        NLine = 1
+
+        # Loop over lines
+        for Line in f:
+            NLine = NLine + 1
+            LineOffset = Offset
+            Offset = Offset + len(Line)
+            Fields = Line.split()
+
+            # Skip blank lines
+            if len(Fields) == 0:
+                continue
+
+            # Check the number of fields
+            if len(Fields) != len(ObsIdx):
+                Errors.append("line %d: %d fields found, %d expected" %
+                (NLine, len(Fields), len(ObsIdx)))
+                continue
+
+            # Check the SoD
+            try:
+                Sod = float(Fields[ObsIdx["SOD"]])
+
+            except ValueError:
+                Errors.append("line %d: wrong SOD %s" %
+                (NLine, Fields[ObsIdx["SOD"]].decode(errors='replace')))
+                continue
+
+            # Same epoch as previous line
+            if len(Sods) > 0 and Sod == Sods[-1]:
+                NSats[-1] = NSats[-1] + 1
+                continue
+
+            # New epoch: check it is after the previous one
+            if len(Sods) > 0 and Sod < Sods[-1]:
+                Errors.append("line %d: epoch %s out of order after %s" %
+                (NLine, Sod, Sods[-1]))
+
+            Sods.append(Sod)
+            Offsets.append(LineOffset)
+            NSats.append(1)
+
+        # End of for Line in f:
+
+    # End of with openInputFile(ObsFile, 'rb') as f:
+
+    ObsIndex = OrderedDict({})
+    ObsIndex["SOD"] = np.array(Sods, dtype=np.float64)
+    ObsIndex["OFFSET"] = np.array(Offsets, dtype=np.int64)
+    ObsIndex["NSATS"] = np.array(NSats, dtype=np.int32)
+    ObsIndex["STAMP"] = np.array([Stat.st_size, Stat.st_mtime_ns], dtype=np.int64)
+    ObsIndex["ERRORS"] = Errors
+
+    return ObsIndex
+
+# End of buildObsIndex()
+
+
+def readObsIndex(ObsFile):
+    
+    # Purpose: get the index of the epochs of OBS file from its
+    #          sidecar file <ObsFile>.idx, building it again if it
+    #          is missing or older than the OBS file
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file
+
+    # Returns
+    # =======
+    # ObsIndex: dict
+    #           OBS epochs index (see buildObsIndex)
+    
+    IdxFile = ObsFile + ".idx"
+    Stat = os.stat(ObsFile)
+
+    # Try to load the sidecar file
+    if os.path.exists(IdxFile):
+        try:
+            with np.load(IdxFile) as IdxData:
+                ObsIndex = OrderedDict({})
+                for Key in ["SOD", "OFFSET", "NSATS", "STAMP"]:
+                    ObsIndex[Key] = IdxData[Key]
+                ObsIndex["ERRORS"] = IdxData["ERRORS"].tolist()
+
+            # Check the index was built with the current OBS file
+            if ObsIndex["STAMP"][0] == Stat.st_size and \
+                ObsIndex["STAMP"][1] == Stat.st_mtime_ns:
+                return ObsIndex
+
+        except (OSError, ValueError, KeyError):
+            sys.stderr.write("WARNING: Ignoring corrupted index %s\n" % IdxFile)
+
+    # Build the index and store it next to the OBS file
+    ObsIndex = buildObsIndex(ObsFile)
+    try:
+        with open(IdxFile, 'wb') as f:
+            np.savez(f, SOD=ObsIndex["SOD"], OFFSET=ObsIndex["OFFSET"],
+            NSATS=ObsIndex["NSATS"], STAMP=ObsIndex["STAMP"],
+            ERRORS=np.array(ObsIndex["ERRORS"], dtype=str))
+
+    except OSError:
+        sys.stderr.write("WARNING: Cannot write index %s\n" % IdxFile)
+
+    return ObsIndex
+
+# End of readObsIndex()
+
+
+def getObsIndexWindow(ObsIndex, SodWindow):
+    
+    # Purpose: get the range of epochs of the index inside a time window
+       
+    # Parameters
+    # ==========
+    # ObsIndex: dict
+    #           OBS epochs index (see buildObsIndex)
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the window
+
+    # Returns
+    # =======
+    # First, Last: int
+    #              The epochs inside the window are ObsIndex[...][First:Last]
+    
+    Inside = np.flatnonzero((ObsIndex["SOD"] >= SodWindow[0]) & \
+        (ObsIndex["SOD"] <= SodWindow[1]))
+
+    if len(Inside) == 0:
+        return 0, 0
+
+    return Inside[0], Inside[-1] + 1
+
+# End of getObsIndexWindow()
+
+
+def seekObsEpoch(f, ObsIndex, Sod):
+    
+    # Purpose: move OBS file pointer to the first epoch at or after Sod,
+    #          so that readObsEpochs starts there
+       
+    # Parameters
+    # ==========
+    # f: file descriptor
+    #    OBS file
+    # ObsIndex: dict
+    #           OBS epochs index (see buildObsIndex)
+    # Sod: float
+    #      Second of day to seek
+
+    # Returns
+    # =======
+    # Found: bool
+    #        False if there is no epoch at or after Sod
+    
+    After = np.flatnonzero(ObsIndex["SOD"] >= Sod)
+
+    # No epoch found: go to the end of file
+    if len(After) == 0:
+        f.seek(0, os.SEEK_END)
+        return False
+
+    f.seek(int(ObsIndex["OFFSET"][After[0]]))
+
+    return True
+
+# End of seekObsEpoch()
+
+
+def getObsCacheDir(Scen, Conf):
+    
+    # Purpose: get the directory of the OBS binary cache
+       
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to SCENARIO
+    # Conf: dict
+    #       Configuration dictionary
+
+    # Returns
+    # =======
+    # CacheDir: str
+    #           Path to OBS cache directory
+    
+    CacheDir = str(Conf["OBS_CACHE_DIR"])
+    if not os.path.isabs(CacheDir):
+        CacheDir = os.path.join(Scen, CacheDir)
+
+    return CacheDir
+
+# End of getObsCacheDir()
+
+
+def getObsCacheEntry(ObsFile, CacheDir):
+    
+    # Purpose: get the cache entry of an OBS file, keyed by its
+    #          absolute path, size and mtime
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file
+    # CacheDir: str
+    #           Path to OBS cache directory
+
+    # Returns
+    # =======
+    # Entry: str
+    #        Path to the cache entry directory
+    
+    Stat = os.stat(ObsFile)
+    Key = "%s %d %d" % (os.path.abspath(ObsFile), Stat.st_size, Stat.st_mtime_ns)
+
+    return os.path.join(CacheDir, "%s_%s" % 
+    (os.path.basename(ObsFile), sha1(Key.encode()).hexdigest()[:16]))
+
+# End of getObsCacheEntry()
+
+
+def writeObsCache(ObsData, Entry):
+    
+    # Purpose: write OBS columns into a cache entry, one .npy per column
+       
+    # Parameters
+    # ==========
+    # ObsData: dict
+    #          OBS columns (see readObsFile)
+    # Entry: str
+    #        Path to the cache entry directory
+
+    # Returns
+    # =======
+    # Nothing
+    
+    # Write into a temporary directory and rename it when complete,
+    # so that concurrent readers never see half-written entries
+    TmpEntry = "%s.tmp%d" % (Entry, os.getpid())
+    os.makedirs(TmpEntry, exist_ok=True)
+
+    for Key in list(ObsIdx.keys()) + ["EPOCH_OFFSET"]:
+        np.save(os.path.join(TmpEntry, Key + ".npy"), ObsData[Key])
+
+    try:
+        os.rename(TmpEntry, Entry)
+
+    except OSError:
+        # Entry already written by another process
+        shutil.rmtree(TmpEntry, ignore_errors=True)
+
+# End of writeObsCache()
+
+
+def readObsCache(Entry):
+    
+    # Purpose: memory-map the OBS columns of a cache entry
+       
+    # Parameters
+    # ==========
+    # Entry: str
+    #        Path to the cache entry directory
+
+    # Returns
+    # =======
+    # ObsData: dict
+    #          OBS columns (see readObsFile)
+    
+    ObsData = OrderedDict({})
+    for Key in list(ObsIdx.keys()) + ["EPOCH_OFFSET"]:
+        ObsData[Key] = np.load(os.path.join(Entry, Key + ".npy"), mmap_mode='r')
+
+    # Update last use time for the LRU eviction
+    os.utime(Entry)
+
+    return ObsData
+
+# End of readObsCache()
+
+
+def evictObsCache(CacheDir, MaxSize, Keep=None):
+    
+    # Purpose: remove the least recently used cache entries until the
+    #          cache size is below the maximum
+       
+    # Parameters
+    # ==========
+    # CacheDir: str
+    #           Path to OBS cache directory
+    # MaxSize: float
+    #          Maximum cache size [MB]
+    # Keep: str
+    #       Path to a cache entry never to be removed (optional)
+
+    # Returns
+    # =======
+    # Nothing
+    
+    if not os.path.isdir(CacheDir):
+        return
+
+    # Get size and last use time of every complete entry
+    Entries = []
+    for Name in os.listdir(CacheDir):
+        Entry = os.path.join(CacheDir, Name)
+        if ".tmp" in Name or not os.path.isdir(Entry):
+            continue
+        Size = sum(os.path.getsize(os.path.join(Entry, f)) for f in os.listdir(Entry))
+        Entries.append([os.path.getmtime(Entry), Size, Entry])
+
+    # Remove oldest entries first
+    Entries.sort()
+    TotalSize = sum(Entry[1] for Entry in Entries)
+    while len(Entries) > 0 and TotalSize > MaxSize * 1024 * 1024:
+        Time, Size, Entry = Entries.pop(0)
+        if Entry == Keep:
+            continue
+        shutil.rmtree(Entry, ignore_errors=True)
+        TotalSize = TotalSize - Size
+
+# End of evictObsCache()
+
+
+def readObsFileCached(ObsFile, CacheDir, MaxSize, SodWindow=None):
+    
+    # Purpose: read OBS file through the binary cache: the parsed
+    #          columns are memory-mapped from the cache if available,
+    #          otherwise the text file is parsed and cached
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file
+    # CacheDir: str
+    #           Path to OBS cache directory
+    # MaxSize: float
+    #          Maximum cache size [MB]
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to keep (optional)
+
+    # Returns
+    # =======
+    # ObsData: dict
+    #          OBS columns (see readObsFile)
+    
+    Entry = getObsCacheEntry(ObsFile, CacheDir)
+
+    # Cache miss: parse the text file and store it
+    if not os.path.isdir(Entry):
+        writeObsCache(readObsFile(ObsFile), Entry)
+        evictObsCache(CacheDir, MaxSize, Entry)
+
+    ObsData = readObsCache(Entry)
+
+    # Keep only the lines inside the window
+    if SodWindow is not None and len(ObsData["SOD"]) > 0 and \
+        (ObsData["SOD"][0] < SodWindow[0] or ObsData["SOD"][-1] > SodWindow[1]):
+        ObsData = selectObsWindow(ObsData, SodWindow)
+        ObsData["EPOCH_OFFSET"] = computeObsEpochOffset(ObsData["SOD"])
+
+    return ObsData
+
+# End of readObsFileCached()
+
+
+def cacheObsFile(ObsFile, CacheDir):
+    
+    # Purpose: store OBS file in the binary cache if not already there
+       
+    # Parameters
+    # ==========
+    # ObsFile: str
+    #          Path to OBS file
+    # CacheDir: str
+    #           Path to OBS cache directory
+
+    # Returns
+    # =======
+    # Cached: bool
+    #         True if the file has been parsed and cached now
+    
+    Entry = getObsCacheEntry(ObsFile, CacheDir)
+    if os.path.isdir(Entry):
+        return False
+
+    writeObsCache(readObsFile(ObsFile), Entry)
+
+    return True
+
+# End of cacheObsFile()
+
+
+def warmObsCache(ObsFiles, CacheDir, MaxSize, NWorkers):
+    
+    # Purpose: store a list of OBS files in the binary cache,
+    #          using a pool of processes
+       
+    # Parameters
+    # ==========
+    # ObsFiles: list
+    #           Paths to OBS files
+    # CacheDir: str
+    #           Path to OBS cache directory
+    # MaxSize: float
+    #          Maximum cache size [MB]
+    # NWorkers: int
+    #           Number of processes
+
+    # Returns
+    # =======
+    # NCached: int
+    #          Number of OBS files parsed and cached
+    
+    os.makedirs(CacheDir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=NWorkers) as Pool:
+        Cached = list(Pool.map(cacheObsFile, ObsFiles, [CacheDir] * len(ObsFiles)))
+
+    evictObsCache(CacheDir, MaxSize)
+
+    return sum(Cached)
+
+# End of warmObsCache()
+
+
+def createOutputFile(Path, Hdr):
+    
+    # Purpose: open output file and write its header
+       
+    # Parameters
+    # ==========
+    # Path: str
+    #       Path to file
+    # Hdr: str
+    #      File header
+
+    # Returns
+    # =======
+    # f: File descriptor
+    #    Descriptor of output file
+    
+    # Display Message
+    print("INFO: Creating file: %s..." % Path)
+
+    # Create output directory, if needed
+    if not os.path.exists(os.path.dirname(Path)):
+        os.makedirs(os.path.dirname(Path))
+
+    # Open PREPRO OBS file
+    f = open(Path, 'w')
 
     # Write header
     f.write(Hdr)
 
-    return f
+    return f
+
+# End of createOutputFile()
+
+
+def formatPreproEpoch(PreproObsInfo):
+
+    # Purpose: format the PREPRO OBS lines of one epoch
+
+    # Parameters
+    # ==========
+    # PreproObsInfo: dict
+    #                Dictionary containing Preprocessing info for the 
+    #                current epoch
+
+    # Returns
+    # =======
+    # Lines: str
+    #        PREPRO OBS lines of the epoch
+
+    return "".join([PreproLineFmt % ((SatPreproObs["Sod"], SatPreproObs["Doy"],
+        SatLabel[0], int(SatLabel[1:])) + \
+            tuple([SatPreproObs[Key] for Key in PreproInfoKeys])) \
+                for SatLabel, SatPreproObs in PreproObsInfo.items()])
+
+# End of formatPreproEpoch()
+
+def formatPreproBlock(PreproData):
+
+    # Purpose: format a block of PREPRO OBS lines given in columns,
+    #          as numpy.savetxt would do with PreproFmt
+
+    # Parameters
+    # ==========
+    # PreproData: dict
+    #             PREPRO OBS columns (see PreproIdx), as arrays
+    #             or lists of the same length
+
+    # Returns
+    # =======
+    # Lines: str
+    #        PREPRO OBS lines
+
+    # Convert the columns to python types, as the format expects
+    Columns = [PreproData[Col].tolist() if hasattr(PreproData[Col], "tolist") \
+        else PreproData[Col] for Col in PreproIdx]
+
+    return "".join([PreproLineFmt % Row for Row in zip(*Columns)])
+
+# End of formatPreproBlock()
+
+def initPreproBuffer(Conf):
+
+    # Purpose: initialize the buffer of PREPRO OBS epochs waiting to
+    #          be written
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+
+    # Returns
+    # =======
+    # PreproBuffer: dict
+    #               Buffer of formatted epochs, written every
+    #               PREPRO_BLOCK epochs
+
+    PreproBuffer = OrderedDict({})
+    PreproBuffer["EPOCHS"] = []
+    PreproBuffer["BLOCK"] = Conf["PREPRO_BLOCK"]
+
+    return PreproBuffer
+
+# End of initPreproBuffer()
+
+def flushPreproFile(fpreprobs, PreproBuffer):
+
+    # Purpose: write the PREPRO OBS epochs waiting in the buffer
+
+    # Parameters
+    # ==========
+    # fpreprobs: file descriptor
+    #            Descriptor for PREPRO OBS output file
+    # PreproBuffer: dict
+    #               Buffer of formatted epochs (see initPreproBuffer)
+
+    # Returns
+    # =======
+    # Nothing
+
+    if len(PreproBuffer["EPOCHS"]) > 0:
+        fpreprobs.write("".join(PreproBuffer["EPOCHS"]))
+        del PreproBuffer["EPOCHS"][:]
+
+# End of flushPreproFile()
+
+def generatePreproFile(fpreprobs, PreproObsInfo, PreproBuffer=None):
+
+    # Purpose: generate output file with Preprocessing results
+
+    # Parameters
+    # ==========
+    # fpreprobs: file descriptor
+    #            Descriptor for PREPRO OBS output file
+    # PreproObsInfo: dict
+    #                Dictionary containing Preprocessing info for the 
+    #                current epoch
+    # PreproBuffer: dict
+    #               Buffer of formatted epochs (see initPreproBuffer).
+    #               If None, the epoch is written straight away,
+    #               otherwise call flushPreproFile before closing
+
+    # Returns
+    # =======
+    # Nothing
 
-# End of createOutputFile()
+    # Format the whole epoch
+    Lines = formatPreproEpoch(PreproObsInfo)
 
+    # Write it at once or when the block of epochs is complete
+    if PreproBuffer is None:
+        fpreprobs.write(Lines)
 
-def generatePreproFile(fpreprobs, PreproObsInfo):
+    else:
+        PreproBuffer["EPOCHS"].append(Lines)
+        if len(PreproBuffer["EPOCHS"]) >= PreproBuffer["BLOCK"]:
+            flushPreproFile(fpreprobs, PreproBuffer)
 
-    # Purpose: generate output file with Preprocessing results
+# End of generatePreproFile
+
+def createPreproTable():
+
+    # Purpose: create the in-memory table of Preprocessing results,
+    #          growing with every epoch
 
     # Parameters
     # ==========
-    # fpreprobs: file descriptor
-    #            Descriptor for PREPRO OBS output file
+    # None
+
+    # Returns
+    # =======
+    # PreproTable: dict
+    #              Satellite labels and one growable column per
+    #              numerical PREPRO OBS column
+
+    PreproTable = OrderedDict({})
+    PreproTable["LABELS"] = bytearray()
+    PreproTable["COLUMNS"] = OrderedDict({})
+    for Col in PreproIdx:
+        if Col not in ["CONST", "PRN"]:
+            PreproTable["COLUMNS"][Col] = array('d')
+
+    return PreproTable
+
+# End of createPreproTable()
+
+def appendPreproTable(PreproTable, PreproObsInfo):
+
+    # Purpose: add the Preprocessing results of one epoch to the
+    #          in-memory table
+
+    # Parameters
+    # ==========
+    # PreproTable: dict
+    #              In-memory table (see createPreproTable)
     # PreproObsInfo: dict
     #                Dictionary containing Preprocessing info for the 
     #                current epoch
@@ -1011,35 +3031,746 @@ def generatePreproFile(fpreprobs, PreproObsInfo):
     # =======
     # Nothing
 
-    # Loop over satellites
-    for SatLabel, SatPreproObs in PreproObsInfo.items():
-        # Prepare outputs
-        Outputs = OrderedDict({})
-        Outputs["SOD"] = SatPreproObs["Sod"]
-        Outputs["DOY"] = SatPreproObs["Doy"]
-        Outputs["CONST"] = SatLabel[0]
-        Outputs["PRN"] = int(SatLabel[1:])
-        Outputs["ELEV"] = SatPreproObs["Elevation"]
-        Outputs["AZIM"] = SatPreproObs["Azimuth"]
-        Outputs["VALID"] = SatPreproObs["ValidL1"]
-        Outputs["REJECT"] = SatPreproObs["RejectionCause"]
-        Outputs["STATUS"] = SatPreproObs["Status"]
-        Outputs["C1"] = SatPreproObs["C1"]
-        Outputs["C1SMOOTHED"] = SatPreproObs["SmoothC1"]
-        Outputs["L1"] = SatPreproObs["L1Meters"]
-        Outputs["S1"] = SatPreproObs["S1"]
-        Outputs["CODE RATE"] = SatPreproObs["RangeRateL1"]
-        Outputs["CODE ACC"] = SatPreproObs["RangeRateStepL1"]
-        Outputs["PHASE RATE"] = SatPreproObs["PhaseRateL1"]
-        Outputs["PHASE ACC"] = SatPreproObs["PhaseRateStepL1"]
-        Outputs["GEOM FREE"] = SatPreproObs["GeomFree"]
-        Outputs["VTEC RATE"] = SatPreproObs["VtecRate"]
-        Outputs["iAATR"] = SatPreproObs["iAATR"]
-
-        # Write line
-        for i, result in enumerate(Outputs):
-            fpreprobs.write(((PreproFmt[i] + " ") % Outputs[result]))
-
-        fpreprobs.write("\n")
+    SatsPreproObs = list(PreproObsInfo.values())
+    Columns = PreproTable["COLUMNS"]
 
-# End of generatePreproFile
+    # Satellite labels, as CONST and PRN
+    PreproTable["LABELS"].extend("".join(PreproObsInfo.keys()).encode())
+
+    Columns["SOD"].extend([SatPreproObs["Sod"] for SatPreproObs in SatsPreproObs])
+    Columns["DOY"].extend([SatPreproObs["Doy"] for SatPreproObs in SatsPreproObs])
+    for Col, Key in zip(list(PreproIdx.keys())[PreproIdx["ELEV"]:], PreproInfoKeys):
+        Columns[Col].extend([SatPreproObs[Key] for SatPreproObs in SatsPreproObs])
+
+# End of appendPreproTable()
+
+def getPreproTableData(PreproTable, First=0, Last=None):
+
+    # Purpose: get the typed PREPRO OBS columns of the in-memory table
+
+    # Parameters
+    # ==========
+    # PreproTable: dict
+    #              In-memory table (see createPreproTable)
+    # First, Last: int
+    #              Rows to get, [First, Last), all by default
+
+    # Returns
+    # =======
+    # PreproData: dict
+    #             PREPRO OBS columns as numpy arrays (see PreproBinType)
+
+    if Last is None:
+        Last = len(PreproTable["COLUMNS"]["SOD"])
+
+    # Split the satellite labels (G01) in CONST and PRN
+    Labels = np.frombuffer(bytes(PreproTable["LABELS"][3 * First:3 * Last]),
+        dtype="u1").reshape(-1, 3)
+    PreproData = OrderedDict({})
+    for Col, Type in PreproBinType.items():
+        if Col == "CONST":
+            PreproData[Col] = Labels[:, 0].view(Type)
+        elif Col == "PRN":
+            PreproData[Col] = ((Labels[:, 1] - 48) * 10 + (Labels[:, 2] - 48)).astype(Type)
+        else:
+            PreproData[Col] = np.frombuffer(PreproTable["COLUMNS"][Col],
+                dtype="f8")[First:Last].astype(Type)
+
+    return PreproData
+
+# End of getPreproTableData()
+
+def buildPreproFrame(PreproData, Columns=None):
+
+    # Purpose: build the DataFrame used by the plots from PREPRO OBS
+    #          columns
+
+    # Parameters
+    # ==========
+    # PreproData: dict
+    #             PREPRO OBS columns as numpy arrays
+    # Columns: list
+    #          Columns to keep (see PreproIdx), all if None
+
+    # Returns
+    # =======
+    # PreproObsData: DataFrame
+    #                PREPRO OBS columns, labeled by their PreproIdx
+
+    if Columns is None:
+        Columns = list(PreproIdx.keys())
+
+    Frame = OrderedDict({})
+    for Col in PreproIdx:
+        if Col in Columns:
+            Frame[PreproIdx[Col]] = PreproData[Col]
+            if Col == "CONST":
+                Frame[PreproIdx[Col]] = np.char.decode(PreproData[Col])
+
+    return DataFrame(Frame)
+
+# End of buildPreproFrame()
+
+def writePreproBinFile(Path, Rcvr, Year, Doy, PreproData, Compress="NONE"):
+
+    # Purpose: write the binary columnar PREPRO OBS file: identifier,
+    #          header length, JSON header with the schema, and one
+    #          block per column aligned to 8 bytes
+
+    # Parameters
+    # ==========
+    # Path: str
+    #       Path to file
+    # Rcvr: str
+    #       Receiver acronym
+    # Year: int
+    #       Year
+    # Doy: int
+    #      Day of Year
+    # PreproData: dict
+    #             PREPRO OBS columns as numpy arrays (see PreproBinType)
+    # Compress: str or list
+    #           Columns to be compressed [NONE|ALL|list of columns, with
+    #           blanks written as _]
+
+    # Returns
+    # =======
+    # Nothing
+
+    # Display Message
+    print("INFO: Creating file: %s..." % Path)
+
+    # Create output directory, if needed
+    if not os.path.exists(os.path.dirname(Path)):
+        os.makedirs(os.path.dirname(Path))
+
+    if Compress == "NONE":
+        Compress = []
+    elif Compress == "ALL":
+        Compress = list(PreproIdx.keys())
+    elif not isinstance(Compress, list):
+        Compress = [Compress]
+    Compress = [Col.replace("_", " ") for Col in Compress]
+
+    # Build the column blocks and the schema
+    Blocks = []
+    Schema = []
+    Offset = 0
+    for Col, Type in PreproBinType.items():
+        Block = np.ascontiguousarray(PreproData[Col], dtype=Type).tobytes()
+        Compression = "NONE"
+        if Col in Compress:
+            Block = zlib.compress(Block, 1)
+            Compression = "ZLIB"
+
+        Schema.append({"NAME": Col, "DTYPE": Type,
+            "COMPRESSION": Compression, "OFFSET": Offset, "NBYTES": len(Block)})
+        Pad = -len(Block) % 8
+        Blocks.append(Block + b"\0" * Pad)
+        Offset = Offset + len(Block) + Pad
+
+    Hdr = json.dumps({"RCVR": Rcvr, "YEAR": Year, "DOY": Doy,
+        "NROWS": len(PreproData["SOD"]), "COLUMNS": Schema}).encode()
+    Hdr = Hdr + b" " * (-(len(PreproBinMagic) + 4 + len(Hdr)) % 8)
+
+    # Write a temporary file and rename it, so that a partial file is
+    # never found
+    TmpPath = Path + ".tmp%d" % os.getpid()
+    with open(TmpPath, "wb") as f:
+        f.write(PreproBinMagic)
+        f.write(np.uint32(len(Hdr)).astype("<u4").tobytes())
+        f.write(Hdr)
+        for Block in Blocks:
+            f.write(Block)
+
+    os.replace(TmpPath, Path)
+
+# End of writePreproBinFile()
+
+def writePreproTxtFile(Path, PreproData):
+
+    # Function writing a whole text PREPRO OBS file from its columns
+    # (see getPreproTableData), under a temporary name renamed at once
+    # when complete, so that a partial file is never found
+
+    Columns = dict(PreproData)
+    Columns["CONST"] = Columns["CONST"].astype("U1")
+
+    TmpPath = Path + ".tmp%d" % os.getpid()
+    with open(TmpPath, 'w') as f:
+        f.write(PreproHdr)
+        f.write(formatPreproBlock(Columns))
+
+    os.replace(TmpPath, Path)
+
+def readPreproBinFile(PreproObsFile, Columns=None):
+
+    # Purpose: read the binary PREPRO OBS file. Uncompressed columns
+    #          are views of the memory-mapped file, not copies.
+
+    # Parameters
+    # ==========
+    # PreproObsFile: str
+    #                Path to binary PREPRO OBS file
+    # Columns: list
+    #          Columns to read (see PreproIdx), all if None
+
+    # Returns
+    # =======
+    # Hdr: dict
+    #      File header: RCVR, YEAR, DOY, NROWS and COLUMNS schema
+    # PreproData: dict
+    #             PREPRO OBS columns as numpy arrays
+
+    with open(PreproObsFile, "rb") as f:
+        # Empty files cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("%s: empty file" % PreproObsFile)
+
+        Map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if Map[:len(PreproBinMagic)] != PreproBinMagic:
+        raise ValueError("%s: not a binary PREPRO OBS file" % PreproObsFile)
+
+    HdrStart = len(PreproBinMagic) + 4
+    HdrLen = int(np.frombuffer(Map, dtype="<u4", count=1, offset=len(PreproBinMagic))[0])
+    Hdr = json.loads(Map[HdrStart:HdrStart + HdrLen].decode())
+    DataStart = HdrStart + HdrLen
+
+    PreproData = OrderedDict({})
+    for Column in Hdr["COLUMNS"]:
+        if Columns is not None and Column["NAME"] not in Columns:
+            continue
+
+        Start = DataStart + Column["OFFSET"]
+        if Column["COMPRESSION"] == "ZLIB":
+            PreproData[Column["NAME"]] = np.frombuffer(
+                zlib.decompress(Map[Start:Start + Column["NBYTES"]]), dtype=Column["DTYPE"])
+        else:
+            PreproData[Column["NAME"]] = np.frombuffer(Map, dtype=Column["DTYPE"],
+                count=Hdr["NROWS"], offset=Start)
+
+    return Hdr, PreproData
+
+# End of readPreproBinFile()
+
+def readPreproFile(PreproObsFile, Columns=None, Compact=False):
+
+    # Purpose: read PREPRO OBS file columns, from either the text (.dat)
+    #          or the binary (.bin) file
+
+    # Parameters
+    # ==========
+    # PreproObsFile: str
+    #                Path to PREPRO OBS file
+    # Columns: list
+    #          Columns to read (see PreproIdx), all if None
+    # Compact: bool
+    #          Use the compact column types (see PreproCompactType)
+
+    # Returns
+    # =======
+    # PreproObsData: DataFrame
+    #                PREPRO OBS columns, labeled by their PreproIdx
+
+    if Columns is None:
+        Columns = list(PreproIdx.keys())
+
+    # Binary file
+    if PreproObsFile.endswith(".bin"):
+        Hdr, PreproData = readPreproBinFile(PreproObsFile, Columns)
+        PreproObsData = buildPreproFrame(PreproData, Columns)
+
+        if Compact:
+            PreproObsData = PreproObsData.astype(dict([(PreproIdx[Col],
+                PreproCompactType[Col]) for Col in Columns if Col != "CONST"]))
+
+        return PreproObsData
+
+    # Text file, parsed straight into the compact types if requested
+    Type = None
+    if Compact:
+        Type = dict([(PreproIdx[Col], PreproCompactType[Col]) for Col in Columns])
+
+    return read_csv(PreproObsFile, sep=r'\s+', skiprows=1, header=None,
+        usecols=[PreproIdx[Col] for Col in Columns], dtype=Type)
+
+# End of readPreproFile()
+
+def getPreproOutputPath(Scen, Rcvr, Year, Doy):
+
+    # Function returning the path to the PREPRO OBS outputs of a
+    # receiver and day, without extension
+
+    return Scen + \
+        '/OUT/PPVE/' + "PREPRO_OBS_%s_Y%02dD%03d" % \
+            (Rcvr, Year % 100, Doy)
+
+def openPreproOutputs(Scen, Conf, Rcvr, Year, Doy, Checkpoint=None, Atomic=False):
+
+    # Purpose: create the PREPRO OBS outputs: the in-memory table of
+    #          results and the output files selected in the conf, or
+    #          reopen them as they were at a checkpoint
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # Year: int
+    #       Year
+    # Doy: int
+    #      Day of Year
+    # Checkpoint: dict
+    #             Output offsets saved by checkpointPreproOutputs, to
+    #             resume the outputs (optional)
+    # Atomic: bool
+    #         Write the text file at once when closing, from the
+    #         in-memory table, instead of epoch by epoch (batch jobs,
+    #         which another node may be processing again)
+
+    # Returns
+    # =======
+    # PreproOut: dict
+    #            PREPRO OBS outputs: in-memory table, text file
+    #            descriptor and buffer, binary file settings,
+    #            checkpoint journal and segments
+
+    PreproOut = OrderedDict({})
+    PreproOut["PATH"] = getPreproOutputPath(Scen, Rcvr, Year, Doy)
+    PreproOut["RCVR"] = Rcvr
+    PreproOut["YEAR"] = Year
+    PreproOut["DOY"] = Doy
+    PreproOut["TABLE"] = createPreproTable()
+    PreproOut["TXT"] = None
+    PreproOut["BUFFER"] = None
+    PreproOut["BIN"] = None
+    PreproOut["JOURNAL"] = None
+    PreproOut["NJOURNAL"] = 0
+    PreproOut["FORMAT"] = Conf["PREPRO_FORMAT"]
+    PreproOut["SEGMENTS"] = None
+    PreproOut["ATOMIC"] = Atomic
+
+    # Results of the table saved at the checkpoint
+    if Checkpoint is not None:
+        readPreproJournal(PreproOut, Checkpoint["NROWS"])
+
+    # Text file, written when closing if Atomic
+    if Conf["PREPRO_FORMAT"] in ["TXT", "BOTH"] and not Atomic:
+        if Checkpoint is None:
+            PreproOut["TXT"] = createOutputFile(PreproOut["PATH"] + ".dat", PreproHdr)
+
+        elif Checkpoint["TXT"] is None:
+            # Checkpoint taken without text file: written again from
+            # the results of the table
+            PreproOut["TXT"] = createOutputFile(PreproOut["PATH"] + ".dat", PreproHdr)
+            PreproData = getPreproTableData(PreproOut["TABLE"])
+            PreproData["CONST"] = PreproData["CONST"].astype("U1")
+            PreproOut["TXT"].write(formatPreproBlock(PreproData))
+
+        else:
+            # Display Message
+            print("INFO: Resuming file: %s..." % (PreproOut["PATH"] + ".dat"))
+
+            # Drop the lines written after the checkpoint
+            PreproOut["TXT"] = open(PreproOut["PATH"] + ".dat", 'r+')
+            PreproOut["TXT"].truncate(Checkpoint["TXT"])
+            PreproOut["TXT"].seek(Checkpoint["TXT"])
+
+        PreproOut["BUFFER"] = initPreproBuffer(Conf)
+
+    # Binary file, written from the table when closing
+    if Conf["PREPRO_FORMAT"] in ["BIN", "BOTH"]:
+        PreproOut["BIN"] = Conf["PREPRO_BIN_COMPRESS"]
+
+    # Segments of the day, if requested
+    if int(Conf["PREPRO_SEGMENTS"][0]) == 1 and Conf["PREPRO_FORMAT"] != "NONE":
+        openPreproSegments(PreproOut, int(Conf["PREPRO_SEGMENTS"][1]))
+
+    return PreproOut
+
+# End of openPreproOutputs()
+
+# PREPRO OBS segments
+#----------------------------------------------------------------------
+# The results of a day are also written in segments of fixed duration
+# (PREPRO_SEGMENTS), so that they can be read before the day is over.
+# The segments of OUT/PPVE/PREPRO_OBS_<RCVR>_YyyDddd.dat are found in
+# OUT/PPVE/SEGMENTS/PREPRO_OBS_<RCVR>_YyyDddd/, named after their start
+# time (_HHMM), in the formats of PREPRO_FORMAT. A segment is written
+# when the first epoch after it is generated (or the day is closed),
+# under a temporary name renamed at once when complete. MANIFEST.json
+# is then replaced, listing the segments completed:
+#   {"RCVR", "YEAR", "DOY", "DURATION", "COMPLETE": day closed,
+#    "SEGMENTS": [{"START", "END", "FIRST_SOD", "LAST_SOD", "NROWS",
+#                  "FILES"}, ...]}
+
+def getPreproSegmentsDir(PreproObsPath):
+
+    # Function returning the folder of the segments of a PREPRO OBS
+    # output path (see getPreproOutputPath)
+
+    return os.path.dirname(PreproObsPath) + '/SEGMENTS/' + os.path.basename(PreproObsPath)
+
+def openPreproSegments(PreproOut, Duration):
+
+    # Purpose: start writing the PREPRO OBS outputs in segments. When
+    #          the outputs are resumed, the segments already completed
+    #          before the rows of the table are kept
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs), updated
+    # Duration: int
+    #           Duration of the segments [s]
+
+    # Returns
+    # =======
+    # Nothing
+
+    Segments = OrderedDict({})
+    Segments["DIR"] = getPreproSegmentsDir(PreproOut["PATH"])
+    Segments["DURATION"] = Duration
+
+    # First row and start time of the segment being generated
+    Sod = PreproOut["TABLE"]["COLUMNS"]["SOD"]
+    Segments["ROW"] = 0
+    Segments["START"] = None
+    if len(Sod) > 0:
+        Segments["START"] = int(Sod[-1] // Duration) * Duration
+        while Segments["ROW"] < len(Sod) and Sod[Segments["ROW"]] < Segments["START"]:
+            Segments["ROW"] = Segments["ROW"] + 1
+
+    Manifest = None
+    if len(Sod) > 0:
+        Manifest = readJsonFile(Segments["DIR"] + '/MANIFEST.json')
+
+    if Manifest is None or Manifest["DURATION"] != Duration:
+        Manifest = OrderedDict({})
+        Manifest["RCVR"] = PreproOut["RCVR"]
+        Manifest["YEAR"] = PreproOut["YEAR"]
+        Manifest["DOY"] = PreproOut["DOY"]
+        Manifest["DURATION"] = Duration
+        Manifest["SEGMENTS"] = []
+
+    # The segments after the rows resumed are generated again
+    Manifest["COMPLETE"] = False
+    Manifest["SEGMENTS"] = [Segment for Segment in Manifest["SEGMENTS"] \
+        if Segments["START"] is not None and Segment["END"] <= Segments["START"]]
+    Segments["MANIFEST"] = Manifest
+
+    os.makedirs(Segments["DIR"], exist_ok=True)
+    writeJsonFile(Segments["DIR"] + '/MANIFEST.json', Manifest)
+
+    PreproOut["SEGMENTS"] = Segments
+
+# End of openPreproSegments()
+
+def writePreproSegment(PreproOut, Complete=False):
+
+    # Purpose: write the segment being generated from the rows of the
+    #          in-memory table, and record it in the manifest
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs), updated
+    # Complete: bool
+    #           The day is closed, no more segments will follow
+
+    # Returns
+    # =======
+    # Nothing
+
+    Segments = PreproOut["SEGMENTS"]
+    Manifest = Segments["MANIFEST"]
+    NRows = len(PreproOut["TABLE"]["COLUMNS"]["SOD"])
+
+    if Segments["START"] is not None and NRows > Segments["ROW"]:
+        PreproData = getPreproTableData(PreproOut["TABLE"], Segments["ROW"], NRows)
+        Start = Segments["START"]
+        Path = Segments["DIR"] + '/' + os.path.basename(PreproOut["PATH"]) + \
+            "_%02d%02d" % (Start // 3600, (Start % 3600) // 60)
+
+        Files = []
+        if PreproOut["FORMAT"] in ["TXT", "BOTH"]:
+            writePreproTxtFile(Path + ".dat", PreproData)
+            Files.append(os.path.basename(Path) + ".dat")
+
+        if PreproOut["FORMAT"] in ["BIN", "BOTH"]:
+            writePreproBinFile(Path + ".bin", PreproOut["RCVR"], PreproOut["YEAR"],
+                PreproOut["DOY"], PreproData, PreproOut["BIN"])
+            Files.append(os.path.basename(Path) + ".bin")
+
+        Segment = OrderedDict({})
+        Segment["START"] = Start
+        Segment["END"] = Start + Segments["DURATION"]
+        Segment["FIRST_SOD"] = int(PreproData["SOD"][0])
+        Segment["LAST_SOD"] = int(PreproData["SOD"][-1])
+        Segment["NROWS"] = NRows - Segments["ROW"]
+        Segment["FILES"] = Files
+        Manifest["SEGMENTS"].append(Segment)
+
+        Segments["ROW"] = NRows
+
+    Manifest["COMPLETE"] = Complete
+    writeJsonFile(Segments["DIR"] + '/MANIFEST.json', Manifest)
+
+# End of writePreproSegment()
+
+def rotatePreproSegments(PreproOut, PreproObsInfo):
+
+    # Function writing the segment being generated when the epoch to
+    # be added starts a new one
+
+    Segments = PreproOut["SEGMENTS"]
+    if len(PreproObsInfo) == 0:
+        return
+
+    Sod = next(iter(PreproObsInfo.values()))["Sod"]
+    Start = int(Sod // Segments["DURATION"]) * Segments["DURATION"]
+    if Start != Segments["START"]:
+        writePreproSegment(PreproOut)
+        Segments["START"] = Start
+
+def generatePreproOutputs(PreproOut, PreproObsInfo):
+
+    # Purpose: add the Preprocessing results of one epoch to the
+    #          PREPRO OBS outputs
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs)
+    # PreproObsInfo: dict
+    #                Dictionary containing Preprocessing info for the 
+    #                current epoch
+
+    # Returns
+    # =======
+    # Nothing
+
+    if PreproOut["SEGMENTS"] is not None:
+        rotatePreproSegments(PreproOut, PreproObsInfo)
+
+    appendPreproTable(PreproOut["TABLE"], PreproObsInfo)
+
+    if PreproOut["TXT"] is not None:
+        generatePreproFile(PreproOut["TXT"], PreproObsInfo, PreproOut["BUFFER"])
+
+# End of generatePreproOutputs()
+
+def closePreproOutputs(PreproOut):
+
+    # Purpose: write the pending results and close the PREPRO OBS
+    #          output files
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs)
+
+    # Returns
+    # =======
+    # PreproObsFile: str
+    #                Path to the PREPRO OBS file, used to name the
+    #                figures (it may not be written, see PREPRO_FORMAT)
+    # PreproObsData: DataFrame
+    #                PREPRO OBS results of the in-memory table, to be
+    #                plotted without reading the file back
+
+    PreproObsFile = PreproOut["PATH"] + ".dat"
+    PreproData = getPreproTableData(PreproOut["TABLE"])
+
+    if PreproOut["TXT"] is not None:
+        flushPreproFile(PreproOut["TXT"], PreproOut["BUFFER"])
+        PreproOut["TXT"].close()
+
+    elif PreproOut["ATOMIC"] and PreproOut["FORMAT"] in ["TXT", "BOTH"]:
+        writePreproTxtFile(PreproObsFile, PreproData)
+
+    if PreproOut["BIN"] is not None:
+        PreproObsFile = PreproOut["PATH"] + ".bin"
+        writePreproBinFile(PreproObsFile, PreproOut["RCVR"], PreproOut["YEAR"],
+            PreproOut["DOY"], PreproData, PreproOut["BIN"])
+
+    # Last segment of the day
+    if PreproOut["SEGMENTS"] is not None:
+        writePreproSegment(PreproOut, True)
+
+    # The checkpoint journal is not needed anymore
+    if PreproOut["JOURNAL"] is not None:
+        PreproOut["JOURNAL"].close()
+        os.remove(PreproOut["PATH"] + ".jrn")
+
+    return PreproObsFile, buildPreproFrame(PreproData)
+
+# End of closePreproOutputs()
+
+def flushPreproOutputs(PreproOut):
+
+    # Purpose: write the PREPRO OBS epochs generated so far to the
+    #          text file straight away (real-time mode)
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs)
+
+    # Returns
+    # =======
+    # Nothing
+
+    if PreproOut["TXT"] is not None:
+        flushPreproFile(PreproOut["TXT"], PreproOut["BUFFER"])
+        PreproOut["TXT"].flush()
+
+# End of flushPreproOutputs()
+
+# Record of the checkpoint journal: satellite label and numerical
+# columns of the in-memory table
+PreproJournalType = np.dtype([("LABEL", "S3")] + \
+    [(Col, "<f8") for Col in PreproIdx if Col not in ["CONST", "PRN"]])
+
+def checkpointPreproOutputs(PreproOut):
+
+    # Purpose: make the PREPRO OBS outputs written so far durable, so
+    #          that they can be resumed from this point
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs)
+
+    # Returns
+    # =======
+    # Checkpoint: dict
+    #             Output offsets: text file size (TXT) and number of
+    #             rows of the table saved in the journal (NROWS)
+
+    Checkpoint = OrderedDict({})
+    Checkpoint["TXT"] = None
+
+    if PreproOut["TXT"] is not None:
+        flushPreproFile(PreproOut["TXT"], PreproOut["BUFFER"])
+        PreproOut["TXT"].flush()
+        os.fsync(PreproOut["TXT"].fileno())
+        Checkpoint["TXT"] = PreproOut["TXT"].tell()
+
+    # Append the new rows of the table to the journal
+    Table = PreproOut["TABLE"]
+    NRows = len(Table["COLUMNS"]["SOD"])
+    if PreproOut["JOURNAL"] is None:
+        PreproOut["JOURNAL"] = open(PreproOut["PATH"] + ".jrn", 'wb')
+
+    Records = np.zeros(NRows - PreproOut["NJOURNAL"], dtype=PreproJournalType)
+    Records["LABEL"] = np.frombuffer(bytes(Table["LABELS"][3 * PreproOut["NJOURNAL"]:]),
+        dtype="S3")
+    for Col, Column in Table["COLUMNS"].items():
+        Records[Col] = np.frombuffer(Column, dtype="f8")[PreproOut["NJOURNAL"]:]
+
+    PreproOut["JOURNAL"].write(Records.tobytes())
+    PreproOut["JOURNAL"].flush()
+    os.fsync(PreproOut["JOURNAL"].fileno())
+    PreproOut["NJOURNAL"] = NRows
+    Checkpoint["NROWS"] = NRows
+
+    return Checkpoint
+
+# End of checkpointPreproOutputs()
+
+def readPreproJournal(PreproOut, NRows):
+
+    # Purpose: load the first NRows rows saved in the checkpoint journal
+    #          into the in-memory table, dropping the rest
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs)
+    # NRows: int
+    #        Number of rows saved at the checkpoint
+
+    # Returns
+    # =======
+    # Nothing
+
+    JournalFile = PreproOut["PATH"] + ".jrn"
+    PreproOut["JOURNAL"] = open(JournalFile, 'r+b')
+    PreproOut["JOURNAL"].truncate(NRows * PreproJournalType.itemsize)
+
+    Records = np.fromfile(PreproOut["JOURNAL"], dtype=PreproJournalType, count=NRows)
+    if len(Records) != NRows:
+        raise IOError("Truncated checkpoint journal %s" % JournalFile)
+
+    PreproOut["JOURNAL"].seek(0, os.SEEK_END)
+    PreproOut["NJOURNAL"] = NRows
+
+    Table = PreproOut["TABLE"]
+    Table["LABELS"].extend(Records["LABEL"].tobytes())
+    for Col, Column in Table["COLUMNS"].items():
+        Column.frombytes(np.ascontiguousarray(Records[Col]).tobytes())
+
+# End of readPreproJournal()
+
+def writeJsonFile(Path, Contents):
+
+    # Purpose: write a JSON file (checkpoint, manifest...), replacing
+    #          the previous one at once so that a valid file is always
+    #          found
+
+    # Parameters
+    # ==========
+    # Path: str
+    #       Path to file
+    # Contents: dict
+    #           File contents (JSON types only)
+
+    # Returns
+    # =======
+    # Nothing
+
+    # Create output directory, if needed
+    os.makedirs(os.path.dirname(Path), exist_ok=True)
+
+    TmpFile = Path + ".tmp%d" % os.getpid()
+    with open(TmpFile, 'w') as fjson:
+        json.dump(Contents, fjson, separators=(",", ":"))
+        fjson.flush()
+        os.fsync(fjson.fileno())
+
+    os.replace(TmpFile, Path)
+
+# End of writeJsonFile()
+
+def readJsonFile(Path):
+
+    # Purpose: read a JSON file written by writeJsonFile
+
+    # Parameters
+    # ==========
+    # Path: str
+    #       Path to file
+
+    # Returns
+    # =======
+    # Contents: dict
+    #           File contents, None if not found or corrupted
+
+    if not os.path.isfile(Path):
+        return None
+
+    try:
+        with open(Path, 'r') as fjson:
+            return json.load(fjson, object_pairs_hook=OrderedDict)
+
+    except ValueError:
+        sys.stderr.write("WARNING: Ignoring corrupted file %s\n" % Path)
+
+    return None
+
+# End of readJsonFile()
@@ -16,7 +16,10 @@
 # -----------------------------------------------------------------
 #
 # Usage:
-# Petrus.py $SCEN_PATH
+# Petrus.py $SCEN_PATH [--jobs N | --batch [--node NAME] [--requeue]] [--resume] [--force]
+# Petrus.py $SCEN_PATH --tail RCVR
+# Petrus.py $SCEN_PATH --stream RCVR ADDRESS
+# Petrus.py $SCEN_PATH --engine RCVR[@ADDRESS][,RCVR[@ADDRESS]...] | ALL
 ########################################################################
 
 import sys, os
@@ -30,38 +33,165 @@ sys.path.insert(0, Common)
 #----------------------------------------------------------------------
 from collections import OrderedDict
 from yaml import dump
-from COMMON import GnssConstants as Const
 from InputOutput import readConf
 from InputOutput import processConf
 from InputOutput import readRcvr
-from InputOutput import createOutputFile
-from InputOutput import readObsEpoch
-from InputOutput import generatePreproFile
-from InputOutput import PreproHdr
-from InputOutput import CSNEPOCHS
-from Preprocessing import runPreProcMeas
-from PreprocessingPlots import generatePreproPlots
-from COMMON.Dates import convertJulianDay2YearMonthDay
-from COMMON.Dates import convertYearMonthDay2Doy
+from InputOutput import findInputFile
+from PreprocessingPlots import startPreproPlotQueue
+from PreprocessingPlots import startPreproPlotPool
+from PreprocessingPlots import drainPreproPlotQueue
+from PetrusJobs import initPrevPreproObsInfo
+from PetrusJobs import shiftPrevPreproObsInfo
+from PetrusJobs import warmUpPrevPreproObsInfo
+from PetrusJobs import getPreproManifest
+from PetrusJobs import recordPlottedManifests
+from PetrusJobs import runPreproDay
+from PetrusJobs import plotPreproDay
+from PetrusJobs import runPreproJobs
+from PetrusJobs import runPreproBatch
+from PetrusJobs import runPreproTail
+from PetrusJobs import runPreproStream
+from Engine import getEngineReceivers
+from Engine import runPreproEngine
 
 #----------------------------------------------------------------------
 # INTERNAL FUNCTIONS
 #----------------------------------------------------------------------
 
 def displayUsage():
-    sys.stderr.write("ERROR: Please provide path to SCENARIO as a unique argument\n")
+    sys.stderr.write("ERROR: Wrong arguments. Please provide path to SCENARIO as first argument\n")
+    sys.stderr.write("Usage: Petrus.py $SCEN_PATH [--jobs N | --batch [--node NAME] [--requeue]] [--resume] [--force]\n")
+    sys.stderr.write("  --jobs N:    process receivers and days in N parallel processes\n")
+    sys.stderr.write("  --batch:     process the jobs of the scenario queue (OUT/JOBS),\n")
+    sys.stderr.write("               shared with other nodes running on the scenario\n")
+    sys.stderr.write("  --node NAME: node name in the queue (default: host.pid)\n")
+    sys.stderr.write("  --requeue:   queue again the jobs finished by a previous campaign\n")
+    sys.stderr.write("               (first node only)\n")
+    sys.stderr.write("  --resume:    resume the days from their last checkpoint (CHECKPOINT)\n")
+    sys.stderr.write("  --force:     process the days even if their outputs are up to date\n")
+    sys.stderr.write("               (with --batch, also queues again the jobs finished:\n")
+    sys.stderr.write("               first node only)\n")
+    sys.stderr.write("       Petrus.py $SCEN_PATH --tail RCVR\n")
+    sys.stderr.write("  --tail RCVR: real-time mode, following the OBS files of RCVR\n")
+    sys.stderr.write("               while they are written\n")
+    sys.stderr.write("       Petrus.py $SCEN_PATH --stream RCVR ADDRESS\n")
+    sys.stderr.write("  --stream RCVR ADDRESS: real-time mode, receiving the OBS lines of\n")
+    sys.stderr.write("               RCVR on ADDRESS (HOST:PORT or Unix socket path)\n")
+    sys.stderr.write("       Petrus.py $SCEN_PATH --engine RCVR[@ADDRESS][,RCVR[@ADDRESS]...] | ALL\n")
+    sys.stderr.write("  --engine RCVRS: real-time mode for many receivers in one process,\n")
+    sys.stderr.write("               following the OBS files of RCVR or receiving its OBS\n")
+    sys.stderr.write("               lines on ADDRESS (ALL: OBS files of every receiver)\n")
+
+def readArguments(Argv):
+
+    # Purpose: read the command line arguments
+
+    # Parameters
+    # ==========
+    # Argv: list
+    #       Command line arguments
+
+    # Returns
+    # =======
+    # Args: dict
+    #       Arguments (SCEN, JOBS, BATCH, NODE, REQUEUE, RESUME, FORCE,
+    #       TAIL, STREAM, ENGINE), None if wrong
+
+    if len(Argv) < 2 or Argv[1].startswith("--"):
+        return None
+
+    Args = OrderedDict({})
+    Args["SCEN"] = Argv[1]
+    Args["JOBS"] = 1
+    Args["BATCH"] = 0
+    Args["NODE"] = None
+    Args["REQUEUE"] = 0
+    Args["RESUME"] = 0
+    Args["FORCE"] = 0
+    Args["TAIL"] = None
+    Args["STREAM"] = None
+    Args["ENGINE"] = None
+
+    i = 2
+    while i < len(Argv):
+        if Argv[i] == "--jobs" and i + 1 < len(Argv) and \
+            Argv[i + 1].isdigit() and int(Argv[i + 1]) >= 1:
+            Args["JOBS"] = int(Argv[i + 1])
+            i = i + 2
+
+        elif Argv[i] == "--batch":
+            Args["BATCH"] = 1
+            i = i + 1
+
+        elif Argv[i] == "--requeue":
+            Args["REQUEUE"] = 1
+            i = i + 1
+
+        elif Argv[i] == "--resume":
+            Args["RESUME"] = 1
+            i = i + 1
+
+        elif Argv[i] == "--force":
+            Args["FORCE"] = 1
+            i = i + 1
+
+        elif Argv[i] == "--tail" and i + 1 < len(Argv):
+            Args["TAIL"] = Argv[i + 1]
+            i = i + 2
+
+        elif Argv[i] == "--stream" and i + 2 < len(Argv):
+            Args["TAIL"] = Argv[i + 1]
+            Args["STREAM"] = Argv[i + 2]
+            i = i + 3
+
+        elif Argv[i] == "--engine" and i + 1 < len(Argv):
+            Args["ENGINE"] = Argv[i + 1]
+            i = i + 2
+
+        elif Argv[i] == "--node" and i + 1 < len(Argv) and \
+            len(Argv[i + 1]) > 0 and '@' not in Argv[i + 1] and '/' not in Argv[i + 1]:
+            Args["NODE"] = Argv[i + 1]
+            i = i + 2
+
+        else:
+            return None
+
+    # Batch nodes process one job at a time
+    if Args["BATCH"] == 1 and Args["JOBS"] > 1:
+        return None
+
+    if (Args["NODE"] is not None or Args["REQUEUE"] == 1) and Args["BATCH"] == 0:
+        return None
+
+    # The real-time modes follow one receiver
+    if Args["TAIL"] is not None and (Args["JOBS"] > 1 or Args["BATCH"] == 1 or \
+        Args["RESUME"] == 1 or Args["FORCE"] == 1 or Args["ENGINE"] is not None):
+        return None
+
+    # The real-time engine runs its receivers in one process
+    if Args["ENGINE"] is not None and (Args["JOBS"] > 1 or Args["BATCH"] == 1 or \
+        Args["RESUME"] == 1 or Args["FORCE"] == 1):
+        return None
+
+    return Args
+
+# End of readArguments()
 
 #######################################################
 # MAIN BODY
 #######################################################
 
 # Check InputOutput Arguments
-if len(sys.argv) != 2:
+Args = readArguments(sys.argv)
+if Args is None:
     displayUsage()
     sys.exit()
 
 # Extract the arguments
-Scen = sys.argv[1]
+Scen = Args["SCEN"]
+
+# Number of (receiver, day) jobs run in parallel processes
+NJobs = Args["JOBS"]
 
 # Select the Configuratiun file name
 CfgFile = Scen + '/CFG/petrus.cfg'
@@ -74,134 +204,161 @@ Conf = readConf(CfgFile)
 Conf = processConf(Conf)
 
 # Select the RCVR Positions file name
-RcvrFile = Scen + '/INP/RCVR/' + Conf["RCVR_FILE"]
+RcvrFile = findInputFile(Scen + '/INP/RCVR/' + Conf["RCVR_FILE"])
 
 # Read RCVR Positions file
 RcvrInfo = readRcvr(RcvrFile)
 
+# Check the receiver followed in real-time modes
+if Args["TAIL"] is not None and Args["TAIL"] not in RcvrInfo:
+    sys.stderr.write("ERROR: Receiver %s not found in %s\n" % (Args["TAIL"], RcvrFile))
+    sys.exit(-1)
+
+# Check the receivers of the real-time engine
+if Args["ENGINE"] is not None:
+    EngineRcvrs = getEngineReceivers(Args["ENGINE"], RcvrInfo)
+    if EngineRcvrs is None:
+        sys.exit(-1)
+
+# Start the background plot process, if requested in ConPlots
+# (parallel and batch jobs generate their own plots)
+PlotQueue = None
+if NJobs == 1 and Args["BATCH"] == 0:
+    PlotQueue = startPreproPlotQueue()
+
+# Start the plot worker processes of this process, if requested in
+# ConPlots, before the threads of the real-time and batch modes (the
+# engine starts them after its own worker processes)
+if PlotQueue is None and NJobs == 1 and Args["ENGINE"] is None:
+    startPreproPlotPool()
+
+# Number of receivers or days that could not be processed in the
+# parallel, batch and engine modes
+NFailed = 0
+
+# Manifests of the days processed waiting for their figures
+Manifests = {}
+
 # Print header
 print( '------------------------------------')
 print( '--> RUNNING PETRUS:')
 print( '------------------------------------')
 
-# Loop over RCVRs
-#-----------------------------------------------------------------------
-for Rcvr in RcvrInfo.keys():
-    # Display Message
+# If the real-time engine is requested
+if Args["ENGINE"] is not None:
+    # Follow all the receivers concurrently in this process
+    #-----------------------------------------------------------------------
+    NFailed = runPreproEngine(Scen, Conf, RcvrInfo, EngineRcvrs, PlotQueue)
+    if NFailed > 0:
+        sys.stderr.write("ERROR: Some receivers could not be processed\n")
+
+# If real-time mode with OBS streams is requested
+elif Args["STREAM"] is not None:
+    # Receive the OBS lines of the receiver over sockets
+    #-----------------------------------------------------------------------
     print( '\n***-----------------------------***')
-    print( '*** Processing receiver: ' + Rcvr + '   ***')
+    print( '*** Streaming receiver: ' + Args["TAIL"] + '   ***')
     print( '***-----------------------------***')
 
-    # Loop over Julian Days in simulation
+    runPreproStream(Scen, Conf, Args["TAIL"], RcvrInfo[Args["TAIL"]], Args["STREAM"],
+        PlotQueue)
+
+# If real-time mode is requested
+elif Args["TAIL"] is not None:
+    # Follow the OBS files of the receiver while they are written
     #-----------------------------------------------------------------------
-    for Jd in range(Conf["INI_DATE_JD"], Conf["END_DATE_JD"] + 1):
-        # Compute Year, Month and Day in order to build input file name
-        Year, Month, Day = convertJulianDay2YearMonthDay(Jd)
-        
-        # Compute the Day of Year (DoY)
-        Doy = convertYearMonthDay2Doy(Year, Month, Day)
+    print( '\n***-----------------------------***')
+    print( '*** Following receiver: ' + Args["TAIL"] + '   ***')
+    print( '***-----------------------------***')
+
+    runPreproTail(Scen, Conf, Args["TAIL"], RcvrInfo[Args["TAIL"]], PlotQueue)
 
+# If batch mode is requested
+elif Args["BATCH"] == 1:
+    # Process the jobs of the scenario queue, shared with other nodes
+    #-----------------------------------------------------------------------
+    NDone, NFailed = runPreproBatch(Scen, Conf, RcvrInfo, Args["NODE"],
+        Args["RESUME"] == 1, Args["FORCE"] == 1, Args["REQUEUE"] == 1)
+    if NFailed > 0:
+        sys.stderr.write("ERROR: Some receivers and days could not be processed\n")
+
+# If parallel jobs are requested
+elif NJobs > 1:
+    # Run every (receiver, day) in a pool of processes, largest
+    # OBS files first
+    #-----------------------------------------------------------------------
+    print("INFO: Running receivers and days in %d parallel jobs..." % NJobs)
+    sys.stdout.flush()
+    NFailed = runPreproJobs(Scen, Conf, RcvrInfo, NJobs,
+        Args["RESUME"] == 1, Args["FORCE"] == 1)
+    if NFailed > 0:
+        sys.stderr.write("ERROR: Some receivers and days could not be processed\n")
+
+else:
+    # Loop over RCVRs
+    #-----------------------------------------------------------------------
+    for Rcvr in RcvrInfo.keys():
         # Display Message
-        print( '\n*** Processing Day of Year: ' + str(Doy) + ' ... ***')
-
-        # Define the full path and name to the OBS INFO file to read
-        ObsFile = Scen + \
-            '/INP/OBS/' + "OBS_%s_Y%02dD%03d.dat" % \
-                (Rcvr, Year % 100, Doy)
-
-        # If Preprocessing outputs are activated
-        if Conf["PREPRO_OUT"] == 1:
-            # Define the full path and name to the output PREPRO OBS file
-            PreproObsFile = Scen + \
-                '/OUT/PPVE/' + "PREPRO_OBS_%s_Y%02dD%03d.dat" % \
-                    (Rcvr, Year % 100, Doy)
-
-            # Create output file
-            fpreprobs = createOutputFile(PreproObsFile, PreproHdr)
-
-        # Initialize Variables
-        EndOfFile = False
-        ObsInfo = [None]
-        PrevPreproObsInfo = {}
-        for prn in range(1, Const.MAX_NUM_SATS_CONSTEL + 1):
-            PrevPreproObsInfo["G%02d" % prn] = {
-            "L1_n_1": 0.0,                                          # t-1 Carrier Phase in L1
-            "L1_n_2": 0.0,                                          # t-2 Carrier Phase in L1
-            "L1_n_3": 0.0,                                          # t-3 Carrier Phase in L1
-            "t_n_1": 0.0,                                           # t-1 epoch
-            "t_n_2": 0.0,                                           # t-2 epoch
-            "t_n_3": 0.0,                                           # t-3 epoch
-            "CsBuff": [0] * int(Conf["MIN_NCS_TH"][CSNEPOCHS]),     # Number of consecutive epochs for CS
-            "CsIdx": 0,                                             # Index of CS detector buffer
-            "ResetHatchFilter": 1,                                  # Flag to reset Hatch filter
-            "Ksmooth": 0,                                           # Hatch filter K
-            "PrevEpoch": 0,                                         # Previous SoD
-            "PrevL1": 0.0,                                          # Previous L1
-            "PrevSmoothC1": 0.0,                                    # Previous Smoothed C1
-            "PrevRangeRateL1": 0.0,                                 # Previous Code Rate
-            "PrevPhaseRateL1": 0.0,                                 # Previous Phase Rate
-            "PrevGeomFree": 0.0,                                    # Previous Geometry-Free Observable
-            "PrevGeomFreeEpoch": 0.0,                               # Previous Geometry-Free Observable
-            "PrevRej": 0,                                           # Previous Rejection flag
-                                                                    # ...
-        } # End of PrevPreproObsInfo
-
-        # Open OBS file
-        with open(ObsFile, 'r') as fobs:
-            # Read header line of OBS file
-            fobs.readline()
-
-            # LOOP over all Epochs of UPOS file
-            # ----------------------------------------------------------
-            while not EndOfFile:
-
-                # If ObsInfo is not empty
-                if ObsInfo != []:
-
-                    # Read Only One Epoch
-                    ObsInfo = readObsEpoch(fobs)
-
-                    # If ObsInfo is empty, exit loop
-                    if ObsInfo == []:
-                        break
-
-                    # Preprocess OBS measurements
-                    # ----------------------------------------------------------
-                    PreproObsInfo = runPreProcMeas(Conf, RcvrInfo[Rcvr], ObsInfo, PrevPreproObsInfo)
-
-                    # If PREPRO outputs are requested
-                    if Conf["PREPRO_OUT"] == 1:
-                        # Generate output file
-                        generatePreproFile(fpreprobs, PreproObsInfo)
-
-                    # To be continued in next WP...
-
-                # End of if ObsInfo != []:
-
-                else:
-                    EndOfFile = True
-
-                # End of if ObsInfo != []:
-                
-            # End of while not EndOfFile:
-    
-        # End of with open(ObsFile, 'r') as f:
-
-        # If PREPRO outputs are requested
-        if Conf["PREPRO_OUT"] == 1:
-            # Close PREPRO output file
-            fpreprobs.close()
-
-            # Display Message
-            print("INFO: Reading file: %s and generating PREPRO figures..." %
-            PreproObsFile)
-
-            # Generate Preprocessing plots
-            generatePreproPlots(PreproObsFile)
-
-    # End of JD loop
-
-# End of RCVR loop
+        print( '\n***-----------------------------***')
+        print( '*** Processing receiver: ' + Rcvr + '   ***')
+        print( '***-----------------------------***')
+
+        # Per satellite state carried over the days, if requested
+        PrevPreproObsInfo = None
+
+        # Loop over Julian Days in simulation
+        #-----------------------------------------------------------------------
+        for Jd in range(Conf["INI_DATE_JD"], Conf["END_DATE_JD"] + 1):
+            # Skip the day if its outputs are up to date
+            Manifest = None
+            if Conf["PREPRO_OUT"] == 1:
+                Manifest = getPreproManifest(Scen, Conf, Rcvr, RcvrInfo[Rcvr], Jd)
+                if Manifest["UPTODATE"] and Args["FORCE"] == 0:
+                    print("\nINFO: Up to date, skipping: %s" % Manifest["PREPRO"])
+
+                    # The state of the next day is warmed up again
+                    PrevPreproObsInfo = None
+                    continue
+
+            # Initialize the state carried over the days
+            if Conf["CONTINUOUS"] == 1 and PrevPreproObsInfo is None:
+                PrevPreproObsInfo = initPrevPreproObsInfo(Conf)
+
+                # Warm it up after skipped days
+                if Jd > Conf["INI_DATE_JD"] and Conf["WARMUP_TIME"] > 0:
+                    warmUpPrevPreproObsInfo(Scen, Conf, Rcvr, RcvrInfo[Rcvr], Jd,
+                        PrevPreproObsInfo)
+
+            # Preprocess the OBS file of the day
+            PreproObsFile, PreproObsData = runPreproDay(Scen, Conf, Rcvr, RcvrInfo[Rcvr], Jd,
+                PrevPreproObsInfo, Args["RESUME"] == 1)
+
+            # Carry the state over midnight
+            if PrevPreproObsInfo is not None:
+                shiftPrevPreproObsInfo(PrevPreproObsInfo)
+
+            # If PREPRO outputs are requested
+            if PreproObsFile is not None:
+                # Generate (or queue) the Preprocessing plots
+                plotPreproDay(PlotQueue, PreproObsFile, PreproObsData)
+
+                # Record the days as up to date once their figures
+                # are generated
+                Manifests[PreproObsFile] = Manifest
+                recordPlottedManifests(Conf, PlotQueue, Manifests)
+
+        # End of JD loop
+
+    # End of RCVR loop
+
+# Wait for the figures still being generated in background
+if PlotQueue is not None:
+    print("\nINFO: Waiting for the PREPRO figures in background...")
+    if drainPreproPlotQueue(PlotQueue) > 0:
+        sys.stderr.write("ERROR: Some PREPRO figures could not be generated\n")
+
+    # Record the last days plotted
+    recordPlottedManifests(Conf, PlotQueue, Manifests)
 
 print( '\n------------------------------------')
 print( '--> END OF PETRUS ANALYSIS')
@@ -209,6 +366,10 @@ print( '------------------------------------')
 
 print( 'Check figures in output folder: PPVE/figures/')
 
+# Exit with an error if some receivers or days failed
+if NFailed > 0:
+    sys.exit(-1)
+
 
 #######################################################
 # End of Petrus.py
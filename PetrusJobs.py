@@ -0,0 +1,1672 @@
+#!/usr/bin/env python
+
+########################################################################
+# PETRUS/SRC/PetrusJobs.py:
+# This is the Jobs Module of PETRUS tool: processing of one receiver
+# and day, parallel execution of several of them and batch mode, where
+# several nodes share the jobs of a scenario through a job queue in
+# its OUT folder
+#
+#  Project:        PETRUS
+#  File:           PetrusJobs.py
+#  Date(YY/MM/DD): 01/02/21
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+# -----------------------------------------------------------------
+# Date       | Author             | Action
+# -----------------------------------------------------------------
+#
+########################################################################
+
+# Import External and Internal functions and Libraries
+#----------------------------------------------------------------------
+import sys, os
+import io
+import time
+import socket
+import threading
+import traceback
+import json
+from hashlib import sha1
+from contextlib import redirect_stdout, redirect_stderr
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, get_all_start_methods
+from COMMON import GnssConstants as Const
+from InputOutput import findInputFile
+from InputOutput import readObsIndex
+from InputOutput import readObsFileEpochs
+from InputOutput import getObsCacheDir
+from InputOutput import buildObsFilter
+from InputOutput import initObsFilterStats
+from InputOutput import openPreproOutputs
+from InputOutput import generatePreproOutputs
+from InputOutput import closePreproOutputs
+from InputOutput import flushPreproOutputs
+from InputOutput import tailObsEpochs
+from InputOutput import getPreproOutputPath
+from InputOutput import checkpointPreproOutputs
+from InputOutput import writeJsonFile
+from InputOutput import readJsonFile
+from InputOutput import ObsIdx
+from InputOutput import CSNEPOCHS
+from Preprocessing import runPreProcMeas
+from Pipeline import runPreproPipeline
+from Stream import initStreamStats
+from Stream import streamObsEpochs
+from PreprocessingPlots import generatePreproPlots
+from PreprocessingPlots import queuePreproPlots
+from PreprocessingPlots import checkForkSafe
+from PreprocessingPlots import initLivePlots
+from PreprocessingPlots import updateLivePlots
+from COMMON.Dates import convertJulianDay2YearMonthDay
+from COMMON.Dates import convertYearMonthDay2Doy
+
+def initPrevPreproObsInfo(Conf):
+
+    # Purpose: initialize the Preprocessing info of the previous epoch
+    #          for every satellite
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+
+    # Returns
+    # =======
+    # PrevPreproObsInfo: dict
+    #                    Preprocessed observations for previous epoch per sat
+
+    PrevPreproObsInfo = {}
+    for prn in range(1, Const.MAX_NUM_SATS_CONSTEL + 1):
+        PrevPreproObsInfo["G%02d" % prn] = {
+        "L1_n_1": 0.0,                                          # t-1 Carrier Phase in L1
+        "L1_n_2": 0.0,                                          # t-2 Carrier Phase in L1
+        "L1_n_3": 0.0,                                          # t-3 Carrier Phase in L1
+        "t_n_1": None,                                          # t-1 epoch (None: not set)
+        "t_n_2": None,                                          # t-2 epoch (None: not set)
+        "t_n_3": None,                                          # t-3 epoch (None: not set)
+        "CsBuff": [0] * int(Conf["MIN_NCS_TH"][CSNEPOCHS]),     # Number of consecutive epochs for CS
+        "CsIdx": 0,                                             # Index of CS detector buffer
+        "ResetHatchFilter": 1,                                  # Flag to reset Hatch filter
+        "Ksmooth": 0,                                           # Hatch filter K
+        "PrevEpoch": None,                                      # Previous SoD (None: never seen)
+        "PrevL1": 0.0,                                          # Previous L1
+        "PrevSmoothC1": 0.0,                                    # Previous Smoothed C1
+        "PrevRangeRateL1": 0.0,                                 # Previous Code Rate
+        "PrevPhaseRateL1": 0.0,                                 # Previous Phase Rate
+        "PrevGeomFree": 0.0,                                    # Previous Geometry-Free Observable
+        "PrevGeomFreeEpoch": None,                              # Previous Geometry-Free Observable epoch
+        "PrevRej": 0,                                           # Previous Rejection flag
+                                                                # ...
+    } # End of PrevPreproObsInfo
+
+    return PrevPreproObsInfo
+
+# End of initPrevPreproObsInfo()
+
+# Epochs kept in the Preprocessing info of the previous epoch, None
+# while not set
+PrevPreproEpochKeys = ["t_n_1", "t_n_2", "t_n_3", "PrevEpoch", "PrevGeomFreeEpoch"]
+
+def shiftPrevPreproObsInfo(PrevPreproObsInfo):
+
+    # Function referring the epochs of the previous epoch info to the
+    # next day (SoD - S_IN_D), so that the per satellite state carries
+    # over midnight. Epochs not set yet (None) are kept
+
+    for SatInfo in PrevPreproObsInfo.values():
+        for Key in PrevPreproEpochKeys:
+            if SatInfo[Key] is not None:
+                SatInfo[Key] = SatInfo[Key] - Const.S_IN_D
+
+def warmUpPrevPreproObsInfo(Scen, Conf, Rcvr, RcvrPos, Jd, PrevPreproObsInfo):
+
+    # Purpose: warm up the per satellite state of a day by preprocessing
+    #          the last WARMUP_TIME seconds of the previous day, without
+    #          any output
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Jd: int
+    #     Julian Day to be warmed up
+    # PrevPreproObsInfo: dict
+    #                    Preprocessed observations for previous epoch per
+    #                    sat, updated
+
+    # Returns
+    # =======
+    # Nothing
+
+    ObsFile, Year, Doy = getObsFile(Scen, Rcvr, Jd - 1)
+    if not os.path.isfile(ObsFile):
+        sys.stderr.write("WARNING: No OBS file to warm up Day of Year %d: %s\n" %
+        (getObsFile(Scen, Rcvr, Jd)[2], ObsFile))
+        return
+
+    # Tail of the window processed in the previous day
+    WarmUpConf = Conf.copy()
+    WarmUpConf["OBS_WINDOW"] = [max(Conf["OBS_WINDOW"][0],
+        Conf["OBS_WINDOW"][1] - Conf["WARMUP_TIME"]), Conf["OBS_WINDOW"][1]]
+
+    # Display Message
+    print("INFO: Warming up with SoD %d to %d of: %s..." %
+    (WarmUpConf["OBS_WINDOW"][0], WarmUpConf["OBS_WINDOW"][1], ObsFile))
+
+    ObsIndex = None
+    if Conf["OBS_INDEX"] == 1:
+        ObsIndex = readObsIndex(ObsFile)
+
+    ObsFilter = buildObsFilter(Conf, RcvrPos)
+    FilterStats = initObsFilterStats()
+
+    for ObsInfo in readObsFileEpochs(ObsFile, WarmUpConf, ObsIndex,
+        getObsCacheDir(Scen, Conf), ObsFilter, FilterStats):
+        runPreProcMeas(Conf, RcvrPos, ObsInfo, PrevPreproObsInfo, FilterStats["MASKED"])
+        del FilterStats["MASKED"][:]
+
+    # Carry the state over midnight
+    shiftPrevPreproObsInfo(PrevPreproObsInfo)
+
+# End of warmUpPrevPreproObsInfo()
+
+def getObsFile(Scen, Rcvr, Jd):
+
+    # Purpose: get the OBS file of a receiver and day
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Rcvr: str
+    #       Receiver acronym
+    # Jd: int
+    #     Julian Day
+
+    # Returns
+    # =======
+    # ObsFile: str
+    #          Path to OBS file (gzip, bz2 or xz compressed file
+    #          if the plain one is not found)
+    # Year: int
+    #       Year
+    # Doy: int
+    #      Day of Year
+
+    # Compute Year, Month and Day in order to build input file name
+    Year, Month, Day = convertJulianDay2YearMonthDay(Jd)
+
+    # Compute the Day of Year (DoY)
+    Doy = convertYearMonthDay2Doy(Year, Month, Day)
+
+    ObsFile = findInputFile(Scen + \
+        '/INP/OBS/' + "OBS_%s_Y%02dD%03d.dat" % \
+            (Rcvr, Year % 100, Doy))
+
+    return ObsFile, Year, Doy
+
+# End of getObsFile()
+
+def getCheckpointId(Conf, ObsFile):
+
+    # Function returning the identifier of the configuration and OBS
+    # file a checkpoint was taken with
+
+    Stat = os.stat(ObsFile)
+
+    return sha1((json.dumps(Conf, sort_keys=True, default=str) + \
+        "%s %d %d" % (os.path.abspath(ObsFile), Stat.st_size, Stat.st_mtime_ns)).encode()).hexdigest()
+
+def readPreproCheckpoint(ChkFile, ChkId):
+
+    # Function reading the checkpoint of a day, None if there is none
+    # valid for the current configuration and OBS file
+
+    Checkpoint = readJsonFile(ChkFile)
+    if Checkpoint is not None and Checkpoint["ID"] != ChkId:
+        sys.stderr.write("WARNING: Configuration or OBS file changed, "\
+            "ignoring checkpoint %s\n" % ChkFile)
+        return None
+
+    return Checkpoint
+
+def writePreproCheckpoint(ChkFile, ChkId, Sod, PreproOut, PrevPreproObsInfo, FilterStats):
+
+    # Purpose: checkpoint the Preprocessing of a day after epoch Sod
+
+    # Parameters
+    # ==========
+    # ChkFile: str
+    #          Path to checkpoint file
+    # ChkId: str
+    #        Checkpoint identifier (see getCheckpointId)
+    # Sod: float
+    #      Last epoch processed
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs)
+    # PrevPreproObsInfo: dict
+    #                    Preprocessed observations for previous epoch
+    #                    per sat
+    # FilterStats: dict
+    #              OBS reader filters statistics
+
+    # Returns
+    # =======
+    # Nothing
+
+    Checkpoint = OrderedDict({})
+    Checkpoint["ID"] = ChkId
+    Checkpoint["SOD"] = Sod
+    Checkpoint["OUTPUTS"] = checkpointPreproOutputs(PreproOut)
+    Checkpoint["FILTER"] = [FilterStats["MASK"], FilterStats["SATS"]]
+    Checkpoint["STATE"] = PrevPreproObsInfo
+
+    writeJsonFile(ChkFile, Checkpoint)
+
+# End of writePreproCheckpoint()
+
+# Skip-if-up-to-date manifest
+#----------------------------------------------------------------------
+# Every (receiver, day) processed leaves an entry in OUT/PPVE/MANIFEST
+# with the fingerprint of its inputs and the outputs written. A day
+# whose fingerprint is unchanged and whose outputs are still there is
+# not processed again (unless --force).
+
+# Configuration parameters not changing the results (the real-time
+# modes do not skip days)
+FingerprintIgnoredKeys = ["INI_DATE", "END_DATE", "INI_DATE_JD", "END_DATE_JD",
+    "RCVR_FILE", "OBS_READER", "OBS_INDEX", "OBS_CACHE", "OBS_CACHE_DIR",
+    "OBS_CACHE_SIZE", "PREPRO_BLOCK", "PIPELINE", "PIPELINE_DEPTH",
+    "CHECKPOINT", "TAIL_POLL", "STREAM_DEPTH", "STREAM_IDLE", "STREAM_STALE",
+    "ENGINE_DEPTH", "ENGINE_BATCH", "ENGINE_WORKERS", "ENGINE_REPORT", "SHED_LAG",
+    "SHED_DECIMATION", "JOB_HEARTBEAT", "JOB_TIMEOUT"]
+
+CodeVersion = None
+
+def getCodeVersion():
+
+    # Function returning the hash of the PETRUS source files (plots
+    # configuration included), computed once per run
+
+    global CodeVersion
+
+    if CodeVersion is None:
+        SrcDir = os.path.dirname(os.path.abspath(__file__))
+        Hash = sha1()
+        for Dir in [SrcDir, SrcDir + '/COMMON']:
+            if not os.path.isdir(Dir):
+                continue
+            for Name in sorted(os.listdir(Dir)):
+                if Name.endswith(".py"):
+                    with open(Dir + '/' + Name, 'rb') as fsrc:
+                        Hash.update(Name.encode() + fsrc.read())
+
+        CodeVersion = Hash.hexdigest()
+
+    return CodeVersion
+
+def getFileStamp(Path):
+
+    # Function returning the size and modification time of a file,
+    # None if it does not exist
+
+    if not os.path.isfile(Path):
+        return None
+
+    Stat = os.stat(Path)
+
+    return [Stat.st_size, Stat.st_mtime_ns]
+
+def getPreproFingerprint(Scen, Conf, Rcvr, RcvrPos, Jd):
+
+    # Purpose: get the fingerprint of the inputs of a receiver and day
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Jd: int
+    #     Julian Day
+
+    # Returns
+    # =======
+    # Fingerprint: str
+    #              Hash of the OBS file stamp, the configuration
+    #              parameters changing the results, the receiver
+    #              information and the code version
+
+    Inputs = OrderedDict({})
+    Inputs["OBS"] = getFileStamp(getObsFile(Scen, Rcvr, Jd)[0])
+    Inputs["CONF"] = OrderedDict([(Key, Value) for Key, Value in Conf.items() \
+        if Key not in FingerprintIgnoredKeys])
+    Inputs["RCVR"] = [Rcvr, RcvrPos]
+    Inputs["CODE"] = getCodeVersion()
+
+    # The state of continuous days comes from the previous day
+    if Conf["CONTINUOUS"] == 1:
+        Inputs["FIRST"] = Jd == Conf["INI_DATE_JD"]
+        Inputs["PREV_OBS"] = getFileStamp(getObsFile(Scen, Rcvr, Jd - 1)[0])
+
+    return sha1(json.dumps(Inputs, default=str).encode()).hexdigest()
+
+# End of getPreproFingerprint()
+
+def getPreproManifest(Scen, Conf, Rcvr, RcvrPos, Jd):
+
+    # Purpose: check whether the outputs of a receiver and day are up
+    #          to date
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Jd: int
+    #     Julian Day
+
+    # Returns
+    # =======
+    # Manifest: dict
+    #           Manifest entry of the day: FILE, FINGERPRINT, UPTODATE
+    #           (True if the day does not need to be processed) and
+    #           the PREPRO OBS file (PREPRO) recorded
+
+    ObsFile, Year, Doy = getObsFile(Scen, Rcvr, Jd)
+    Path = getPreproOutputPath(Scen, Rcvr, Year, Doy)
+
+    Manifest = OrderedDict({})
+    Manifest["FILE"] = os.path.dirname(Path) + '/MANIFEST/' + \
+        os.path.basename(Path) + ".json"
+    Manifest["FINGERPRINT"] = getPreproFingerprint(Scen, Conf, Rcvr, RcvrPos, Jd)
+    Manifest["UPTODATE"] = False
+    Manifest["PREPRO"] = None
+
+    Entry = readJsonFile(Manifest["FILE"])
+    if Entry is None or Entry["FINGERPRINT"] != Manifest["FINGERPRINT"]:
+        return Manifest
+
+    # Check the outputs are still as written
+    for Output, Stamp in Entry["OUTPUTS"].items():
+        if getFileStamp(Output) != Stamp:
+            return Manifest
+
+    Manifest["UPTODATE"] = True
+    Manifest["PREPRO"] = Entry["PREPRO"]
+
+    return Manifest
+
+# End of getPreproManifest()
+
+def recordPreproManifest(Conf, Manifest, PreproObsFile):
+
+    # Function recording the fingerprint and outputs of a day processed
+    # in its manifest entry
+
+    Path = os.path.splitext(PreproObsFile)[0]
+    Outputs = []
+    if Conf["PREPRO_FORMAT"] in ["TXT", "BOTH"]:
+        Outputs.append(Path + ".dat")
+    if Conf["PREPRO_FORMAT"] in ["BIN", "BOTH"]:
+        Outputs.append(Path + ".bin")
+
+    Entry = OrderedDict({})
+    Entry["FINGERPRINT"] = Manifest["FINGERPRINT"]
+    Entry["PREPRO"] = PreproObsFile
+    Entry["OUTPUTS"] = OrderedDict({})
+    for Output in Outputs:
+        Entry["OUTPUTS"][Output] = getFileStamp(Output)
+
+    writeJsonFile(Manifest["FILE"], Entry)
+
+def recordPlottedManifests(Conf, PlotQueue, Manifests):
+
+    # Function recording the days whose figures have been generated
+    # (see recordPreproManifest), so that a day whose figures failed is
+    # processed again. Manifests holds the manifests of the days
+    # waiting for their figures, by PREPRO OBS file, updated
+
+    # Plots generated synchronously
+    if PlotQueue is None:
+        Plotted = list(Manifests)
+    else:
+        Plotted = PlotQueue["PLOTTED"]
+        PlotQueue["PLOTTED"] = []
+
+    for PreproObsFile in Plotted:
+        if PreproObsFile in Manifests:
+            recordPreproManifest(Conf, Manifests.pop(PreproObsFile), PreproObsFile)
+
+def runPreproDay(Scen, Conf, Rcvr, RcvrPos, Jd, PrevPreproObsInfo=None, Resume=False,
+    Claim=None):
+
+    # Purpose: preprocess the OBS file of one receiver and day
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Jd: int
+    #     Julian Day
+    # PrevPreproObsInfo: dict
+    #                    Per satellite state carried over from the
+    #                    previous day (CONTINUOUS), updated. If None,
+    #                    the state is initialized, and warmed up with
+    #                    the previous day if CONTINUOUS
+    # Resume: bool
+    #         Resume the day from its checkpoint, if any
+    # Claim: str
+    #        Claim file of the batch job (see claimJob). The day stops
+    #        as soon as the claim is lost, and its text file is written
+    #        at once when closing, as another node may process it again
+
+    # Returns
+    # =======
+    # PreproObsFile: str
+    #                Path to the PREPRO OBS file, None if the PREPRO
+    #                outputs are not requested
+    # PreproObsData: DataFrame
+    #                PREPRO OBS results, None if the PREPRO outputs
+    #                are not requested
+
+    # Define the full path and name to the OBS INFO file to read
+    ObsFile, Year, Doy = getObsFile(Scen, Rcvr, Jd)
+
+    # Display Message
+    print( '\n*** Processing Day of Year: ' + str(Doy) + ' ... ***')
+
+    # Checkpoints are taken along with the PREPRO outputs
+    Checkpoint = None
+    ChkFile = None
+    if Conf["PREPRO_OUT"] == 1 and Conf["CHECKPOINT"] > 0:
+        ChkFile = getPreproOutputPath(Scen, Rcvr, Year, Doy) + ".chk"
+        ChkId = getCheckpointId(Conf, ObsFile)
+        if Resume:
+            Checkpoint = readPreproCheckpoint(ChkFile, ChkId)
+
+        # Drop the checkpoint of a previous run
+        if Checkpoint is None and os.path.isfile(ChkFile):
+            os.remove(ChkFile)
+
+    if Checkpoint is not None:
+        # Display Message
+        print("INFO: Resuming from checkpoint at SoD %d: %s" % (Checkpoint["SOD"], ChkFile))
+
+    # If Preprocessing outputs are activated
+    PreproOut = None
+    if Conf["PREPRO_OUT"] == 1:
+        # Create the output PREPRO OBS files (text and/or binary,
+        # see PREPRO_FORMAT)
+        PreproOut = openPreproOutputs(Scen, Conf, Rcvr, Year, Doy,
+            Checkpoint["OUTPUTS"] if Checkpoint is not None else None, Claim is not None)
+
+    # Initialize Variables
+    if Checkpoint is not None:
+        # State saved at the checkpoint
+        if PrevPreproObsInfo is None:
+            PrevPreproObsInfo = {}
+        PrevPreproObsInfo.clear()
+        PrevPreproObsInfo.update(Checkpoint["STATE"])
+
+    elif PrevPreproObsInfo is None:
+        PrevPreproObsInfo = initPrevPreproObsInfo(Conf)
+
+        # Continuous results in a day processed on its own
+        if Conf["CONTINUOUS"] == 1 and Jd > Conf["INI_DATE_JD"] and \
+            Conf["WARMUP_TIME"] > 0:
+            warmUpPrevPreproObsInfo(Scen, Conf, Rcvr, RcvrPos, Jd, PrevPreproObsInfo)
+
+    # If OBS epochs index is requested
+    ObsIndex = None
+    if Conf["OBS_INDEX"] == 1:
+        # Read or build the index
+        ObsIndex = readObsIndex(ObsFile)
+
+        # Report the problems found in OBS file up front
+        for Error in ObsIndex["ERRORS"]:
+            sys.stderr.write("WARNING: %s: %s\n" % (ObsFile, Error))
+
+    # Build the OBS reader filters
+    ObsFilter = buildObsFilter(Conf, RcvrPos)
+    FilterStats = initObsFilterStats()
+
+    # Epochs left after the checkpoint
+    ReadConf = Conf
+    if Checkpoint is not None:
+        FilterStats["MASK"], FilterStats["SATS"] = Checkpoint["FILTER"]
+        ReadConf = Conf.copy()
+        ReadConf["OBS_WINDOW"] = [int(Checkpoint["SOD"]) + 1, Conf["OBS_WINDOW"][1]]
+
+    # OBS epochs to be processed
+    ObsEpochs = readObsFileEpochs(ObsFile, ReadConf, ObsIndex, getObsCacheDir(Scen, Conf),
+        ObsFilter, FilterStats)
+    if Claim is not None:
+        ObsEpochs = readJobEpochs(ObsEpochs, Claim)
+
+    # If pipelined processing is requested
+    if Conf["PIPELINE"] == 1:
+        if ChkFile is not None:
+            sys.stderr.write("WARNING: Checkpoints are not taken with PIPELINE\n")
+
+        # Read, preprocess and write in concurrent stages
+        # ----------------------------------------------------------
+        runPreproPipeline(Conf, RcvrPos, ObsEpochs, PrevPreproObsInfo,
+            FilterStats["MASKED"], PreproOut)
+
+    else:
+        # LOOP over all Epochs of OBS file
+        # ----------------------------------------------------------
+        NEpochs = 0
+        for ObsInfo in ObsEpochs:
+
+            # Preprocess OBS measurements
+            # ----------------------------------------------------------
+            PreproObsInfo = runPreProcMeas(Conf, RcvrPos, ObsInfo, PrevPreproObsInfo,
+                FilterStats["MASKED"])
+            del FilterStats["MASKED"][:]
+
+            # If PREPRO outputs are requested
+            if Conf["PREPRO_OUT"] == 1:
+                # Generate output files
+                generatePreproOutputs(PreproOut, PreproObsInfo)
+
+            # Checkpoint every CHECKPOINT epochs
+            NEpochs = NEpochs + 1
+            if ChkFile is not None and NEpochs % Conf["CHECKPOINT"] == 0:
+                checkJobClaim(Claim)
+                writePreproCheckpoint(ChkFile, ChkId, float(ObsInfo[0][ObsIdx["SOD"]]),
+                    PreproOut, PrevPreproObsInfo, FilterStats)
+
+            # To be continued in next WP...
+
+        # End of for ObsInfo in ObsEpochs:
+
+    # Display the OBS lines skipped by the reader filters
+    if ObsFilter is not None:
+        print("INFO: OBS lines filtered: %d below mask angle, %d satellites not selected" %
+        (FilterStats["MASK"], FilterStats["SATS"]))
+
+    # If PREPRO outputs are requested
+    if Conf["PREPRO_OUT"] == 1:
+        # Write the remaining epochs and close PREPRO output files
+        checkJobClaim(Claim)
+        PreproObsFile, PreproObsData = closePreproOutputs(PreproOut)
+
+        # The day is complete
+        if ChkFile is not None and os.path.isfile(ChkFile):
+            os.remove(ChkFile)
+
+        return PreproObsFile, PreproObsData
+
+    return None, None
+
+# End of runPreproDay()
+
+def plotPreproDay(PlotQueue, PreproObsFile, PreproObsData):
+
+    # Purpose: generate the Preprocessing plots of one receiver and day
+
+    # Parameters
+    # ==========
+    # PlotQueue: dict
+    #            Background plot process (see startPreproPlotQueue),
+    #            None to generate the plots now
+    # PreproObsFile: str
+    #                Path to the PREPRO OBS file
+    # PreproObsData: DataFrame
+    #                PREPRO OBS results
+
+    # Returns
+    # =======
+    # Nothing
+
+    # If plots are generated in background
+    if PlotQueue is not None:
+        # Display Message
+        print("INFO: Queuing PREPRO figures of: %s..." %
+        PreproObsFile)
+
+        # Hand the results over to the plot process
+        queuePreproPlots(PlotQueue, PreproObsFile, PreproObsData)
+
+    else:
+        # Display Message
+        print("INFO: Generating PREPRO figures of: %s..." %
+        PreproObsFile)
+
+        # Generate Preprocessing plots from the results in memory
+        generatePreproPlots(PreproObsFile, PreproObsData)
+
+# End of plotPreproDay()
+
+def processPreproDay(Scen, Conf, Rcvr, RcvrPos, Jd, Resume=False, Force=False, Claim=None):
+
+    # Purpose: preprocess and plot a receiver and day processed on its
+    #          own (parallel and batch jobs), unless it is up to date
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Jd: int
+    #     Julian Day
+    # Resume: bool
+    #         Resume the day from its checkpoint, if any
+    # Force: bool
+    #        Process the day even if it is up to date
+    # Claim: str
+    #        Claim file of the batch job (see runPreproDay), None if
+    #        not a batch job
+
+    # Returns
+    # =======
+    # PreproObsFile: str
+    #                Path to the PREPRO OBS file, None if the PREPRO
+    #                outputs are not requested
+    # Skipped: bool
+    #          True if the day was up to date
+
+    # Skip the day if up to date
+    Manifest = None
+    if Conf["PREPRO_OUT"] == 1:
+        Manifest = getPreproManifest(Scen, Conf, Rcvr, RcvrPos, Jd)
+        if Manifest["UPTODATE"] and not Force:
+            print("INFO: Up to date, skipping: %s" % Manifest["PREPRO"])
+            return Manifest["PREPRO"], True
+
+    PreproObsFile, PreproObsData = runPreproDay(Scen, Conf, Rcvr, RcvrPos, Jd,
+        Resume=Resume, Claim=Claim)
+
+    if PreproObsFile is not None:
+        plotPreproDay(None, PreproObsFile, PreproObsData)
+        recordPreproManifest(Conf, Manifest, PreproObsFile)
+
+    return PreproObsFile, False
+
+# End of processPreproDay()
+
+def listPreproJobs(Scen, Conf, RcvrInfo):
+
+    # Purpose: list the (receiver, day) jobs of the scenario, largest
+    #          OBS file first so that the longest jobs start first
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # RcvrInfo: dict
+    #           Receivers information
+
+    # Returns
+    # =======
+    # Jobs: list
+    #       Jobs as [Rcvr, Jd, Size], Size being the OBS file size
+    #       in bytes (0 if not found)
+
+    Jobs = []
+    for Rcvr in RcvrInfo.keys():
+        for Jd in range(Conf["INI_DATE_JD"], Conf["END_DATE_JD"] + 1):
+            ObsFile, Year, Doy = getObsFile(Scen, Rcvr, Jd)
+            Size = 0
+            if os.path.isfile(ObsFile):
+                Size = os.path.getsize(ObsFile)
+
+            Jobs.append([Rcvr, Jd, Size])
+
+    # Stable sort: equal sizes keep the serial order
+    Jobs.sort(key=lambda Job: -Job[2])
+
+    return Jobs
+
+# End of listPreproJobs()
+
+def runPreproJob(Scen, Conf, Rcvr, RcvrPos, Jd, Resume=False, Force=False):
+
+    # Purpose: run one (receiver, day) job in a worker process,
+    #          keeping its console output to be displayed at once
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Jd: int
+    #     Julian Day
+    # Resume: bool
+    #         Resume the day from its checkpoint, if any
+    # Force: bool
+    #        Process the day even if it is up to date
+
+    # Returns
+    # =======
+    # Output: str
+    #         Console output of the job
+    # Errors: str
+    #         Error output of the job, with the traceback if it failed
+    # Failed: bool
+    #         True if the job raised an exception
+
+    Output = io.StringIO()
+    Errors = io.StringIO()
+    Failed = False
+
+    with redirect_stdout(Output), redirect_stderr(Errors):
+        try:
+            processPreproDay(Scen, Conf, Rcvr, RcvrPos, Jd, Resume, Force)
+
+        except BaseException:
+            Failed = True
+            sys.stderr.write(traceback.format_exc())
+
+    return Output.getvalue(), Errors.getvalue(), Failed
+
+# End of runPreproJob()
+
+def runPreproJobs(Scen, Conf, RcvrInfo, NJobs, Resume=False, Force=False):
+
+    # Purpose: run all the (receiver, day) jobs of the scenario on a
+    #          pool of NJobs processes. The console output of every
+    #          job is displayed at once when it finishes.
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # RcvrInfo: dict
+    #           Receivers information
+    # NJobs: int
+    #        Number of processes
+    # Resume: bool
+    #         Resume the days from their checkpoints, if any
+    # Force: bool
+    #        Process the days even if they are up to date
+
+    # Returns
+    # =======
+    # NFailed: int
+    #          Number of jobs failed
+
+    Jobs = listPreproJobs(Scen, Conf, RcvrInfo)
+
+    # Forked, as Petrus main body cannot be imported again
+    Context = None
+    if "fork" in get_all_start_methods():
+        checkForkSafe("Job processes")
+        Context = get_context("fork")
+
+    NFailed = 0
+    with ProcessPoolExecutor(max_workers=min(NJobs, len(Jobs)), mp_context=Context) as Pool:
+        Futures = OrderedDict({})
+        for Rcvr, Jd, Size in Jobs:
+            Future = Pool.submit(runPreproJob, Scen, Conf, Rcvr, RcvrInfo[Rcvr], Jd,
+                Resume, Force)
+            Futures[Future] = [Rcvr, Jd]
+
+        for NDone, Future in enumerate(as_completed(Futures), 1):
+            Rcvr, Jd = Futures[Future]
+            ObsFile, Year, Doy = getObsFile(Scen, Rcvr, Jd)
+            try:
+                Output, Errors, Failed = Future.result()
+
+            except BaseException:
+                Output, Errors, Failed = "", traceback.format_exc(), True
+
+            # Display the job output as one block
+            sys.stdout.write("\n***-----------------------------***\n" \
+                "*** Job %d/%d: receiver %s, Day of Year %d%s ***\n" \
+                "***-----------------------------***\n%s" %
+                (NDone, len(Jobs), Rcvr, Doy, " FAILED" if Failed else "", Output))
+            sys.stdout.flush()
+
+            if len(Errors) > 0:
+                sys.stderr.write(Errors)
+                sys.stderr.flush()
+
+            if Failed:
+                NFailed = NFailed + 1
+
+    return NFailed
+
+# End of runPreproJobs()
+
+# Real-time modes
+#----------------------------------------------------------------------
+
+# Seconds between reports of the stream counters
+STREAM_REPORT = 10.0
+
+def initLatencyStats():
+
+    # Function initializing the processing latency statistics of the
+    # epochs of a day: number of epochs, sum and maximum [s]
+
+    LatencyStats = OrderedDict({})
+    LatencyStats["NEPOCHS"] = 0
+    LatencyStats["SUM"] = 0.0
+    LatencyStats["MAX"] = 0.0
+
+    return LatencyStats
+
+def updateLatencyStats(LatencyStats, Latency):
+
+    # Function adding the latency of one epoch [s] to the statistics
+
+    LatencyStats["NEPOCHS"] = LatencyStats["NEPOCHS"] + 1
+    LatencyStats["SUM"] = LatencyStats["SUM"] + Latency
+    LatencyStats["MAX"] = max(LatencyStats["MAX"], Latency)
+
+def reportLatencyStats(LatencyStats):
+
+    # Function displaying the processing latency statistics of a day
+
+    if LatencyStats["NEPOCHS"] > 0:
+        print("INFO: %d epochs processed, latency mean %.1f ms, max %.1f ms" %
+        (LatencyStats["NEPOCHS"], 1000.0 * LatencyStats["SUM"] / LatencyStats["NEPOCHS"],
+        1000.0 * LatencyStats["MAX"]))
+
+# Load shedding levels, from the least to the most degrading (see
+# SHED_LAG)
+ShedLevels = OrderedDict({})
+ShedLevels["NONE"] = 0
+ShedLevels["FLUSH"] = 1
+ShedLevels["OPTIONAL"] = 2
+ShedLevels["DECIMATE"] = 3
+ShedLevels["NOWRITE"] = 4
+
+# Load shed at every level
+ShedActions = [
+    "none",
+    "outputs not flushed every epoch",
+    "VTEC Rate and iAATR not computed",
+    "epochs decimated",
+    "epochs not written to outputs",
+]
+
+def initShedStats(Rcvr):
+
+    # Purpose: initialize the load shedding state and counters of a
+    #          receiver in real-time modes
+
+    # Parameters
+    # ==========
+    # Rcvr: str
+    #       Receiver acronym
+
+    # Returns
+    # =======
+    # ShedStats: dict
+    #            Receiver, current level, number of level changes,
+    #            epochs processed at every level, epochs dropped by the
+    #            decimation, maximum lag [s] and epochs counter
+
+    ShedStats = OrderedDict({})
+    ShedStats["RCVR"] = Rcvr
+    ShedStats["LEVEL"] = ShedLevels["NONE"]
+    ShedStats["CHANGES"] = 0
+    ShedStats["EPOCHS"] = [0] * len(ShedLevels)
+    ShedStats["DROPPED"] = 0
+    ShedStats["MAXLAG"] = 0.0
+    ShedStats["COUNT"] = 0
+
+    return ShedStats
+
+# End of initShedStats()
+
+def updateShedLevel(Conf, ShedStats, Lag):
+
+    # Purpose: update the load shedding level from the lag of the
+    #          epochs. The level increases while the lag is above the
+    #          threshold of the next level and decreases when it is
+    #          below half the threshold of the current level. Every
+    #          change is logged and counted
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # ShedStats: dict
+    #            Load shedding state (see initShedStats), updated
+    # Lag: float
+    #      Time since the epoch to be processed was completed [s]
+
+    # Returns
+    # =======
+    # Level: int
+    #        Load shedding level (see ShedLevels)
+
+    ShedStats["MAXLAG"] = max(ShedStats["MAXLAG"], Lag)
+    if int(Conf["SHED_LAG"][0]) != 1:
+        return ShedStats["LEVEL"]
+
+    Thresholds = Conf["SHED_LAG"][1:]
+    Level = ShedStats["LEVEL"]
+    while Level < ShedLevels["NOWRITE"] and Lag > Thresholds[Level]:
+        Level = Level + 1
+    while Level > ShedLevels["NONE"] and Lag < Thresholds[Level - 1] / 2:
+        Level = Level - 1
+
+    if Level != ShedStats["LEVEL"]:
+        ShedStats["CHANGES"] = ShedStats["CHANGES"] + 1
+        sys.stderr.write("WARNING: %s: lag %.2f s, load shedding level %d -> %d: %s\n" %
+        (ShedStats["RCVR"], Lag, ShedStats["LEVEL"], Level, ", ".join(ShedActions[1:Level + 1]) \
+            if Level > ShedLevels["NONE"] else "none"))
+        ShedStats["LEVEL"] = Level
+
+    return Level
+
+# End of updateShedLevel()
+
+def isShedEpochDropped(Conf, ShedStats):
+
+    # Function counting an epoch at the current shedding level and
+    # checking if the decimation drops it (one epoch of
+    # SHED_DECIMATION is kept from level DECIMATE)
+
+    ShedStats["COUNT"] = ShedStats["COUNT"] + 1
+    if ShedStats["LEVEL"] >= ShedLevels["DECIMATE"] and \
+        ShedStats["COUNT"] % int(Conf["SHED_DECIMATION"]) != 0:
+        ShedStats["DROPPED"] = ShedStats["DROPPED"] + 1
+        return True
+
+    ShedStats["EPOCHS"][ShedStats["LEVEL"]] = ShedStats["EPOCHS"][ShedStats["LEVEL"]] + 1
+
+    return False
+
+def reportShedStats(ShedStats):
+
+    # Function displaying the load shedding counters of a receiver
+
+    print("INFO: %s: load shedding: max lag %.2f s, %d level changes, epochs per level "\
+        "%s, %d dropped" % (ShedStats["RCVR"], ShedStats["MAXLAG"], ShedStats["CHANGES"],
+    "/".join(str(NEpochs) for NEpochs in ShedStats["EPOCHS"]), ShedStats["DROPPED"]))
+
+def closeLiveDay(Conf, PreproOut, PrevPreproObsInfo, LatencyStats, PlotQueue):
+
+    # Function completing the outputs and plots of a day processed in
+    # real time, and carrying the state over midnight if CONTINUOUS
+
+    reportLatencyStats(LatencyStats)
+
+    if Conf["CONTINUOUS"] == 1:
+        shiftPrevPreproObsInfo(PrevPreproObsInfo)
+
+    if PreproOut is not None:
+        PreproObsFile, PreproObsData = closePreproOutputs(PreproOut)
+        plotPreproDay(PlotQueue, PreproObsFile, PreproObsData)
+
+def openLivePlots(PreproOut):
+
+    # Function starting the live figures of a day processed in real
+    # time, from its PREPRO outputs (see initLivePlots)
+
+    if PreproOut is None:
+        return None
+
+    return initLivePlots(PreproOut["PATH"], PreproOut["TABLE"])
+
+def processLiveEpoch(Conf, RcvrPos, ObsInfo, PrevPreproObsInfo, FilterStats, PreproOut,
+    LatencyStats, ShedStats=None, Lag=0.0, LivePlots=None):
+
+    # Purpose: preprocess one epoch received in real time and write it
+    #          to the PREPRO outputs straight away
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # ObsInfo: list
+    #          OBS lines of the epoch
+    # PrevPreproObsInfo: dict
+    #                    Preprocessed observations for previous epoch
+    #                    per sat, updated
+    # FilterStats: dict
+    #              OBS reader filters statistics
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs), None if
+    #            not requested
+    # LatencyStats: dict
+    #               Processing latency statistics, updated
+    # ShedStats: dict
+    #            Load shedding state (see initShedStats), updated,
+    #            None not to shed load
+    # Lag: float
+    #      Time since the epoch was completed [s]
+    # LivePlots: dict
+    #            Live figures of the day (see initLivePlots), updated,
+    #            None if not requested
+
+    # Returns
+    # =======
+    # Nothing
+
+    Start = time.time()
+
+    Level = ShedLevels["NONE"]
+    if ShedStats is not None:
+        Level = updateShedLevel(Conf, ShedStats, Lag)
+
+        # The satellites masked in a dropped epoch are flagged with
+        # the next epoch preprocessed
+        if isShedEpochDropped(Conf, ShedStats):
+            return
+
+    # Preprocess OBS measurements
+    PreproObsInfo = runPreProcMeas(Conf, RcvrPos, ObsInfo, PrevPreproObsInfo,
+        FilterStats["MASKED"], Level < ShedLevels["OPTIONAL"])
+    del FilterStats["MASKED"][:]
+
+    # Write the epoch straight away
+    if PreproOut is not None and Level < ShedLevels["NOWRITE"]:
+        generatePreproOutputs(PreproOut, PreproObsInfo)
+        if Level < ShedLevels["FLUSH"]:
+            flushPreproOutputs(PreproOut)
+
+            # Figures are refreshed only when not shedding load, the
+            # epochs skipped are drawn with the next refresh
+            updateLivePlots(LivePlots)
+
+    Latency = time.time() - Start
+    updateLatencyStats(LatencyStats, Latency)
+
+    print("INFO: SoD %d: %d satellites, latency %.1f ms" %
+    (float(ObsInfo[0][ObsIdx["SOD"]]), len(PreproObsInfo), 1000.0 * Latency))
+    sys.stdout.flush()
+
+# End of processLiveEpoch()
+
+def runPreproTail(Scen, Conf, Rcvr, RcvrPos, PlotQueue=None):
+
+    # Purpose: real-time mode: follow the OBS files of a receiver while
+    #          they are being written, from INI_DATE to END_DATE, and
+    #          write every epoch to the PREPRO outputs as soon as it is
+    #          complete. A day ends when the OBS file of the next day
+    #          appears
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # PlotQueue: dict
+    #            Background plot process (see startPreproPlotQueue),
+    #            None to generate the plots at the end of every day
+
+    # Returns
+    # =======
+    # Nothing
+
+    PrevPreproObsInfo = None
+
+    # Loop over Julian Days in simulation
+    #-----------------------------------------------------------------------
+    for Jd in range(Conf["INI_DATE_JD"], Conf["END_DATE_JD"] + 1):
+        ObsFile, Year, Doy = getObsFile(Scen, Rcvr, Jd)
+        NextObsFile = getObsFile(Scen, Rcvr, Jd + 1)[0]
+
+        # Display Message
+        print( '\n*** Following Day of Year: ' + str(Doy) + ' ... ***')
+        sys.stdout.flush()
+
+        # If Preprocessing outputs are activated
+        PreproOut = None
+        if Conf["PREPRO_OUT"] == 1:
+            PreproOut = openPreproOutputs(Scen, Conf, Rcvr, Year, Doy)
+        LivePlots = openLivePlots(PreproOut)
+
+        # The state is carried over midnight if CONTINUOUS
+        if PrevPreproObsInfo is None or Conf["CONTINUOUS"] == 0:
+            PrevPreproObsInfo = initPrevPreproObsInfo(Conf)
+
+        ObsFilter = buildObsFilter(Conf, RcvrPos)
+        FilterStats = initObsFilterStats()
+
+        LatencyStats = initLatencyStats()
+
+        # LOOP over the epochs as they are written
+        # ----------------------------------------------------------
+        for ObsInfo in tailObsEpochs(ObsFile, NextObsFile, Conf["TAIL_POLL"],
+            Conf["OBS_WINDOW"], ObsFilter, FilterStats):
+            processLiveEpoch(Conf, RcvrPos, ObsInfo, PrevPreproObsInfo, FilterStats,
+                PreproOut, LatencyStats, LivePlots=LivePlots)
+
+        # Complete the outputs and plots of the day
+        closeLiveDay(Conf, PreproOut, PrevPreproObsInfo, LatencyStats, PlotQueue)
+
+    # End of JD loop
+
+# End of runPreproTail()
+
+def reportStreamStats(StreamStats, Elapsed, LinesBefore, EpochsBefore):
+
+    # Function displaying the stream counters, with the throughput
+    # since the previous report
+
+    print("INFO: Stream: %d connections (%d open), %d lines, %d epochs, "\
+        "%.1f lines/s, %.1f epochs/s, %d lines queued, %d late, %d malformed" %
+    (StreamStats["CONNECTIONS"], StreamStats["OPEN"], StreamStats["LINES"],
+    StreamStats["EPOCHS"], (StreamStats["LINES"] - LinesBefore) / Elapsed,
+    (StreamStats["EPOCHS"] - EpochsBefore) / Elapsed, StreamStats["QUEUE"],
+    StreamStats["LATE"], StreamStats["BAD"]))
+    sys.stdout.flush()
+
+def runPreproStream(Scen, Conf, Rcvr, RcvrPos, Address, PlotQueue=None):
+
+    # Purpose: real-time mode: preprocess the OBS lines of a receiver
+    #          received over local sockets, writing every epoch to the
+    #          PREPRO outputs as soon as it is complete. The outputs of
+    #          a day are completed when the first epoch of the next day
+    #          arrives or the stream ends
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: str
+    #       Receiver acronym
+    # RcvrPos: list
+    #          Receiver information: position, masking angle...
+    # Address: str
+    #          HOST:PORT for TCP, path for Unix-domain sockets
+    # PlotQueue: dict
+    #            Background plot process (see startPreproPlotQueue),
+    #            None to generate the plots at the end of every day
+
+    # Returns
+    # =======
+    # StreamStats: dict
+    #              Stream counters (see initStreamStats)
+
+    StreamStats = initStreamStats()
+    ObsFilter = buildObsFilter(Conf, RcvrPos)
+    FilterStats = initObsFilterStats()
+
+    Day = None
+    PreproOut = None
+    LivePlots = None
+    PrevPreproObsInfo = None
+    LatencyStats = initLatencyStats()
+    ShedStats = initShedStats(Rcvr)
+
+    # Throughput since the previous report
+    ReportTime = time.time()
+    ReportLines = 0
+    ReportEpochs = 0
+
+    # LOOP over the epochs as they are received
+    # ----------------------------------------------------------
+    for ObsInfo in streamObsEpochs(Address, Conf["STREAM_DEPTH"], Conf["STREAM_IDLE"],
+        Conf["STREAM_STALE"], StreamStats, Conf["OBS_WINDOW"], ObsFilter, FilterStats):
+        Year = int(ObsInfo[0][ObsIdx["YEAR"]])
+        Doy = int(ObsInfo[0][ObsIdx["DOY"]])
+
+        # New day
+        if [Year, Doy] != Day:
+            if Day is not None:
+                closeLiveDay(Conf, PreproOut, PrevPreproObsInfo, LatencyStats, PlotQueue)
+
+            Day = [Year, Doy]
+
+            # Display Message
+            print( '\n*** Streaming Day of Year: ' + str(Doy) + ' ... ***')
+
+            PreproOut = None
+            if Conf["PREPRO_OUT"] == 1:
+                PreproOut = openPreproOutputs(Scen, Conf, Rcvr, Year, Doy)
+            LivePlots = openLivePlots(PreproOut)
+
+            # The state is carried over midnight if CONTINUOUS
+            if PrevPreproObsInfo is None or Conf["CONTINUOUS"] == 0:
+                PrevPreproObsInfo = initPrevPreproObsInfo(Conf)
+
+            LatencyStats = initLatencyStats()
+
+        processLiveEpoch(Conf, RcvrPos, ObsInfo, PrevPreproObsInfo, FilterStats,
+            PreproOut, LatencyStats, ShedStats, time.time() - StreamStats["ARRIVAL"],
+            LivePlots)
+
+        # Report the stream counters
+        if time.time() - ReportTime >= STREAM_REPORT:
+            reportStreamStats(StreamStats, time.time() - ReportTime, ReportLines, ReportEpochs)
+            ReportTime = time.time()
+            ReportLines = StreamStats["LINES"]
+            ReportEpochs = StreamStats["EPOCHS"]
+
+    # End of for ObsInfo in streamObsEpochs():
+
+    if Day is not None:
+        closeLiveDay(Conf, PreproOut, PrevPreproObsInfo, LatencyStats, PlotQueue)
+
+    reportStreamStats(StreamStats, max(time.time() - ReportTime, 1e-3), ReportLines,
+        ReportEpochs)
+    reportShedStats(ShedStats)
+
+    return StreamStats
+
+# End of runPreproStream()
+
+# Batch mode job queue
+#----------------------------------------------------------------------
+# The queue lives in the OUT/JOBS folder of the scenario, shared by all
+# the nodes. Every (receiver, day) job is a file named RCVR_JD that is
+# moved with atomic renames between the folders:
+#   ALL:     jobs ever queued (only the node creating the entry queues
+#            the job)
+#   TODO:    jobs waiting for a node
+#   CLAIMED: jobs being processed, as RCVR_JD@NODE. The node touches
+#            the file every JOB_HEARTBEAT seconds, and the claims
+#            without heartbeat for JOB_TIMEOUT seconds go back to TODO.
+#            A node whose claim is gone stops the job, and the text
+#            file of a job is written at once when it is finished, so
+#            a job processed again by another node is never mixed up
+#   DONE:    jobs finished, holding their manifest record
+#   FAILED:  jobs failed, holding their manifest record
+# MANIFEST.txt gathers the records of DONE and FAILED jobs.
+# Jobs are queued once: to run a new campaign on the same scenario,
+# the finished jobs are queued again with --requeue (or --force, which
+# also processes them even if up to date) given to the first node only.
+# A job queued again with --force holds FORCE in its TODO file.
+
+JobDirs = ["ALL", "TODO", "CLAIMED", "DONE", "FAILED"]
+JobManifestHdr = "#JOB         NODE                      STATUS START               END                 ELAPSED PREPRO_FILE\n"
+JobManifestFmt = "%-12s %-25s %-6s %-19s %-19s %7.1f %s\n"
+
+def getJobsDir(Scen):
+
+    # Function returning the path to the job queue of the scenario
+
+    return Scen + '/OUT/JOBS'
+
+def getJobName(Rcvr, Jd):
+
+    # Function returning the job name of a receiver and day
+
+    return "%s_%d" % (Rcvr, Jd)
+
+def getNodeId():
+
+    # Function returning the default node name: host and process
+
+    return "%s.%d" % (socket.gethostname().split('.')[0], os.getpid())
+
+def initJobQueue(Scen, Jobs, Requeue=False, Force=False):
+
+    # Purpose: create the job queue of the scenario, if needed, and
+    #          queue the jobs not queued yet by any node, and the jobs
+    #          finished if requested
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Jobs: list
+    #       Jobs as [Rcvr, Jd, Size] (see listPreproJobs)
+    # Requeue: bool
+    #          Queue again the jobs finished (DONE or FAILED)
+    # Force: bool
+    #        Queue again the jobs finished, to be processed even if
+    #        they are up to date
+
+    # Returns
+    # =======
+    # JobsDir: str
+    #          Path to the job queue
+
+    JobsDir = getJobsDir(Scen)
+    for Dir in JobDirs:
+        os.makedirs(JobsDir + '/' + Dir, exist_ok=True)
+
+    for Rcvr, Jd, Size in Jobs:
+        Job = getJobName(Rcvr, Jd)
+        try:
+            # Only one node can create the entry of a job
+            os.close(os.open(JobsDir + '/ALL/' + Job, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+
+        except FileExistsError:
+            if Requeue or Force:
+                requeueJob(JobsDir, Job, Force)
+            continue
+
+        open(JobsDir + '/TODO/' + Job, 'w').close()
+
+    return JobsDir
+
+# End of initJobQueue()
+
+def requeueJob(JobsDir, Job, Force):
+
+    # Function queuing again a finished job. The TODO file is written
+    # first under another name, so that the job is claimed with it
+
+    TmpFile = JobsDir + '/TODO/.%s.%s' % (Job, getNodeId())
+    with open(TmpFile, 'w') as fjob:
+        fjob.write("FORCE\n" if Force else "")
+
+    for Dir in ["DONE", "FAILED"]:
+        try:
+            # Only one node can remove the finished job
+            os.remove(JobsDir + '/' + Dir + '/' + Job)
+
+        except FileNotFoundError:
+            continue
+
+        os.rename(TmpFile, JobsDir + '/TODO/' + Job)
+        return
+
+    os.remove(TmpFile)
+
+def claimJob(JobsDir, Job, NodeId):
+
+    # Function claiming a job for the node. Returns the path to the
+    # claim file and whether the job must be processed even if up to
+    # date, or None if the job is not waiting in the queue
+
+    Claim = JobsDir + '/CLAIMED/' + Job + '@' + NodeId
+    try:
+        os.rename(JobsDir + '/TODO/' + Job, Claim)
+
+    except FileNotFoundError:
+        return None, False
+
+    # The manifest record is appended to the claim file
+    with open(Claim, 'r+') as fclaim:
+        Force = fclaim.read() == "FORCE\n"
+        fclaim.truncate(0)
+
+    # Start the heartbeats from the claim time
+    os.utime(Claim)
+
+    return Claim, Force
+
+def checkJobClaim(Claim):
+
+    # Function stopping a batch job whose claim is lost: it expired,
+    # and another node may be processing the job
+
+    if Claim is not None and not os.path.exists(Claim):
+        raise IOError("Claim lost: %s" % Claim)
+
+def readJobEpochs(ObsEpochs, Claim):
+
+    # Function yielding the OBS epochs of a batch job while its claim
+    # is held (see checkJobClaim)
+
+    for ObsInfo in ObsEpochs:
+        checkJobClaim(Claim)
+        yield ObsInfo
+
+def expireJobClaims(JobsDir, Timeout):
+
+    # Function giving back to the queue the claims without heartbeat
+    # for Timeout seconds. Returns the list of expired claims
+
+    Expired = []
+    Now = time.time()
+    for Claim in sorted(os.listdir(JobsDir + '/CLAIMED')):
+        try:
+            if Now - os.stat(JobsDir + '/CLAIMED/' + Claim).st_mtime < Timeout:
+                continue
+
+            os.rename(JobsDir + '/CLAIMED/' + Claim,
+                JobsDir + '/TODO/' + Claim.split('@')[0])
+
+        except FileNotFoundError:
+            # Finished, or expired by another node
+            continue
+
+        Expired.append(Claim)
+
+    return Expired
+
+def runJobHeartbeat(Claim, Period, Stop):
+
+    # Function touching the claim file every Period seconds until
+    # Stop is set or the claim is lost
+
+    while not Stop.wait(Period):
+        try:
+            os.utime(Claim)
+
+        except FileNotFoundError:
+            break
+
+def finishJob(JobsDir, Claim, Job, Failed, Record):
+
+    # Function moving a claimed job to DONE (or FAILED) with its
+    # manifest record. Returns False if the claim was lost
+
+    try:
+        # Append the record only if the claim still exists
+        fclaim = os.open(Claim, os.O_WRONLY | os.O_APPEND)
+        os.write(fclaim, Record.encode())
+        os.close(fclaim)
+
+        os.rename(Claim, JobsDir + ('/FAILED/' if Failed else '/DONE/') + Job)
+
+    except FileNotFoundError:
+        return False
+
+    return True
+
+def writeJobManifest(JobsDir):
+
+    # Purpose: write the manifest of the finished jobs of the queue
+
+    # Parameters
+    # ==========
+    # JobsDir: str
+    #          Path to the job queue
+
+    # Returns
+    # =======
+    # Nothing
+
+    Records = []
+    for Dir in ["DONE", "FAILED"]:
+        for Job in os.listdir(JobsDir + '/' + Dir):
+            try:
+                with open(JobsDir + '/' + Dir + '/' + Job, 'r') as fjob:
+                    Records.append(fjob.read())
+
+            except FileNotFoundError:
+                continue
+
+    Records.sort()
+
+    # Replace the manifest at once, as other nodes may write it too
+    TmpFile = JobsDir + '/MANIFEST.txt.%s' % getNodeId()
+    with open(TmpFile, 'w') as fmanifest:
+        fmanifest.write(JobManifestHdr)
+        fmanifest.writelines(Records)
+
+    os.replace(TmpFile, JobsDir + '/MANIFEST.txt')
+
+# End of writeJobManifest()
+
+def runPreproBatch(Scen, Conf, RcvrInfo, NodeId=None, Resume=False, Force=False,
+    Requeue=False):
+
+    # Purpose: process the jobs of the scenario queue until all of them
+    #          are finished, together with any other node running on
+    #          the same scenario
+
+    # Parameters
+    # ==========
+    # Scen: str
+    #       Path to scenario
+    # Conf: dict
+    #       Configuration dictionary
+    # RcvrInfo: dict
+    #           Receivers information
+    # NodeId: str
+    #         Node name in the queue (host and process if None)
+    # Resume: bool
+    #         Resume the days from their checkpoints, if any
+    # Force: bool
+    #        Queue again the jobs finished, and process the days even
+    #        if they are up to date
+    # Requeue: bool
+    #          Queue again the jobs finished
+
+    # Returns
+    # =======
+    # NDone: int
+    #        Number of jobs processed by this node
+    # NFailed: int
+    #          Number of jobs failed in this node
+
+    if NodeId is None:
+        NodeId = getNodeId()
+
+    Jobs = listPreproJobs(Scen, Conf, RcvrInfo)
+    JobsDir = initJobQueue(Scen, Jobs, Requeue, Force)
+
+    print("INFO: Node %s processing job queue: %s..." % (NodeId, JobsDir))
+
+    NDone = 0
+    NFailed = 0
+    while True:
+        # Give back the jobs of nodes without heartbeat
+        for Claim in expireJobClaims(JobsDir, Conf["JOB_TIMEOUT"]):
+            sys.stderr.write("WARNING: Claim expired, job queued again: %s\n" % Claim)
+
+        # Claim the largest job waiting
+        Claim = None
+        for Rcvr, Jd, Size in Jobs:
+            Job = getJobName(Rcvr, Jd)
+            Claim, JobForce = claimJob(JobsDir, Job, NodeId)
+            if Claim is not None:
+                break
+
+        if Claim is None:
+            # Finished if no job is waiting or being processed by
+            # other nodes
+            JobNames = set([getJobName(Rcvr, Jd) for Rcvr, Jd, Size in Jobs])
+            Pending = os.listdir(JobsDir + '/TODO') + \
+                [Claim.split('@')[0] for Claim in os.listdir(JobsDir + '/CLAIMED')]
+            if len(JobNames.intersection(Pending)) == 0:
+                break
+
+            # Wait for them to finish, or to expire
+            time.sleep(Conf["JOB_HEARTBEAT"])
+            continue
+
+        # Display Message
+        print( '\n***-----------------------------***')
+        print( '*** Job %s: receiver %s, Day of Year %d ***' %
+        (Job, Rcvr, getObsFile(Scen, Rcvr, Jd)[2]))
+        print( '***-----------------------------***')
+
+        # Keep the claim alive while processing
+        Stop = threading.Event()
+        Heartbeat = threading.Thread(target=runJobHeartbeat,
+            args=(Claim, Conf["JOB_HEARTBEAT"], Stop), daemon=True)
+        Heartbeat.start()
+
+        Start = time.time()
+        Failed = False
+        Skipped = False
+        PreproObsFile = None
+        try:
+            PreproObsFile, Skipped = processPreproDay(Scen, Conf, Rcvr, RcvrInfo[Rcvr], Jd,
+                Resume, Force or JobForce, Claim)
+
+        except Exception:
+            Failed = True
+            if os.path.exists(Claim):
+                sys.stderr.write("ERROR: Job %s failed\n%s" % (Job, traceback.format_exc()))
+
+        End = time.time()
+        Stop.set()
+        Heartbeat.join()
+
+        # Stopped as the claim expired, the job belongs to another
+        # node now
+        if not os.path.exists(Claim):
+            sys.stderr.write("WARNING: Claim of job %s lost, job left to another node\n" %
+            Job)
+            continue
+
+        # Record the job in the manifest
+        Status = "DONE"
+        if Failed:
+            Status = "FAILED"
+        elif Skipped:
+            Status = "SKIP"
+
+        Record = JobManifestFmt % (Job, NodeId, Status,
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(Start)),
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(End)),
+            End - Start, PreproObsFile if PreproObsFile is not None else "-")
+
+        if not finishJob(JobsDir, Claim, Job, Failed, Record):
+            sys.stderr.write("WARNING: Claim of job %s lost, "\
+                "it may be processed again by another node\n" % Job)
+
+        if Failed:
+            NFailed = NFailed + 1
+        else:
+            NDone = NDone + 1
+
+    # End of while True:
+
+    writeJobManifest(JobsDir)
+
+    print("\nINFO: Node %s finished: %d jobs done, %d failed" % (NodeId, NDone, NFailed))
+
+    return NDone, NFailed
+
+# End of runPreproBatch()
+
+########################################################################
+# End of PetrusJobs.py
+########################################################################
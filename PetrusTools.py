@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+
+########################################################################
+# PetrusTools.py:
+# This is the Tools Module of PETRUS tool
+#
+#  Project:        PETRUS
+#  File:           PetrusTools.py
+#  Date(YY/MM/DD): 01/02/21
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+# -----------------------------------------------------------------
+# Date       | Author             | Action
+# -----------------------------------------------------------------
+#
+# Usage:
+# PetrusTools.py index $SCEN_PATH
+# PetrusTools.py warm $SCEN_PATH [NWORKERS]
+# PetrusTools.py totxt $SCEN_PATH
+# PetrusTools.py send ADDRESS OBS_FILE [RATE]
+########################################################################
+
+import sys, os
+import time
+import socket
+import inspect
+from glob import glob
+
+# Update Path to reach COMMON
+Common = os.path.dirname(
+    os.path.abspath(sys.argv[0])) + '/COMMON'
+sys.path.insert(0, Common)
+
+# Import External and Internal functions and Libraries
+#----------------------------------------------------------------------
+from InputOutput import readConf
+from InputOutput import processConf
+from InputOutput import readObsIndex
+from InputOutput import getObsCacheDir
+from InputOutput import warmObsCache
+from InputOutput import readPreproBinFile
+from InputOutput import formatPreproBlock
+from InputOutput import PreproHdr
+from InputOutput import openInputFile
+from InputOutput import splitLine
+from InputOutput import ObsIdx
+from Stream import getStreamAddress
+
+#----------------------------------------------------------------------
+# INTERNAL FUNCTIONS
+#----------------------------------------------------------------------
+
+def displayUsage():
+    sys.stderr.write("ERROR: Please provide a tool and the path to SCENARIO:\n")
+    sys.stderr.write("       index $SCEN_PATH: build OBS epochs index files\n")
+    sys.stderr.write("       warm $SCEN_PATH [NWORKERS]: store OBS files in binary cache\n")
+    sys.stderr.write("       totxt $SCEN_PATH: convert binary PREPRO OBS files to text\n")
+    sys.stderr.write("       send ADDRESS OBS_FILE [RATE]: replay an OBS file to Petrus.py --stream\n")
+    sys.stderr.write("            at RATE epochs per second (default 0: as fast as possible)\n")
+
+def listObsFiles(Scen):
+
+    # Function returning the OBS files of the scenario
+
+    return sorted(f for f in glob(Scen + '/INP/OBS/OBS_*') \
+        if not f.endswith(".idx"))
+
+def runIndex(Scen):
+
+    # Function building the epochs index of every OBS file and
+    # reporting malformed and out-of-order epochs
+
+    NErrors = 0
+    for ObsFile in listObsFiles(Scen):
+        ObsIndex = readObsIndex(ObsFile)
+
+        # Display Message
+        print("INFO: %s: %d epochs, %d lines" %
+        (ObsFile, len(ObsIndex["SOD"]), sum(ObsIndex["NSATS"])))
+
+        for Error in ObsIndex["ERRORS"]:
+            sys.stderr.write("WARNING: %s: %s\n" % (ObsFile, Error))
+
+        NErrors = NErrors + len(ObsIndex["ERRORS"])
+
+    return NErrors
+
+def runWarm(Scen, NWorkers=None):
+
+    # Function storing every OBS file of the scenario in the binary cache
+
+    # Read and process conf file to get the cache settings
+    Conf = processConf(readConf(Scen + '/CFG/petrus.cfg'))
+    CacheDir = getObsCacheDir(Scen, Conf)
+
+    if NWorkers is not None:
+        NWorkers = int(NWorkers)
+
+    ObsFiles = listObsFiles(Scen)
+    NCached = warmObsCache(ObsFiles, CacheDir, Conf["OBS_CACHE_SIZE"], NWorkers)
+
+    # Display Message
+    print("INFO: %d OBS files cached in %s (%d already there)" %
+    (NCached, CacheDir, len(ObsFiles) - NCached))
+
+    return 0
+
+def runToTxt(Scen):
+
+    # Function converting every binary PREPRO OBS file of the scenario
+    # to the text format
+
+    for PreproBinFile in sorted(glob(Scen + '/OUT/PPVE/PREPRO_OBS_*.bin')):
+        Hdr, PreproData = readPreproBinFile(PreproBinFile)
+        PreproData["CONST"] = PreproData["CONST"].astype("U1")
+
+        PreproObsFile = PreproBinFile[:-len(".bin")] + ".dat"
+        with open(PreproObsFile, 'w') as f:
+            f.write(PreproHdr)
+            f.write(formatPreproBlock(PreproData))
+
+        # Display Message
+        print("INFO: %s: %d lines" % (PreproObsFile, Hdr["NROWS"]))
+
+    return 0
+
+def runSend(Address, ObsFile, Rate="0"):
+
+    # Function replaying an OBS file to a Petrus.py --stream process,
+    # one epoch at a time at Rate epochs per second
+
+    Rate = float(Rate)
+    Family, SockAddr = getStreamAddress(Address)
+
+    NEpochs = 0
+    NLines = 0
+    Start = time.time()
+    with socket.socket(Family, socket.SOCK_STREAM) as Sock, openInputFile(ObsFile) as f:
+        Sock.connect(SockAddr)
+
+        Sod = None
+        Epoch = []
+        for Line in f:
+            LineSplit = splitLine(Line)
+
+            # Skip blank and header lines
+            if len(LineSplit) == 0 or LineSplit[0].startswith('#'):
+                continue
+
+            # Send the previous epoch when a new one starts
+            if LineSplit[ObsIdx["SOD"]] != Sod and len(Epoch) > 0:
+                Sock.sendall("".join(Epoch).encode())
+                NEpochs = NEpochs + 1
+                Epoch = []
+
+                # Pace the epochs
+                if Rate > 0:
+                    Delay = Start + NEpochs / Rate - time.time()
+                    if Delay > 0:
+                        time.sleep(Delay)
+
+            Sod = LineSplit[ObsIdx["SOD"]]
+            Epoch.append(Line if Line.endswith("\n") else Line + "\n")
+            NLines = NLines + 1
+
+        if len(Epoch) > 0:
+            Sock.sendall("".join(Epoch).encode())
+            NEpochs = NEpochs + 1
+
+    Elapsed = max(time.time() - Start, 1e-3)
+
+    # Display Message
+    print("INFO: %s: %d epochs, %d lines sent to %s in %.1f s (%.1f epochs/s)" %
+    (ObsFile, NEpochs, NLines, Address, Elapsed, NEpochs / Elapsed))
+
+    return 0
+
+#######################################################
+# MAIN BODY
+#######################################################
+
+if __name__ == "__main__":
+    Tools = {
+        "index": runIndex,
+        "warm": runWarm,
+        "totxt": runToTxt,
+        "send": runSend,
+    }
+
+    # Check InputOutput Arguments
+    if len(sys.argv) < 3 or sys.argv[1] not in Tools:
+        displayUsage()
+        sys.exit(-1)
+
+    # Check the number of arguments of the tool
+    try:
+        inspect.signature(Tools[sys.argv[1]]).bind(*sys.argv[2:])
+
+    except TypeError:
+        displayUsage()
+        sys.exit(-1)
+
+    # Run the tool
+    NErrors = Tools[sys.argv[1]](*sys.argv[2:])
+
+    if NErrors > 0:
+        sys.exit(1)
+
+#######################################################
+# End of PetrusTools.py
+#######################################################
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+
+########################################################################
+# PETRUS/SRC/Pipeline.py:
+# This is the Pipeline Module of PETRUS tool
+#
+#  Project:        PETRUS
+#  File:           Pipeline.py
+#  Date(YY/MM/DD): 01/02/21
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+# -----------------------------------------------------------------
+# Date       | Author             | Action
+# -----------------------------------------------------------------
+#
+########################################################################
+
+# Import External and Internal functions and Libraries
+#----------------------------------------------------------------------
+from threading import Thread, Event
+from queue import Queue, Full, Empty
+from InputOutput import generatePreproOutputs
+from Preprocessing import runPreProcMeas
+
+# Pipeline items
+#----------------------------------------------------------------------
+# End of stage marker
+PIPELINE_END = None
+
+# Time between checks of the stop request while a queue is full or
+# empty [s]
+PIPELINE_POLL = 0.1
+
+def putPipelineItem(PipeQueue, Item, Stop):
+
+    # Purpose: put an item in a bounded pipeline queue, waiting while
+    #          it is full unless the pipeline is stopped
+
+    # Parameters
+    # ==========
+    # PipeQueue: Queue
+    #            Pipeline queue
+    # Item: tuple
+    #       Item to be put
+    # Stop: Event
+    #       Pipeline stop request
+
+    # Returns
+    # =======
+    # Done: bool
+    #       False if the pipeline was stopped before putting the item
+
+    while not Stop.is_set():
+        try:
+            PipeQueue.put(Item, timeout=PIPELINE_POLL)
+            return True
+
+        except Full:
+            pass
+
+    return False
+
+# End of putPipelineItem()
+
+def runReadStage(ObsEpochs, MaskedSats, ReadQueue, Stop, Errors):
+
+    # Purpose: reader thread, reading the OBS epochs ahead of the
+    #          preprocessing
+
+    # Parameters
+    # ==========
+    # ObsEpochs: iterator
+    #            OBS epochs (see readObsFileEpochs)
+    # MaskedSats: list
+    #             Satellites removed by the OBS reader below the mask
+    #             angle, consumed here with each epoch
+    # ReadQueue: Queue
+    #            Queue of [ObsInfo, MaskedSats] items
+    # Stop: Event
+    #       Pipeline stop request
+    # Errors: list
+    #         Exceptions raised by the stage
+
+    # Returns
+    # =======
+    # Nothing
+
+    try:
+        for ObsInfo in ObsEpochs:
+            # The satellites masked since the previous epoch travel with
+            # the epoch, as the reader runs ahead of the preprocessing
+            Item = (ObsInfo, list(MaskedSats))
+            del MaskedSats[:]
+
+            if not putPipelineItem(ReadQueue, Item, Stop):
+                return
+
+    except BaseException as Error:
+        Errors.append(Error)
+
+    putPipelineItem(ReadQueue, PIPELINE_END, Stop)
+
+# End of runReadStage()
+
+def runWriteStage(PreproOut, WriteQueue, Stop, Errors):
+
+    # Purpose: writer thread, writing the PREPRO OBS epochs in the order
+    #          they were preprocessed
+
+    # Parameters
+    # ==========
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs)
+    # WriteQueue: Queue
+    #             Queue of PreproObsInfo items
+    # Stop: Event
+    #       Pipeline stop request
+    # Errors: list
+    #         Exceptions raised by the stage
+
+    # Returns
+    # =======
+    # Nothing
+
+    while True:
+        PreproObsInfo = WriteQueue.get()
+        if PreproObsInfo is PIPELINE_END:
+            break
+
+        # Keep draining the queue after an error so that the
+        # preprocessing never blocks on it
+        if len(Errors) == 0:
+            try:
+                generatePreproOutputs(PreproOut, PreproObsInfo)
+
+            except BaseException as Error:
+                Errors.append(Error)
+                Stop.set()
+
+# End of runWriteStage()
+
+def runPreproPipeline(Conf, Rcvr, ObsEpochs, PrevPreproObsInfo, MaskedSats, PreproOut=None):
+
+    # Purpose: preprocess the OBS epochs of one file with the reading,
+    #          the preprocessing and the writing of the PREPRO OBS file
+    #          running concurrently, connected by bounded queues.
+    #          Epochs are preprocessed and written in the same order
+    #          as in the serial processing.
+
+    # Parameters
+    # ==========
+    # Conf: dict
+    #       Configuration dictionary
+    # Rcvr: list
+    #       Receiver information: position, masking angle...
+    # ObsEpochs: iterator
+    #            OBS epochs (see readObsFileEpochs)
+    # PrevPreproObsInfo: dict
+    #                    Preprocessed observations for previous epoch per sat
+    # MaskedSats: list
+    #             Satellites removed by the OBS reader below the mask
+    #             angle (see initObsFilterStats)
+    # PreproOut: dict
+    #            PREPRO OBS outputs (see openPreproOutputs), None if
+    #            the PREPRO outputs are not requested
+
+    # Returns
+    # =======
+    # NEpochs: int
+    #          Number of epochs processed
+
+    # Bounded queues between stages, for back-pressure
+    ReadQueue = Queue(maxsize=Conf["PIPELINE_DEPTH"][0])
+    WriteQueue = Queue(maxsize=Conf["PIPELINE_DEPTH"][1])
+    Stop = Event()
+    ReadErrors = []
+    WriteErrors = []
+
+    # Start reader and writer threads
+    Reader = Thread(target=runReadStage, name="PetrusReader",
+        args=(ObsEpochs, MaskedSats, ReadQueue, Stop, ReadErrors))
+    Reader.daemon = True
+    Reader.start()
+
+    Writer = None
+    if PreproOut is not None:
+        Writer = Thread(target=runWriteStage, name="PetrusWriter",
+            args=(PreproOut, WriteQueue, Stop, WriteErrors))
+        Writer.daemon = True
+        Writer.start()
+
+    NEpochs = 0
+    try:
+        # LOOP over all Epochs coming from the reader
+        # ----------------------------------------------------------
+        while not Stop.is_set():
+            try:
+                Item = ReadQueue.get(timeout=PIPELINE_POLL)
+
+            except Empty:
+                # The reader stopped by the writer may exit without
+                # the end marker
+                if not Reader.is_alive() and ReadQueue.empty():
+                    break
+                continue
+
+            if Item is PIPELINE_END:
+                break
+
+            ObsInfo, EpochMaskedSats = Item
+
+            # Preprocess OBS measurements
+            PreproObsInfo = runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo,
+                EpochMaskedSats)
+            NEpochs = NEpochs + 1
+
+            # Hand the epoch over to the writer
+            if Writer is not None:
+                WriteQueue.put(PreproObsInfo)
+
+        # End of while not Stop.is_set():
+
+    finally:
+        # Release the reader if still running and wait for the writer
+        # to write the remaining epochs
+        Stop.set()
+        if Writer is not None:
+            WriteQueue.put(PIPELINE_END)
+            Writer.join()
+        Reader.join()
+
+    # Raise the errors of the other stages in the main thread
+    for Errors in (ReadErrors, WriteErrors):
+        if len(Errors) > 0:
+            raise Errors[0]
+
+    return NEpochs
+
+# End of runPreproPipeline()
+
+########################################################################
+# End of Pipeline.py
+########################################################################
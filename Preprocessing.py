@@ -37,12 +37,13 @@ from PreprocessingFunc import UpdateBuff
 from PreprocessingFunc import ResetHatch
 from PreprocessingFunc import UpdateRates
 from PreprocessingFunc import UpdateGeomFree
+from PreprocessingFunc import UpdateMaskedSats
 from COMMON.Iono import computeIonoMappingFunction
 
 # Preprocessing internal functions
 #-----------------------------------------------------------------------
 
-def runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo):
+def runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo, MaskedSats=None, Optional=True):
     
     # Purpose: preprocess GNSS raw measurements from OBS file
     #          and generate PREPRO OBS file with the cleaned,
@@ -72,12 +73,22 @@ def runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo):
     # Rcvr: dict
     #       Receiver information: position, masking angle...
     # ObsInfo: list
-    #          OBS info for current epoch
+    #          OBS info for current epoch, either split lines
+    #          or typed rows (see iterObsEpochs)
     #          ObsInfo[1][1] is the second field of the 
     #          second satellite
     # PrevPreproObsInfo: dict
     #                    Preprocessed observations for previous epoch per sat
     #                    PrevPreproObsInfo["G01"]["C1"]
+    # MaskedSats: list
+    #             Satellites removed by the OBS reader below the mask
+    #             angle since previous epoch (see OBS_MASK_FILTER),
+    #             None if there are none
+    #             MaskedSats[0] is ["G01", Elevation]
+    # Optional: bool
+    #           Compute the VTEC Rate and iAATR. False to shed load in
+    #           real-time modes: they are left at 0, while the
+    #           Geometry-Free state is still updated
 
     # Returns
     # =======
@@ -86,6 +97,10 @@ def runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo):
     #         PreproObsInfo["G01"]["C1"]
     
 
+    # No satellites removed by the OBS reader
+    if MaskedSats is None:
+        MaskedSats = []
+
     # Initialize output
     PreproObsInfo = OrderedDict({})
 
@@ -185,6 +200,13 @@ def runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo):
     ActSatsGal = ActSats[2]
     NChannelsGal = int(Conf["NCHANNELS_GAL"])
     ChannelsFlag(ActSatsGal, NChannelsGal, FlagNum, "E", PreproObsInfo)
+
+    # Flag the satellites removed by the OBS reader below the mask angle
+    if len(MaskedSats) > 0:
+        UpdateMaskedSats(MaskedSats, "G", ActSatsGps, NChannelsGps, FlagNum,
+            REJECTION_CAUSE["MASKANGLE"], PrevPreproObsInfo)
+        UpdateMaskedSats(MaskedSats, "E", ActSatsGal, NChannelsGal, FlagNum,
+            REJECTION_CAUSE["MASKANGLE"], PrevPreproObsInfo)
     
     # QUALITY CHECKS AND SIGNAL SMOOTHING
     # ----------------------------------------------------------
@@ -227,9 +249,12 @@ def runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo):
         # Attention: Visibility periods are not considered as Data Gaps
 
         # Compute the DeltaT taking into account the first appearance of a satellite
-        DeltaT = int(Value["Sod"] - PrevPreproObsInfo[Sat]["PrevEpoch"])
-        if PrevPreproObsInfo[Sat]["PrevEpoch"] == 0:
+        # (never seen, or seen at SoD 0 of the day: the epochs of the previous day
+        # carried over midnight are negative)
+        if PrevPreproObsInfo[Sat]["PrevEpoch"] is None or PrevPreproObsInfo[Sat]["PrevEpoch"] == 0:
             DeltaT = int(Conf["SAMPLING_RATE"])
+        else:
+            DeltaT = int(Value["Sod"] - PrevPreproObsInfo[Sat]["PrevEpoch"])
 
         GapCounter[Sat] = DeltaT
         if GapCounter[Sat] > int(Conf["HATCH_GAP_TH"]):
@@ -362,7 +387,10 @@ def runPreProcMeas(Conf, Rcvr, ObsInfo, PrevPreproObsInfo):
         # ----------------------------------------------------------
         # Compute the iononospheric gradients
 
-        if HacthFilterReset[Sat] == 0:
+        # Not computed until a previous Geometry-Free combination is available,
+        # as after a reset
+        if HacthFilterReset[Sat] == 0 and Optional and \
+            PrevPreproObsInfo[Sat]["PrevGeomFreeEpoch"] is not None:
             # Compute the STEC Rate
             DeltaTGeom = Value["Sod"] - PrevPreproObsInfo[Sat]["PrevGeomFreeEpoch"]
             DeltaStec[Sat] = (Value["GeomFree"] - Value["GeomFreePrev"])/DeltaTGeom
@@ -135,6 +135,22 @@ def UpdatePrevPro(PreproObsInfo, PrevPreproObsInfo, HatchFilterReset):
         # PrevPreproObsInfo[Sat]["PrevGeomFree"] = Value["GeomFree"]
         # PrevPreproObsInfo[Sat]["PrevGeomFreeEpoch"] =
 
+def UpdateMaskedSats(MaskedSats, Const, ActSats, NChannels, ChannelsFlagNum, MaskFlagNum, PrevPreproObsInfo):
+
+    # Function updating the rejection flag in PrevPreproObsInfo dictionary of the satellites removed
+    # by the OBS reader below the mask angle, as they would have been flagged if not removed:
+    # the ones with lowest elevation by the channels limitation and the others by the mask angle
+
+    SatElev = sorted([Elev, Sat] for Sat, Elev in MaskedSats if Const in Sat)
+    NExcess = ActSats + len(SatElev) - NChannels
+
+    for i, (Elev, Sat) in enumerate(SatElev):
+        if Sat in PrevPreproObsInfo:
+            if i < NExcess:
+                PrevPreproObsInfo[Sat]["PrevRej"] = ChannelsFlagNum
+            else:
+                PrevPreproObsInfo[Sat]["PrevRej"] = MaskFlagNum
+
 def DetectCycleSlip(Sat, Value, PrevPreproObsInfo, CsThreshold):
 
     # Function detecting a cycle slip by comparing the Carrier Phase L1 at epoch t obtained from the 
@@ -149,15 +165,16 @@ def DetectCycleSlip(Sat, Value, PrevPreproObsInfo, CsThreshold):
     CP_n_2 = PrevPreproObsInfo[Sat]["L1_n_2"]
     CP_n_3 = PrevPreproObsInfo[Sat]["L1_n_3"]
     
+    # Return False if there are not enough epochs to compute the TOD (an
+    # epoch at SoD 0 of the day is taken as not set)
+    if PrevPreproObsInfo[Sat]["t_n_3"] is None or PrevPreproObsInfo[Sat]["t_n_3"] == 0.0:
+        return CycleSlip
+
     # Previous measurements instants
     t1 = Value["Sod"] - PrevPreproObsInfo[Sat]["t_n_1"]
     t2 = PrevPreproObsInfo[Sat]["t_n_1"] - PrevPreproObsInfo[Sat]["t_n_2"]
     t3 = PrevPreproObsInfo[Sat]["t_n_2"] - PrevPreproObsInfo[Sat]["t_n_3"]
     
-    # Return False if there are not enough epochs to compute the TOD
-    if PrevPreproObsInfo[Sat]["t_n_3"] == 0.0:
-        return CycleSlip
-    
     # Residuals equation factors
     R1 = float((t1+t2)*(t1+t2+t3))/(t2*(t2+t3))
     R2 = float(-t1*(t1+t2+t3))/(t2*t3)
@@ -191,8 +208,8 @@ def ResetCsDetector(Sat, Value, PrevPreproObsInfo):
     PrevPreproObsInfo[Sat]["L1_n_2"] = 0.0
     PrevPreproObsInfo[Sat]["L1_n_1"] = Value["L1"]
     # Reset the current and previous valid epochs
-    PrevPreproObsInfo[Sat]["t_n_3"] = 0.0
-    PrevPreproObsInfo[Sat]["t_n_2"] = 0.0
+    PrevPreproObsInfo[Sat]["t_n_3"] = None
+    PrevPreproObsInfo[Sat]["t_n_2"] = None
     PrevPreproObsInfo[Sat]["t_n_1"] = Value["Sod"]
     # Reset the cycle slips buffer
     for i in range(len(PrevPreproObsInfo[Sat]["CsBuff"])):
@@ -18,10 +18,22 @@
 ########################################################################
 
 import sys, os
-from pandas import unique
-from pandas import read_csv
+import gc
+import time
+import atexit
+import threading
+import traceback
+from queue import Empty, Full
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, get_all_start_methods
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 from InputOutput import PreproIdx
+from InputOutput import readPreproFile
+from InputOutput import getPreproTableData
 from InputOutput import REJECTION_CAUSE_DESC
+from PreprocessingPlotsFunc import GetColumns, GetFilterCond, GetPrnList
+from PreprocessingPlotsFunc import CountPerEpoch, ComputeDifference, SplitBySat
 sys.path.append(os.getcwd() + '/' + \
     os.path.dirname(sys.argv[0]) + '/' + 'COMMON')
 from COMMON import GnssConstants
@@ -30,8 +42,34 @@ import numpy as np
 from collections import OrderedDict
 from ConPlots import Conf
 import matplotlib.pyplot as plt
+import matplotlib.image
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
 from math import pi
 
+# Time between checks of the background plot process [s]
+PLOT_QUEUE_POLL = 1.0
+
+# Plot worker processes kept for the whole run (see startPreproPlotPool)
+PlotPool = None
+
+# Cols needed by each plot
+PreproPlotCols = OrderedDict({})
+PreproPlotCols["PLOT_VIS"] = ["SOD", "PRN", "ELEV", "STATUS"]
+PreproPlotCols["PLOT_NSAT"] = ["SOD", "STATUS"]
+PreproPlotCols["PLOT_POLAR"] = ["PRN", "ELEV", "AZIM"]
+PreproPlotCols["PLOT_SATS_FLAGS"] = ["SOD", "PRN", "REJECT"]
+PreproPlotCols["PLOT_C1_C1SMOOTHED_T"] = ["SOD", "STATUS", "C1", "C1SMOOTHED", "S1"]
+PreproPlotCols["PLOT_C1_C1SMOOTHED_E"] = ["ELEV", "STATUS", "C1", "C1SMOOTHED", "S1"]
+PreproPlotCols["PLOT_C1_RATE"] = ["SOD", "ELEV", "STATUS", "CODE RATE"]
+PreproPlotCols["PLOT_L1_RATE"] = ["SOD", "ELEV", "STATUS", "PHASE RATE"]
+PreproPlotCols["PLOT_C1_RATE_STEP"] = ["SOD", "ELEV", "STATUS", "CODE ACC"]
+PreproPlotCols["PLOT_L1_RATE_STEP"] = ["SOD", "ELEV", "STATUS", "PHASE ACC"]
+PreproPlotCols["PLOT_VTEC"] = ["SOD", "ELEV", "STATUS", "VTEC RATE"]
+PreproPlotCols["PLOT_AATR_INDEX"] = ["SOD", "ELEV", "STATUS", "iAATR"]
+
 def initPlot(PreproObsFile, PlotConf, Title, Label):
     
     # Compute information from PreproObsFile
@@ -63,7 +101,7 @@ def plotSatVisibility(PreproObsFile, PreproObsData):
     PlotConf["FigSize"] = (8.4,7.6)
     PlotConf["SecondAxis"] = 1
 
-    PrnList = sorted(unique(PreproObsData[PreproIdx["PRN"]]))
+    PrnList = GetPrnList(PreproObsData)
     PlotConf["yLabel"] = "GPS-PRN"
     PlotConf["yTicks"] = range(min(PrnList), max(PrnList) + 1)
     PlotConf["yLim"] = [0, max(PrnList) + 1]
@@ -89,16 +127,16 @@ def plotSatVisibility(PreproObsFile, PreproObsData):
     PlotConf["yData"], PlotConf["yData2"] = {}, {}
     PlotConf["zData"] = {}
 
-    FilterCond2 = PreproObsData[PreproIdx["STATUS"]] == 1
-    FilterCond3 = PreproObsData[PreproIdx["STATUS"]] == 0
-    for Prn in PrnList:
+    Prn, Sod, Elev, Status = GetColumns(PreproObsData, ["PRN", "SOD", "ELEV", "STATUS"])
+    for Prn, (Sod, Elev, Status) in SplitBySat(Prn, [Sod, Elev, Status]).items():
         Label = "G" + ("%02d" % Prn)
-        FilterCond1 = PreproObsData[PreproIdx["PRN"]] == Prn
-        PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond1][FilterCond2] / GnssConstants.S_IN_H
-        PlotConf["yData"][Label] = PreproObsData[PreproIdx["PRN"]][FilterCond1][FilterCond2]
-        PlotConf["zData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond1][FilterCond2]
-        PlotConf["xData2"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond1][FilterCond3] / GnssConstants.S_IN_H
-        PlotConf["yData2"][Label] = PreproObsData[PreproIdx["PRN"]][FilterCond1][FilterCond3]
+        FilterCond2 = Status == 1
+        FilterCond3 = Status == 0
+        PlotConf["xData"][Label] = Sod[FilterCond2] / GnssConstants.S_IN_H
+        PlotConf["yData"][Label] = np.full(np.count_nonzero(FilterCond2), Prn)
+        PlotConf["zData"][Label] = Elev[FilterCond2]
+        PlotConf["xData2"][Label] = Sod[FilterCond3] / GnssConstants.S_IN_H
+        PlotConf["yData2"][Label] = np.full(np.count_nonzero(FilterCond3), Prn)
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -125,19 +163,14 @@ def plotNumSats(PreproObsFile, PreproObsData):
     PlotConf["Marker"] = '-'
     PlotConf["LineWidth"] = 0.75
 
-    # Processing the data to be plotted
+    # Processing the data to be plotted: number of satellites and
+    # number of smoothed ones in every second of the day
     Sod = np.arange(GnssConstants.S_IN_D + 1)
-    SatsRaw = []
-    SatsSmooth = []
+    EpochSod, Status = GetColumns(PreproObsData, ["SOD", "STATUS"])
+    SatsRaw = CountPerEpoch(EpochSod)
+    SatsSmooth = CountPerEpoch(EpochSod, Status.astype(np.float64)).astype(np.int64)
     Data = [SatsRaw, SatsSmooth]
 
-    for Second in Sod:
-        FilterCond = PreproObsData[PreproIdx["SOD"]] == Second
-        DataEpoch = PreproObsData[PreproIdx["STATUS"]][FilterCond]
-        DataEpoch.to_numpy()
-        SatsRaw.append(len(DataEpoch))
-        SatsSmooth.append(sum(DataEpoch))
-
     # Plotting
     PlotConf["xData"] = {}
     PlotConf["yData"] = {}
@@ -168,7 +201,7 @@ def plotSatPolarView(PreproObsFile, PreproObsData):
     PlotConf["LineWidth"] = 0.005
 
     # Colorbar definition
-    PrnList = sorted(unique(PreproObsData[PreproIdx["PRN"]]))
+    PrnList = GetPrnList(PreproObsData)
     PlotConf["ColorBar"] = "gnuplot"
     PlotConf["ColorBarLabel"] = "GPS-PRN"
     PlotConf["ColorBarMin"] = min(PrnList)
@@ -194,9 +227,7 @@ def plotSatPolarView(PreproObsFile, PreproObsData):
     ax.set_yticklabels(PlotConf["yTicksLabels"])
     plt.gca().invert_yaxis()
 
-    xData = PreproObsData[PreproIdx["AZIM"]]
-    yData = PreproObsData[PreproIdx["ELEV"]]
-    zData = PreproObsData[PreproIdx["PRN"]]
+    xData, yData, zData = GetColumns(PreproObsData, ["AZIM", "ELEV", "PRN"])
 
     p = ax.scatter(x = np.radians(xData), y = yData, c = zData, cmap = PlotConf["ColorBar"],\
         marker = PlotConf["Marker"], linewidth = PlotConf["LineWidth"])
@@ -227,19 +258,17 @@ def plotC1C1Smoothed(PreproObsFile, PreproObsData):
     PlotConf["LineWidth"] = 0.25
 
     # Processing the data to be plotted
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    Code = PreproObsData[PreproIdx["C1"]][FilterCond].to_numpy()
-    CodeSmoothed = PreproObsData[PreproIdx["C1SMOOTHED"]][FilterCond].to_numpy()
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    xData, Code, CodeSmoothed, Cn0 = GetColumns(PreproObsData,
+        ["SOD", "C1", "C1SMOOTHED", "S1"], FilterCond)
 
-    Noise = []
-    for i in range(len(Code)):
-        Noise.append(Code[i]-CodeSmoothed[i])
+    Noise = ComputeDifference(Code, CodeSmoothed)
 
     # Colorbar definition
     PlotConf["ColorBar"] = "gnuplot"
     PlotConf["ColorBarLabel"] = "C/N0 [dB-Hz]"
-    PlotConf["ColorBarMin"] = int(min(PreproObsData[PreproIdx["S1"]][FilterCond]))
-    PlotConf["ColorBarMax"] = int(max(PreproObsData[PreproIdx["S1"]][FilterCond]))
+    PlotConf["ColorBarMin"] = int(min(Cn0))
+    PlotConf["ColorBarMax"] = int(max(Cn0))
     PlotConf["ColorBarTicks"] = range(PlotConf["ColorBarMin"],PlotConf["ColorBarMax"],2)
 
     # Plotting
@@ -247,9 +276,9 @@ def plotC1C1Smoothed(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = np.array(Noise)
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["S1"]][FilterCond]
+    PlotConf["xData"][Label] = xData / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Noise
+    PlotConf["zData"][Label] = Cn0
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -276,19 +305,17 @@ def plotC1C1SmoothedE(PreproObsFile, PreproObsData):
     PlotConf["LineWidth"] = 0.25
 
     # Processing the data to be plotted
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    Code = PreproObsData[PreproIdx["C1"]][FilterCond].to_numpy()
-    CodeSmoothed = PreproObsData[PreproIdx["C1SMOOTHED"]][FilterCond].to_numpy()
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    xData, Code, CodeSmoothed, Cn0 = GetColumns(PreproObsData,
+        ["ELEV", "C1", "C1SMOOTHED", "S1"], FilterCond)
 
-    Noise = []
-    for i in range(len(Code)):
-        Noise.append(Code[i]-CodeSmoothed[i])
+    Noise = ComputeDifference(Code, CodeSmoothed)
 
     # Colorbar definition
     PlotConf["ColorBar"] = "gnuplot"
     PlotConf["ColorBarLabel"] = "C/N0 [dB-Hz]"
-    PlotConf["ColorBarMin"] = int(min(PreproObsData[PreproIdx["S1"]][FilterCond]))
-    PlotConf["ColorBarMax"] = int(max(PreproObsData[PreproIdx["S1"]][FilterCond]))
+    PlotConf["ColorBarMin"] = int(min(Cn0))
+    PlotConf["ColorBarMax"] = int(max(Cn0))
     PlotConf["ColorBarTicks"] = range(PlotConf["ColorBarMin"],PlotConf["ColorBarMax"],2)
 
     # Plotting
@@ -296,9 +323,9 @@ def plotC1C1SmoothedE(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond]
-    PlotConf["yData"][Label] = np.array(Noise)
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["S1"]][FilterCond]
+    PlotConf["xData"][Label] = xData
+    PlotConf["yData"][Label] = Noise
+    PlotConf["zData"][Label] = Cn0
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -329,8 +356,9 @@ def plotRejectionFlags(PreproObsFile, PreproObsData):
     # Colorbar definition
     PlotConf["ColorBar"] = "gnuplot"
     PlotConf["ColorBarLabel"] = "GPS-PRN"
-    PlotConf["ColorBarMin"] = min(unique(PreproObsData[PreproIdx["PRN"]]))
-    PlotConf["ColorBarMax"] = max(unique(PreproObsData[PreproIdx["PRN"]]))
+    PrnList = GetPrnList(PreproObsData)
+    PlotConf["ColorBarMin"] = min(PrnList)
+    PlotConf["ColorBarMax"] = max(PrnList)
     PlotConf["ColorBarTicks"] = range(PlotConf["ColorBarMin"], PlotConf["ColorBarMax"] + 1)
 
     # Plotting
@@ -338,10 +366,11 @@ def plotRejectionFlags(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    FilterCond = PreproObsData[PreproIdx["REJECT"]] != 0
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = PreproObsData[PreproIdx["REJECT"]][FilterCond]
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["PRN"]][FilterCond]
+    FilterCond = GetFilterCond(PreproObsData, "REJECT", 0, Equal=False)
+    Sod, Reject, Prn = GetColumns(PreproObsData, ["SOD", "REJECT", "PRN"], FilterCond)
+    PlotConf["xData"][Label] = Sod / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Reject
+    PlotConf["zData"][Label] = Prn
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -378,10 +407,11 @@ def plotCodeRate(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = PreproObsData[PreproIdx["CODE RATE"]][FilterCond]
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond]
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    Sod, Values, Elev = GetColumns(PreproObsData, ["SOD", "CODE RATE", "ELEV"], FilterCond)
+    PlotConf["xData"][Label] = Sod / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Values
+    PlotConf["zData"][Label] = Elev
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -418,10 +448,11 @@ def plotPhaseRate(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = PreproObsData[PreproIdx["PHASE RATE"]][FilterCond]
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond]
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    Sod, Values, Elev = GetColumns(PreproObsData, ["SOD", "PHASE RATE", "ELEV"], FilterCond)
+    PlotConf["xData"][Label] = Sod / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Values
+    PlotConf["zData"][Label] = Elev
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -458,10 +489,11 @@ def plotCodeRateStep(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = PreproObsData[PreproIdx["CODE ACC"]][FilterCond]
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond]
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    Sod, Values, Elev = GetColumns(PreproObsData, ["SOD", "CODE ACC", "ELEV"], FilterCond)
+    PlotConf["xData"][Label] = Sod / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Values
+    PlotConf["zData"][Label] = Elev
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -498,10 +530,11 @@ def plotPhaseRateStep(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = PreproObsData[PreproIdx["PHASE ACC"]][FilterCond]
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond]
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    Sod, Values, Elev = GetColumns(PreproObsData, ["SOD", "PHASE ACC", "ELEV"], FilterCond)
+    PlotConf["xData"][Label] = Sod / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Values
+    PlotConf["zData"][Label] = Elev
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -538,10 +571,11 @@ def plotVtecGradient(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = PreproObsData[PreproIdx["VTEC RATE"]][FilterCond]
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond]
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    Sod, Values, Elev = GetColumns(PreproObsData, ["SOD", "VTEC RATE", "ELEV"], FilterCond)
+    PlotConf["xData"][Label] = Sod / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Values
+    PlotConf["zData"][Label] = Elev
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
@@ -578,169 +612,714 @@ def plotAatr(PreproObsFile, PreproObsData):
     PlotConf["yData"] = {}
     PlotConf["zData"] = {}
     Label = 0
-    FilterCond = PreproObsData[PreproIdx["STATUS"]] == 1
-    PlotConf["xData"][Label] = PreproObsData[PreproIdx["SOD"]][FilterCond] / GnssConstants.S_IN_H
-    PlotConf["yData"][Label] = PreproObsData[PreproIdx["iAATR"]][FilterCond]
-    PlotConf["zData"][Label] = PreproObsData[PreproIdx["ELEV"]][FilterCond]
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    Sod, Values, Elev = GetColumns(PreproObsData, ["SOD", "iAATR", "ELEV"], FilterCond)
+    PlotConf["xData"][Label] = Sod / GnssConstants.S_IN_H
+    PlotConf["yData"][Label] = Values
+    PlotConf["zData"][Label] = Elev
 
     # Call generatePlot from Plots library
     generatePlot(PlotConf)
 
-def generatePreproPlots(PreproObsFile):
+# Plot function and message of each plot
+PreproPlotFuncs = OrderedDict({})
+PreproPlotFuncs["PLOT_VIS"] = [plotSatVisibility, 'Plot Satellites Visibility vs Time ...']
+PreproPlotFuncs["PLOT_NSAT"] = [plotNumSats, 'Plot Number of Satellites vs Time ...']
+PreproPlotFuncs["PLOT_POLAR"] = [plotSatPolarView, 'Plot Satellites Polar View ...']
+PreproPlotFuncs["PLOT_SATS_FLAGS"] = [plotRejectionFlags, 'Plot Rejection Flags of Satellites vs Time ...']
+PreproPlotFuncs["PLOT_C1_C1SMOOTHED_T"] = [plotC1C1Smoothed, 'Plot C1 - C1 Smoothed vs Time ...']
+PreproPlotFuncs["PLOT_C1_C1SMOOTHED_E"] = [plotC1C1SmoothedE, 'Plot C1 - C1 Smoothed vs Elevation ...']
+PreproPlotFuncs["PLOT_C1_RATE"] = [plotCodeRate, 'Plot Code Rate vs Time ...']
+PreproPlotFuncs["PLOT_L1_RATE"] = [plotPhaseRate, 'Plot Phase Rate vs Time ...']
+PreproPlotFuncs["PLOT_C1_RATE_STEP"] = [plotCodeRateStep, 'Plot Code Rate Step vs Time ...']
+PreproPlotFuncs["PLOT_L1_RATE_STEP"] = [plotPhaseRateStep, 'Plot Phase Rate Step vs Time ...']
+PreproPlotFuncs["PLOT_VTEC"] = [plotVtecGradient, 'Plot VTEC Gradient vs Time ...']
+PreproPlotFuncs["PLOT_AATR_INDEX"] = [plotAatr, 'Plot AATR Index vs Time ...']
+
+def initPreproPlotWorker(Argv):
+
+    # Function initializing the plot worker processes: figures are
+    # rendered with the non-interactive Agg backend
+
+    sys.argv = Argv
+    plt.switch_backend("Agg")
+
+def sharePreproPlotData(PreproObsData, Columns):
+
+    # Function copying the PREPRO OBS columns into one shared memory
+    # block. Returns the block and its layout: one [Col, Type, Offset,
+    # Length] per column
+
+    Values = [np.ascontiguousarray(np.asarray(PreproObsData[PreproIdx[Col]])) \
+        for Col in Columns]
+
+    Layout = []
+    Size = 0
+    for Col, Column in zip(Columns, Values):
+        Layout.append([Col, Column.dtype.str, Size, len(Column)])
+        Size = Size + Column.nbytes + (-Column.nbytes % 8)
+
+    Shm = SharedMemory(create=True, size=max(Size, 8))
+    for (Col, Type, Offset, Length), Column in zip(Layout, Values):
+        np.ndarray(Length, dtype=Type, buffer=Shm.buf, offset=Offset)[:] = Column
+
+    return Shm, Layout
+
+def attachPreproPlotData(ShmName, Layout):
+
+    # Function mapping the PREPRO OBS columns of a shared memory block
+    # (see sharePreproPlotData). Forked processes share the resource
+    # tracker of the parent process, so the block is not removed when
+    # they exit
+
+    Shm = SharedMemory(name=ShmName)
+
+    PreproObsData = {}
+    for Col, Type, Offset, Length in Layout:
+        PreproObsData[PreproIdx[Col]] = np.ndarray(Length, dtype=Type,
+            buffer=Shm.buf, offset=Offset)
+
+    return Shm, PreproObsData
+
+def releasePreproPlotData(Shm, Unlink=False):
+
+    # Function unmapping a shared memory block once the columns mapped
+    # from it are no longer referenced, and removing it if requested
+
+    gc.collect()
+    try:
+        Shm.close()
+
+    except BufferError:
+        # Views still referenced, released at process exit
+        pass
+
+    if Unlink:
+        Shm.unlink()
+
+def runPreproPlotWorker(Plot, PreproObsFile, ShmName, Layout):
+
+    # Function generating one plot in a worker process, from the
+    # PREPRO OBS columns in shared memory
+
+    Shm, PreproObsData = attachPreproPlotData(ShmName, Layout)
+
+    try:
+        PreproPlotFuncs[Plot][0](PreproObsFile, PreproObsData)
+
+    finally:
+        PreproObsData = None
+        releasePreproPlotData(Shm)
+
+def checkForkSafe(What):
+
+    # Function checking that no other thread is running before forking
+    # What: a lock held by another thread would stay locked forever in
+    # the forked process
+
+    if threading.active_count() > 1:
+        raise RuntimeError("%s must be forked before any other thread is started "\
+            "(running: %s)" % (What, ", ".join([Thread.name for Thread in threading.enumerate()])))
+
+def forkPreproPlotPool():
+
+    # Function forking the PLOT_WORKERS plot worker processes, forked
+    # as Petrus main body cannot be imported again by the workers. The
+    # fork context starts all of them on the first job
+
+    checkForkSafe("Plot worker processes")
+
+    return ProcessPoolExecutor(max_workers=Conf["PLOT_WORKERS"],
+        mp_context=get_context("fork"), initializer=initPreproPlotWorker,
+        initargs=(sys.argv,))
+
+def startPreproPlotPool(Pool=None):
+
+    # Purpose: start the plot worker processes kept for the whole run,
+    #          if PLOT_WORKERS is set in ConPlots. It must be called
+    #          before any other thread is started, by the processes
+    #          generating plots while other threads run.
+
+    # Parameters
+    # ==========
+    # Pool: ProcessPoolExecutor
+    #       Worker processes already running to be used instead,
+    #       started with initPreproPlotWorker. If None, PLOT_WORKERS
+    #       processes are forked
+
+    # Returns
+    # =======
+    # Nothing
+
+    global PlotPool
+
+    if PlotPool is not None or Conf["PLOT_WORKERS"] == 0 or \
+        "fork" not in get_all_start_methods():
+        return
+
+    # Stopped by their owner
+    if Pool is not None:
+        PlotPool = Pool
+        return
+
+    # Shared memory blocks are created here and mapped by the workers:
+    # both must use the same resource tracker
+    resource_tracker.ensure_running()
+
+    PlotPool = forkPreproPlotPool()
+    # Fork the workers now
+    PlotPool.submit(gc.collect).result()
+
+    atexit.register(stopPreproPlotPool)
+
+def stopPreproPlotPool():
+
+    # Function stopping the plot worker processes kept for the run
+
+    global PlotPool
+
+    if PlotPool is not None:
+        PlotPool.shutdown()
+        PlotPool = None
+
+def getPreproPlotCols():
+
+    # Function returning the enabled plots and the cols they need
+
+    Plots = [Plot for Plot in PreproPlotFuncs if Conf[Plot] == 1]
+    Columns = []
+    for Plot in Plots:
+        Columns.extend([Col for Col in PreproPlotCols[Plot] if Col not in Columns])
+
+    return Plots, Columns
+
+def generatePreproPlots(PreproObsFile, PreproObsData=None):
     
-    # Purpose: generate output plots regarding Preprocessing results
+    # Purpose: generate output plots regarding Preprocessing results.
+    #          If PLOT_WORKERS is set in ConPlots, every plot is
+    #          rendered in a worker process (see startPreproPlotPool).
 
     # Parameters
     # ==========
     # PreproObsFile: str
+    #                Path to PREPRO OBS output file, text (.dat)
+    #                or binary (.bin)
+    # PreproObsData: DataFrame
+    #                PREPRO OBS results already in memory (see
+    #                closePreproOutputs). If None, they are read
+    #                from PreproObsFile
+
+    # Returns
+    # =======
+    # Nothing
+
+    # Enabled plots and the cols they need
+    Plots, Columns = getPreproPlotCols()
+    if len(Plots) == 0:
+        return
+
+    # If results are not in memory, read once the cols needed by
+    # all the enabled plots
+    if PreproObsData is None:
+        PreproObsData = readPreproFile(PreproObsFile, Columns, Compact=True)
+
+    # Plot workers: those kept for the run, or forked for these plots
+    # only if no other thread is running
+    Pool = PlotPool
+    if Pool is None and Conf["PLOT_WORKERS"] > 0 and \
+        "fork" in get_all_start_methods() and threading.active_count() == 1:
+        Pool = forkPreproPlotPool()
+
+    # Plots in worker processes
+    if Pool is not None:
+        Shm, Layout = sharePreproPlotData(PreproObsData, Columns)
+        try:
+            Jobs = []
+            for Plot in Plots:
+                print( PreproPlotFuncs[Plot][1])
+                Jobs.append(Pool.submit(runPreproPlotWorker, Plot, PreproObsFile,
+                    Shm.name, Layout))
+
+            # Raise the errors of the workers
+            for Job in Jobs:
+                Job.result()
+
+        finally:
+            if Pool is not PlotPool:
+                Pool.shutdown()
+            Shm.close()
+            Shm.unlink()
+
+    # Plots in this process
+    else:
+        for Plot in Plots:
+            print( PreproPlotFuncs[Plot][1])
+
+            # Configure plot and call plot generation function
+            PreproPlotFuncs[Plot][0](PreproObsFile, PreproObsData)
+
+def runPreproPlotQueue(Jobs, Results):
+
+    # Function run by the background plot process: generates the plots
+    # of every job, from the PREPRO OBS columns in shared memory, and
+    # reports the job result
+
+    # Plot workers forked before the queue feeder thread is started
+    startPreproPlotPool()
+    try:
+        runPreproPlotJobs(Jobs, Results)
+
+    finally:
+        # Forked processes exit without running the atexit functions
+        stopPreproPlotPool()
+
+def runPreproPlotJobs(Jobs, Results):
+
+    # Function generating the plots of the jobs queued until stopped
+
+    while True:
+        Job = Jobs.get()
+        if Job is None:
+            break
+
+        PreproObsFile, ShmName, Layout = Job
+        Error = None
+        try:
+            Shm, PreproObsData = attachPreproPlotData(ShmName, Layout)
+
+        except BaseException:
+            Results.put((PreproObsFile, traceback.format_exc()))
+            continue
+
+        try:
+            generatePreproPlots(PreproObsFile, PreproObsData)
+
+        except BaseException:
+            Error = traceback.format_exc()
+
+        finally:
+            PreproObsData = None
+            releasePreproPlotData(Shm, Unlink=True)
+
+        Results.put((PreproObsFile, Error))
+
+def startPreproPlotQueue():
+
+    # Purpose: start the background plot process if PLOT_QUEUE is set
+    #          in ConPlots. It must be started before any other thread.
+
+    # Parameters
+    # ==========
+    # None
+
+    # Returns
+    # =======
+    # PlotQueue: dict
+    #            Background plot process and its queues, None if
+    #            plots are generated synchronously
+
+    if Conf["PLOT_QUEUE"] == 0 or "fork" not in get_all_start_methods():
+        return None
+
+    # Forked, as Petrus main body cannot be imported again
+    checkForkSafe("Plot process")
+    Context = get_context("fork")
+
+    PlotQueue = OrderedDict({})
+    PlotQueue["JOBS"] = Context.Queue(maxsize=Conf["PLOT_QUEUE"])
+    PlotQueue["RESULTS"] = Context.Queue()
+    PlotQueue["PENDING"] = 0
+    PlotQueue["ERRORS"] = 0
+    # PREPRO OBS files whose figures have been generated
+    PlotQueue["PLOTTED"] = []
+    # Shared memory blocks are created here and removed by the plot
+    # process: both must use the same resource tracker
+    resource_tracker.ensure_running()
+
+    PlotQueue["PROCESS"] = Context.Process(target=runPreproPlotQueue, name="PetrusPlots",
+        args=(PlotQueue["JOBS"], PlotQueue["RESULTS"]))
+    PlotQueue["PROCESS"].start()
+
+    # Not a daemon, as it may start PLOT_WORKERS processes: stop it
+    # if Petrus exits without draining the queue
+    atexit.register(stopPreproPlotQueue, PlotQueue)
+
+    return PlotQueue
+
+def stopPreproPlotQueue(PlotQueue):
+
+    # Function stopping the background plot process if still running
+
+    if PlotQueue["PROCESS"].is_alive():
+        PlotQueue["PROCESS"].terminate()
+        PlotQueue["PROCESS"].join()
+
+def collectPreproPlotResults(PlotQueue, Wait=False):
+
+    # Function reporting the plot jobs finished, waiting for all the
+    # pending ones if requested
+
+    while PlotQueue["PENDING"] > 0:
+        try:
+            if Wait:
+                PreproObsFile, Error = PlotQueue["RESULTS"].get(timeout=PLOT_QUEUE_POLL)
+            else:
+                PreproObsFile, Error = PlotQueue["RESULTS"].get_nowait()
+
+        except Empty:
+            if Wait and PlotQueue["PROCESS"].is_alive():
+                continue
+
+            if Wait:
+                sys.stderr.write("ERROR: Plot process exited with %d jobs pending\n" %
+                PlotQueue["PENDING"])
+                PlotQueue["ERRORS"] = PlotQueue["ERRORS"] + PlotQueue["PENDING"]
+                PlotQueue["PENDING"] = 0
+            break
+
+        PlotQueue["PENDING"] = PlotQueue["PENDING"] - 1
+        if Error is not None:
+            PlotQueue["ERRORS"] = PlotQueue["ERRORS"] + 1
+            sys.stderr.write("ERROR: PREPRO figures of %s failed:\n%s" %
+            (PreproObsFile, Error))
+        else:
+            PlotQueue["PLOTTED"].append(PreproObsFile)
+
+def queuePreproPlots(PlotQueue, PreproObsFile, PreproObsData):
+
+    # Purpose: hand the PREPRO OBS results over to the background plot
+    #          process, waiting while the queue is full
+
+    # Parameters
+    # ==========
+    # PlotQueue: dict
+    #            Background plot process (see startPreproPlotQueue)
+    # PreproObsFile: str
     #                Path to PREPRO OBS output file
+    # PreproObsData: DataFrame
+    #                PREPRO OBS results
 
     # Returns
     # =======
     # Nothing
-    
-    # Satellite Visibility
-    # ----------------------------------------------------------
-    if(Conf["PLOT_VIS"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["PRN"],PreproIdx["ELEV"],PreproIdx["STATUS"]])
-
-        print( 'Plot Satellites Visibility vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotSatVisibility(PreproObsFile, PreproObsData)
-
-    # Plot Number of Satellites
-    # ----------------------------------------------------------
-    if(Conf["PLOT_NSAT"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["STATUS"]])
-
-        print( 'Plot Number of Satellites vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotNumSats(PreproObsFile, PreproObsData)
-
-    # Plot Polar View
-    # ----------------------------------------------------------
-    if(Conf["PLOT_POLAR"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["PRN"],PreproIdx["ELEV"],PreproIdx["AZIM"]])
-
-        print( 'Plot Satellites Polar View ...')
-      
-        # Configure plot and call plot generation function
-        plotSatPolarView(PreproObsFile, PreproObsData)
-
-    # Plot Rejection Flags of satellite
-    # ----------------------------------------------------------
-    if(Conf["PLOT_SATS_FLAGS"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["PRN"],PreproIdx["REJECT"]])
-
-        print( 'Plot Rejection Flags of Satellites vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotRejectionFlags(PreproObsFile, PreproObsData)
-
-    # Plot C1 - C1 Smoothed vs Time
-    # ----------------------------------------------------------
-    if(Conf["PLOT_C1_C1SMOOTHED_T"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["STATUS"],PreproIdx["C1"],PreproIdx["C1SMOOTHED"],PreproIdx["S1"]])
-
-        print( 'Plot C1 - C1 Smoothed vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotC1C1Smoothed(PreproObsFile, PreproObsData)
-
-    # Plot C1 - C1 Smoothed vs Elevation
-    # ----------------------------------------------------------
-    if(Conf["PLOT_C1_C1SMOOTHED_E"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["ELEV"],PreproIdx["STATUS"],PreproIdx["C1"],PreproIdx["C1SMOOTHED"],PreproIdx["S1"]])
-
-        print( 'Plot C1 - C1 Smoothed vs Elevation ...')
-      
-        # Configure plot and call plot generation function
-        plotC1C1SmoothedE(PreproObsFile, PreproObsData)
-
-    # Code Rate vs Time
-    # ----------------------------------------------------------
-    if(Conf["PLOT_C1_RATE"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["ELEV"],PreproIdx["STATUS"],PreproIdx["CODE RATE"]])
-
-        print( 'Plot Code Rate vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotCodeRate(PreproObsFile, PreproObsData)
-
-    # Phase Rate vs Time
-    # ----------------------------------------------------------
-    if(Conf["PLOT_L1_RATE"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["ELEV"],PreproIdx["STATUS"],PreproIdx["PHASE RATE"]])
-
-        print( 'Plot Phase Rate vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotPhaseRate(PreproObsFile, PreproObsData)
-
-    # Code Rate Step vs Time
-    # ----------------------------------------------------------
-    if(Conf["PLOT_C1_RATE_STEP"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["ELEV"],PreproIdx["STATUS"],PreproIdx["CODE ACC"]])
-
-        print( 'Plot Code Rate Step vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotCodeRateStep(PreproObsFile, PreproObsData)
-
-    # Phase Rate Step vs Time
-    # ----------------------------------------------------------
-    if(Conf["PLOT_L1_RATE_STEP"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["ELEV"],PreproIdx["STATUS"],PreproIdx["PHASE ACC"]])
-
-        print( 'Plot Phase Rate Step vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotPhaseRateStep(PreproObsFile, PreproObsData)
-    
-    # Phase Rate Step vs Time
-    # ----------------------------------------------------------
-    if(Conf["PLOT_VTEC"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["ELEV"],PreproIdx["STATUS"],PreproIdx["VTEC RATE"]])
-
-        print( 'Plot VTEC Gradient vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotVtecGradient(PreproObsFile, PreproObsData)
-
-    # AATR Index vs Time
-    # ----------------------------------------------------------
-    if(Conf["PLOT_AATR_INDEX"] == 1):
-        # Read the cols we need from PreproObsFile file
-        PreproObsData = read_csv(PreproObsFile, delim_whitespace=True, skiprows=1, header=None,\
-        usecols=[PreproIdx["SOD"],PreproIdx["ELEV"],PreproIdx["STATUS"],PreproIdx["iAATR"]])
-
-        print( 'Plot AATR Index vs Time ...')
-      
-        # Configure plot and call plot generation function
-        plotAatr(PreproObsFile, PreproObsData)
-
-    
\ No newline at end of file
+
+    # Report the jobs already finished
+    collectPreproPlotResults(PlotQueue)
+
+    Plots, Columns = getPreproPlotCols()
+    if len(Plots) == 0:
+        PlotQueue["PLOTTED"].append(PreproObsFile)
+        return
+
+    # The plot process removes the block once done
+    Shm, Layout = sharePreproPlotData(PreproObsData, Columns)
+    Shm.close()
+
+    while True:
+        if not PlotQueue["PROCESS"].is_alive():
+            Shm.unlink()
+            sys.stderr.write("ERROR: Plot process exited, PREPRO figures of %s "\
+                "not generated\n" % PreproObsFile)
+            PlotQueue["ERRORS"] = PlotQueue["ERRORS"] + 1
+            return
+
+        try:
+            PlotQueue["JOBS"].put((PreproObsFile, Shm.name, Layout), timeout=PLOT_QUEUE_POLL)
+            break
+
+        except Full:
+            pass
+
+    PlotQueue["PENDING"] = PlotQueue["PENDING"] + 1
+
+def drainPreproPlotQueue(PlotQueue):
+
+    # Purpose: wait for the background plot process to finish all the
+    #          queued jobs and stop it
+
+    # Parameters
+    # ==========
+    # PlotQueue: dict
+    #            Background plot process (see startPreproPlotQueue)
+
+    # Returns
+    # =======
+    # NErrors: int
+    #          Number of plot jobs failed
+
+    collectPreproPlotResults(PlotQueue, Wait=True)
+
+    # Stop request, given up if the plot process exits meanwhile
+    while PlotQueue["PROCESS"].is_alive():
+        try:
+            PlotQueue["JOBS"].put(None, timeout=PLOT_QUEUE_POLL)
+            break
+
+        except Full:
+            pass
+
+    PlotQueue["PROCESS"].join()
+
+    return PlotQueue["ERRORS"]
+
+# Live plots
+#----------------------------------------------------------------------
+# In the real-time modes, some figures of the day are refreshed every
+# PLOT_LIVE seconds (ConPlots) while the day is processed. Each figure
+# stays in memory with the rendered image and what has been aggregated
+# so far. A refresh only draws the epochs added since the previous
+# one, on top of that image, so its cost does not grow during the day.
+# The whole image is rendered again only when the axes limits must
+# grow. The figures are generated as usual when the day is completed.
+
+# Elevation colour scale of the live plots
+LIVE_PLOT_ELEV = Normalize(0.0, 90.0)
+
+def initLivePlot(PreproObsFile, Title, Label, yLabel, ColorBarLabel=None):
+
+    # Function creating the figure of a live plot, outside pyplot so
+    # that it is not closed by the other plots. Returns the live plot:
+    # figure, axes, path, y limits, aggregated state and whether the
+    # whole image must be rendered
+
+    PlotConf = {}
+    initPlot(PreproObsFile, PlotConf, Title, Label)
+
+    Fig = Figure(figsize=(8.4,7.6))
+    FigureCanvasAgg(Fig)
+    Ax = Fig.add_subplot(111)
+
+    Ax.set_title(PlotConf["Title"])
+    Ax.set_xlabel(PlotConf["xLabel"])
+    Ax.set_ylabel(yLabel)
+    Ax.set_xticks(range(0,25))
+    Ax.set_xlim([0,24])
+    Ax.grid(linestyle = '--', linewidth = 0.5, which = 'both')
+
+    if ColorBarLabel is not None:
+        Fig.colorbar(ScalarMappable(norm = LIVE_PLOT_ELEV, cmap = "gnuplot"), ax = Ax,
+            label = ColorBarLabel)
+
+    LivePlot = OrderedDict({})
+    LivePlot["FIG"] = Fig
+    LivePlot["AX"] = Ax
+    LivePlot["PATH"] = PlotConf["Path"]
+    LivePlot["YLIM"] = None
+    LivePlot["STATE"] = {}
+    LivePlot["REDRAW"] = True
+
+    return LivePlot
+
+def extendLivePlotLimits(LivePlot, yMin, yMax, Margin=0.1):
+
+    # Function growing the y limits of a live plot to cover [yMin,
+    # yMax], with some margin so that they rarely grow again
+
+    if LivePlot["YLIM"] is not None and yMin >= LivePlot["YLIM"][0] and \
+        yMax <= LivePlot["YLIM"][1]:
+        return
+
+    if LivePlot["YLIM"] is not None:
+        yMin = min(yMin, LivePlot["YLIM"][0])
+        yMax = max(yMax, LivePlot["YLIM"][1])
+
+    Span = max(yMax - yMin, 1.0)
+    LivePlot["YLIM"] = [yMin - Margin * Span, yMax + Margin * Span]
+    LivePlot["AX"].set_ylim(LivePlot["YLIM"])
+    LivePlot["REDRAW"] = True
+
+# Live Satellite Visibility
+def initLiveSatVisibility(PreproObsFile):
+
+    LivePlot = initLivePlot(PreproObsFile, "Satellites Visibility", "SATS_VISIBILITY_vs_TIME",
+        "GPS-PRN", "Elevation [Deg]")
+    LivePlot["STATE"]["PRNMAX"] = 0
+
+    return LivePlot
+
+def updateLiveSatVisibility(LivePlot, PreproObsData):
+
+    Prn, Sod, Elev, Status = GetColumns(PreproObsData, ["PRN", "SOD", "ELEV", "STATUS"])
+
+    # PRN axis up to the highest PRN seen
+    if Prn.max() > LivePlot["STATE"]["PRNMAX"]:
+        LivePlot["STATE"]["PRNMAX"] = int(Prn.max())
+        LivePlot["AX"].set_yticks(range(1, LivePlot["STATE"]["PRNMAX"] + 1))
+        LivePlot["AX"].set_ylim([0, LivePlot["STATE"]["PRNMAX"] + 1])
+        LivePlot["REDRAW"] = True
+
+    Smoothed = Status == 1
+    return [LivePlot["AX"].scatter(Sod[~Smoothed] / GnssConstants.S_IN_H, Prn[~Smoothed],
+            color = "silver", marker = '.', s = 4),
+        LivePlot["AX"].scatter(Sod[Smoothed] / GnssConstants.S_IN_H, Prn[Smoothed],
+            c = Elev[Smoothed], cmap = "gnuplot", norm = LIVE_PLOT_ELEV, marker = '.', s = 9)]
+
+# Live Number of Satellites
+def initLiveNumSats(PreproObsFile):
+
+    LivePlot = initLivePlot(PreproObsFile, "Number of Satellites", "SATS_vs_TIME",
+        "Number of Satellites")
+    extendLivePlotLimits(LivePlot, 0, 15, Margin=0.0)
+
+    # Last epoch drawn, the new lines start from it
+    LivePlot["STATE"]["LAST"] = None
+
+    Handles = [LivePlot["AX"].plot([], [], color = Color, linewidth = 0.75)[0] \
+        for Color in ["C0", "C1"]]
+    LivePlot["AX"].legend(Handles, ["Raw","Smoothed"])
+
+    return LivePlot
+
+def updateLiveNumSats(LivePlot, PreproObsData):
+
+    # Number of satellites and number of smoothed ones per epoch
+    EpochSod, Status = GetColumns(PreproObsData, ["SOD", "STATUS"])
+    Sod, Index, SatsRaw = np.unique(EpochSod, return_inverse=True, return_counts=True)
+    SatsSmooth = np.bincount(Index, weights=Status.astype(np.float64))
+    Hour = Sod / GnssConstants.S_IN_H
+
+    extendLivePlotLimits(LivePlot, 0, SatsRaw.max() + 1, Margin=0.0)
+
+    Last = LivePlot["STATE"]["LAST"]
+    if Last is not None:
+        Hour = np.insert(Hour, 0, Last[0])
+        SatsRaw = np.insert(SatsRaw, 0, Last[1])
+        SatsSmooth = np.insert(SatsSmooth, 0, Last[2])
+    LivePlot["STATE"]["LAST"] = [Hour[-1], SatsRaw[-1], SatsSmooth[-1]]
+
+    return [LivePlot["AX"].plot(Hour, SatsRaw, color = "C0", linewidth = 0.75)[0],
+        LivePlot["AX"].plot(Hour, SatsSmooth, color = "C1", linewidth = 0.75)[0]]
+
+# Live VTEC Gradient
+def initLiveVtecGradient(PreproObsFile):
+
+    return initLivePlot(PreproObsFile, "VTEC Gradient", "VTEC_GRADIENT_vs_TIME",
+        "VTEC rate [mm/s]", "Elevation [Deg]")
+
+def updateLiveVtecGradient(LivePlot, PreproObsData):
+
+    return updateLiveScatter(LivePlot, PreproObsData, "VTEC RATE")
+
+# Live AATR index
+def initLiveAatr(PreproObsFile):
+
+    return initLivePlot(PreproObsFile, "AATR Index", "AATR_vs_TIME",
+        "AATR Index [mm/s]", "Elevation [Deg]")
+
+def updateLiveAatr(LivePlot, PreproObsData):
+
+    return updateLiveScatter(LivePlot, PreproObsData, "iAATR")
+
+def updateLiveScatter(LivePlot, PreproObsData, Col):
+
+    # Function drawing column Col of the smoothed measurements vs time,
+    # coloured by elevation
+
+    FilterCond = GetFilterCond(PreproObsData, "STATUS", 1)
+    Sod, Values, Elev = GetColumns(PreproObsData, ["SOD", Col, "ELEV"], FilterCond)
+    if len(Sod) == 0:
+        return []
+
+    extendLivePlotLimits(LivePlot, Values.min(), Values.max())
+
+    return [LivePlot["AX"].scatter(Sod / GnssConstants.S_IN_H, Values, c = Elev,
+        cmap = "gnuplot", norm = LIVE_PLOT_ELEV, marker = '+', linewidth = 0.25)]
+
+# Init and update functions of each live plot
+LivePlotFuncs = OrderedDict({})
+LivePlotFuncs["PLOT_VIS"] = [initLiveSatVisibility, updateLiveSatVisibility]
+LivePlotFuncs["PLOT_NSAT"] = [initLiveNumSats, updateLiveNumSats]
+LivePlotFuncs["PLOT_VTEC"] = [initLiveVtecGradient, updateLiveVtecGradient]
+LivePlotFuncs["PLOT_AATR_INDEX"] = [initLiveAatr, updateLiveAatr]
+
+def saveLivePlot(LivePlot, Artists):
+
+    # Function drawing the new artists of a live plot on its image, or
+    # rendering the whole image if needed, and saving it. The image is
+    # written under a temporary name and renamed, so that a partial
+    # figure is never found
+
+    Canvas = LivePlot["FIG"].canvas
+    if LivePlot["REDRAW"]:
+        Canvas.draw()
+        LivePlot["REDRAW"] = False
+    else:
+        for Artist in Artists:
+            LivePlot["AX"].draw_artist(Artist)
+
+    os.makedirs(os.path.dirname(LivePlot["PATH"]), exist_ok=True)
+    TmpPath = LivePlot["PATH"] + ".tmp"
+    matplotlib.image.imsave(TmpPath, np.asarray(Canvas.buffer_rgba()), format="png")
+    os.replace(TmpPath, LivePlot["PATH"])
+
+def initLivePlots(PreproObsFile, PreproTable):
+
+    # Purpose: start the live figures of a day processed in real time,
+    #          if PLOT_LIVE is set in ConPlots
+
+    # Parameters
+    # ==========
+    # PreproObsFile: str
+    #                Path to PREPRO OBS output file
+    # PreproTable: dict
+    #              In-memory table of the PREPRO OBS outputs (see
+    #              createPreproTable), growing during the day
+
+    # Returns
+    # =======
+    # LivePlots: dict
+    #            Live figures, table rows already drawn and time of
+    #            the last refresh, None if not requested
+
+    Plots = [Plot for Plot in LivePlotFuncs if Conf[Plot] == 1]
+    if Conf["PLOT_LIVE"] == 0 or len(Plots) == 0:
+        return None
+
+    LivePlots = OrderedDict({})
+    LivePlots["TABLE"] = PreproTable
+    LivePlots["PLOTS"] = OrderedDict({})
+    for Plot in Plots:
+        LivePlots["PLOTS"][Plot] = LivePlotFuncs[Plot][0](PreproObsFile)
+    LivePlots["ROW"] = 0
+    LivePlots["TIME"] = time.time()
+
+    return LivePlots
+
+def updateLivePlots(LivePlots, Force=False):
+
+    # Purpose: refresh the live figures with the rows added to the
+    #          table since the previous refresh, once every PLOT_LIVE
+    #          seconds
+
+    # Parameters
+    # ==========
+    # LivePlots: dict
+    #            Live figures (see initLivePlots), updated, None if not
+    #            requested
+    # Force: bool
+    #        Refresh now
+
+    # Returns
+    # =======
+    # Nothing
+
+    if LivePlots is None:
+        return
+
+    if not Force and time.time() - LivePlots["TIME"] < Conf["PLOT_LIVE"]:
+        return
+
+    LivePlots["TIME"] = time.time()
+
+    NRows = len(LivePlots["TABLE"]["COLUMNS"]["SOD"])
+    if NRows == LivePlots["ROW"]:
+        return
+
+    # New rows only
+    PreproData = getPreproTableData(LivePlots["TABLE"], LivePlots["ROW"], NRows)
+    PreproObsData = {PreproIdx[Col]: Column for Col, Column in PreproData.items()}
+    LivePlots["ROW"] = NRows
+
+    for Plot, LivePlot in LivePlots["PLOTS"].items():
+        Artists = LivePlotFuncs[Plot][1](LivePlot, PreproObsData)
+        saveLivePlot(LivePlot, Artists)
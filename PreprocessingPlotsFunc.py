@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+########################################################################
+# PETRUS/SRC/PreprocessingPlotsFunc.py:
+# This is the PreprocessingPlotsFunc Module of PETRUS tool
+#
+#  Project:        PETRUS
+#  File:           PreprocessingPlotsFunc.py
+#  Date(YY/MM/DD): 05/02/21
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+# -----------------------------------------------------------------
+# Date       | Author             | Action
+# -----------------------------------------------------------------
+#
+########################################################################
+
+# Import External and Internal functions and Libraries
+#----------------------------------------------------------------------
+import numpy as np
+from collections import OrderedDict
+from InputOutput import PreproIdx
+from COMMON import GnssConstants
+
+# Vectorized data reductions used by the Preprocessing plots
+#----------------------------------------------------------------------
+
+def GetColumns(PreproObsData, Columns, FilterCond=None):
+
+    # Function returning PREPRO OBS columns as numpy arrays, keeping
+    # only the rows where FilterCond is True if given
+
+    Values = []
+    for Col in Columns:
+        Column = np.asarray(PreproObsData[PreproIdx[Col]])
+        if FilterCond is not None:
+            Column = Column[FilterCond]
+        Values.append(Column)
+
+    return Values
+
+def GetFilterCond(PreproObsData, Col, Value, Equal=True):
+
+    # Function returning the boolean array of the rows where column
+    # Col is (or is not) equal to Value
+
+    Column = np.asarray(PreproObsData[PreproIdx[Col]])
+    if Equal:
+        return Column == Value
+
+    return Column != Value
+
+def GetPrnList(PreproObsData):
+
+    # Function returning the sorted list of PRNs found
+
+    return np.unique(np.asarray(PreproObsData[PreproIdx["PRN"]])).tolist()
+
+def CountPerEpoch(Sod, Weights=None):
+
+    # Function counting the rows of every second of the day
+    # (0 to S_IN_D), or adding their Weights
+
+    Counts = np.bincount(np.asarray(Sod, dtype=np.int64), weights=Weights,
+        minlength=GnssConstants.S_IN_D + 1)
+
+    return Counts[:GnssConstants.S_IN_D + 1]
+
+def ComputeDifference(Minuend, Subtrahend):
+
+    # Function computing the element-wise difference of two columns
+    # in double precision
+
+    return np.asarray(Minuend, dtype=np.float64) - \
+        np.asarray(Subtrahend, dtype=np.float64)
+
+def SplitBySat(Prn, Columns):
+
+    # Function grouping columns by PRN: rows are sorted once by PRN,
+    # keeping their time order, and split where the PRN changes.
+    # Returns an OrderedDict with PRN as key and the list of column
+    # slices as value
+
+    Prn = np.asarray(Prn)
+    Order = np.argsort(Prn, kind="stable")
+    SortedPrn = Prn[Order]
+    SortedColumns = [np.asarray(Column)[Order] for Column in Columns]
+
+    PrnList, Starts = np.unique(SortedPrn, return_index=True)
+    Ends = np.append(Starts[1:], len(SortedPrn))
+
+    Groups = OrderedDict({})
+    for Sat, Start, End in zip(PrnList.tolist(), Starts, Ends):
+        Groups[Sat] = [Column[Start:End] for Column in SortedColumns]
+
+    return Groups
+
+########################################################################
+# End of PreprocessingPlotsFunc.py
+########################################################################
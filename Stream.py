@@ -0,0 +1,519 @@
+#!/usr/bin/env python
+
+########################################################################
+# PETRUS/SRC/Stream.py:
+# This is the Stream Module of PETRUS tool: ingestion of live OBS
+# streams received over local TCP or Unix-domain sockets
+#
+#  Project:        PETRUS
+#  File:           Stream.py
+#  Date(YY/MM/DD): 01/02/21
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+# -----------------------------------------------------------------
+# Date       | Author             | Action
+# -----------------------------------------------------------------
+#
+########################################################################
+
+# Import External and Internal functions and Libraries
+#----------------------------------------------------------------------
+import sys, os
+import time
+import math
+import socket
+from threading import Thread, Event
+from queue import Queue, Empty
+from collections import OrderedDict
+from InputOutput import ObsIdx
+from InputOutput import splitLine
+from InputOutput import selectObsEpoch
+from Pipeline import putPipelineItem
+
+# Stream items
+#----------------------------------------------------------------------
+# New connection, malformed line and end of connection markers
+STREAM_OPEN = "OPEN"
+STREAM_BAD = "BAD"
+STREAM_END = None
+
+# Time between checks of the stop request and idle time [s]
+STREAM_POLL = 0.1
+
+def getStreamAddress(Address):
+
+    # Purpose: get the socket family and address of a stream address
+
+    # Parameters
+    # ==========
+    # Address: str
+    #          HOST:PORT for TCP, path for Unix-domain sockets
+
+    # Returns
+    # =======
+    # Family: int
+    #         Socket family
+    # SockAddr: tuple or str
+    #           Socket address
+
+    Host, Sep, Port = Address.rpartition(':')
+    if Sep and Port.isdigit() and '/' not in Address:
+        return socket.AF_INET, (Host if Host else "127.0.0.1", int(Port))
+
+    return socket.AF_UNIX, Address
+
+# End of getStreamAddress()
+
+def openStreamServer(Address):
+
+    # Function opening the listening socket of a stream address
+
+    Family, SockAddr = getStreamAddress(Address)
+    Server = socket.socket(Family, socket.SOCK_STREAM)
+
+    if Family == socket.AF_UNIX:
+        # Remove the socket file left by a previous run
+        if os.path.exists(SockAddr):
+            os.remove(SockAddr)
+    else:
+        Server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    Server.bind(SockAddr)
+    Server.listen(16)
+    Server.settimeout(STREAM_POLL)
+
+    return Server
+
+def removeStreamAddress(Address):
+
+    # Function removing the socket file of a Unix-domain stream address
+
+    Family, SockAddr = getStreamAddress(Address)
+    if Family == socket.AF_UNIX and os.path.exists(SockAddr):
+        os.remove(SockAddr)
+
+def isStreamIdle(Assembler, StreamStats, Idle):
+
+    # Function checking if the stream has ended: all the senders are
+    # disconnected and none came back for Idle seconds (0: never ends)
+
+    return len(Assembler["OPEN"]) == 0 and StreamStats["CONNECTIONS"] > 0 and \
+        Idle > 0 and time.time() - Assembler["IDLE"] > Idle
+
+def initStreamStats():
+
+    # Purpose: initialize the counters of the OBS stream
+
+    # Parameters
+    # ==========
+    # None
+
+    # Returns
+    # =======
+    # StreamStats: dict
+    #              Connections accepted and open, lines and epochs
+    #              received, late and malformed lines dropped, lines
+    #              waiting in the queue and time the last epoch was
+    #              completed
+
+    StreamStats = OrderedDict({})
+    StreamStats["CONNECTIONS"] = 0
+    StreamStats["OPEN"] = 0
+    StreamStats["LINES"] = 0
+    StreamStats["EPOCHS"] = 0
+    StreamStats["LATE"] = 0
+    StreamStats["BAD"] = 0
+    StreamStats["QUEUE"] = 0
+    StreamStats["ARRIVAL"] = 0.0
+
+    return StreamStats
+
+# End of initStreamStats()
+
+def getStreamEpoch(LineSplit):
+
+    # Function returning the (YEAR, DOY, SOD) of a received OBS line
+
+    return (int(LineSplit[ObsIdx["YEAR"]]), int(LineSplit[ObsIdx["DOY"]]),
+        float(LineSplit[ObsIdx["SOD"]]))
+
+def parseStreamLine(Line):
+
+    # Purpose: split an OBS line received, checking the columns used
+    #          to assemble the epochs
+
+    # Parameters
+    # ==========
+    # Line: bytes
+    #       Line received
+
+    # Returns
+    # =======
+    # LineSplit: list
+    #            Split line, empty for blank and header lines, None
+    #            for malformed lines (not text, missing columns or
+    #            invalid epoch or PRN)
+
+    try:
+        LineSplit = splitLine(Line.decode())
+
+    except UnicodeDecodeError:
+        return None
+
+    # Blank and header lines
+    if len(LineSplit) == 0 or LineSplit[0].startswith('#'):
+        return []
+
+    if len(LineSplit) < len(ObsIdx):
+        return None
+
+    try:
+        Epoch = getStreamEpoch(LineSplit)
+        int(LineSplit[ObsIdx["PRN"]])
+
+    except ValueError:
+        return None
+
+    if not math.isfinite(Epoch[2]):
+        return None
+
+    return LineSplit
+
+# End of parseStreamLine()
+
+def runStreamConnection(Conn, ConnId, LineQueue, Stop):
+
+    # Purpose: connection thread, putting the lines received in the
+    #          queue. While the queue is full the socket is not read,
+    #          so the sender is slowed down (back-pressure)
+
+    # Parameters
+    # ==========
+    # Conn: socket
+    #       Connection
+    # ConnId: int
+    #         Connection identifier
+    # LineQueue: Queue
+    #            Bounded queue of (ConnId, split line, arrival time)
+    # Stop: Event
+    #       Stream stop request
+
+    # Returns
+    # =======
+    # Nothing
+
+    NBad = 0
+    try:
+        with Conn, Conn.makefile('rb') as f:
+            for Line in f:
+                # Incomplete line at the end of the connection
+                if not Line.endswith(b"\n"):
+                    sys.stderr.write("WARNING: Ignoring incomplete line of connection %d\n" %
+                    ConnId)
+                    break
+
+                LineSplit = parseStreamLine(Line)
+
+                # Skip blank and header lines
+                if LineSplit == []:
+                    continue
+
+                # Malformed lines are dropped, and only counted
+                if LineSplit is None:
+                    NBad = NBad + 1
+                    if NBad == 1:
+                        sys.stderr.write("WARNING: Dropping malformed lines of connection "\
+                            "%d, first: %r\n" % (ConnId, Line[:80]))
+                    LineSplit = STREAM_BAD
+
+                if not putPipelineItem(LineQueue, (ConnId, LineSplit, time.time()), Stop):
+                    break
+
+    except Exception as Error:
+        sys.stderr.write("WARNING: Connection %d: %s\n" % (ConnId, Error))
+
+    # Always sent, or the connection would hold back all the epochs
+    putPipelineItem(LineQueue, (ConnId, STREAM_END, time.time()), Stop)
+
+# End of runStreamConnection()
+
+def runStreamAccept(Server, LineQueue, Stop):
+
+    # Purpose: accept thread, starting a connection thread for every
+    #          sender connected
+
+    # Parameters
+    # ==========
+    # Server: socket
+    #         Listening socket
+    # LineQueue: Queue
+    #            Bounded queue of (ConnId, split line, arrival time)
+    # Stop: Event
+    #       Stream stop request
+
+    # Returns
+    # =======
+    # Nothing
+
+    ConnId = 0
+    while not Stop.is_set():
+        try:
+            Conn, Peer = Server.accept()
+
+        except socket.timeout:
+            continue
+
+        except OSError:
+            break
+
+        Conn.settimeout(None)
+        ConnId = ConnId + 1
+
+        # Announce the connection before any of its lines
+        if not putPipelineItem(LineQueue, (ConnId, STREAM_OPEN, time.time()), Stop):
+            Conn.close()
+            break
+
+        Thread(target=runStreamConnection, args=(Conn, ConnId, LineQueue, Stop),
+            daemon=True).start()
+
+# End of runStreamAccept()
+
+def initStreamEpochs():
+
+    # Purpose: initialize the assembly in epochs of the OBS lines
+    #          received from one or more connections (see
+    #          addStreamItem)
+
+    # Parameters
+    # ==========
+    # None
+
+    # Returns
+    # =======
+    # Assembler: dict
+    #            Epochs being assembled ([connections, lines]) and last
+    #            epoch received per open connection, by (YEAR, DOY, SOD),
+    #            time of the last item of every open connection, last
+    #            epoch completed and time the last connection was
+    #            closed
+
+    Assembler = OrderedDict({})
+    Assembler["EPOCHS"] = {}
+    Assembler["OPEN"] = OrderedDict({})
+    Assembler["SEEN"] = {}
+    Assembler["LAST"] = None
+    Assembler["IDLE"] = time.time()
+
+    return Assembler
+
+# End of initStreamEpochs()
+
+def addStreamItem(Assembler, ConnId, Item, StreamStats, Stale=0):
+
+    # Purpose: add an item received from a connection to the epochs
+    #          being assembled. An epoch is complete when every open
+    #          connection has sent a later epoch (or has closed, or
+    #          has been silent for Stale seconds), so the lines of an
+    #          epoch may come from several senders. Lines of epochs
+    #          already completed are dropped as late
+
+    # Parameters
+    # ==========
+    # Assembler: dict
+    #            Epochs being assembled (see initStreamEpochs), updated
+    # ConnId: int
+    #         Connection identifier
+    # Item: list
+    #       Split line (see parseStreamLine), STREAM_OPEN, STREAM_BAD
+    #       or STREAM_END
+    # StreamStats: dict
+    #              Stream counters (see initStreamStats), updated
+    # Stale: float
+    #        Seconds a silent connection holds back the epochs
+    #        (0: until it closes)
+
+    # Returns
+    # =======
+    # EpochsInfo: list
+    #             Epochs completed (list of the split lines), in order
+
+    Epochs = Assembler["EPOCHS"]
+    Open = Assembler["OPEN"]
+
+    if Item == STREAM_OPEN:
+        Open[ConnId] = None
+        Assembler["SEEN"][ConnId] = time.time()
+        StreamStats["CONNECTIONS"] = StreamStats["CONNECTIONS"] + 1
+        StreamStats["OPEN"] = len(Open)
+        return []
+
+    if Item is STREAM_END:
+        del Open[ConnId]
+        del Assembler["SEEN"][ConnId]
+        StreamStats["OPEN"] = len(Open)
+        Assembler["IDLE"] = time.time()
+
+    elif Item == STREAM_BAD:
+        Assembler["SEEN"][ConnId] = time.time()
+        StreamStats["BAD"] = StreamStats["BAD"] + 1
+        return []
+
+    else:
+        Key = getStreamEpoch(Item)
+        Assembler["SEEN"][ConnId] = time.time()
+        StreamStats["LINES"] = StreamStats["LINES"] + 1
+
+        # Lines of epochs already processed cannot be used
+        if Assembler["LAST"] is not None and Key <= Assembler["LAST"]:
+            StreamStats["LATE"] = StreamStats["LATE"] + 1
+            return []
+
+        if Key not in Epochs:
+            Epochs[Key] = [set(), []]
+        Epochs[Key][0].add(ConnId)
+        Epochs[Key][1].append(Item)
+        Open[ConnId] = Key
+
+    return completeStreamEpochs(Assembler, Stale)
+
+# End of addStreamItem()
+
+def completeStreamEpochs(Assembler, Stale=0):
+
+    # Purpose: complete the epochs before the last one of every open
+    #          connection (see addStreamItem). Connections silent for
+    #          more than Stale seconds do not hold them back, so that
+    #          a sender that stopped sending without closing does not
+    #          hold every epoch in memory
+
+    # Parameters
+    # ==========
+    # Assembler: dict
+    #            Epochs being assembled (see initStreamEpochs), updated
+    # Stale: float
+    #        Seconds a silent connection holds back the epochs
+    #        (0: until it closes)
+
+    # Returns
+    # =======
+    # EpochsInfo: list
+    #             Epochs completed (list of the split lines), in order
+
+    Epochs = Assembler["EPOCHS"]
+    if len(Epochs) == 0:
+        return []
+
+    # Last epoch of the connections holding back the epochs
+    Now = time.time()
+    Holding = [Key for ConnId, Key in Assembler["OPEN"].items() \
+        if Stale == 0 or Now - Assembler["SEEN"][ConnId] <= Stale]
+
+    # A connection that has not sent any line yet holds them all
+    if None in Holding:
+        return []
+
+    EpochsInfo = []
+    for Key in sorted(Epochs):
+        if len(Holding) > 0 and Key >= min(Holding):
+            break
+
+        ConnIds, EpochInfo = Epochs.pop(Key)
+
+        # Lines from several senders are sorted by satellite so
+        # the epoch does not depend on their arrival order
+        if len(ConnIds) > 1:
+            EpochInfo.sort(key=lambda Line: (Line[ObsIdx["CONST"]], int(Line[ObsIdx["PRN"]])))
+
+        Assembler["LAST"] = Key
+        EpochsInfo.append(EpochInfo)
+
+    return EpochsInfo
+
+# End of completeStreamEpochs()
+
+def streamObsEpochs(Address, Depth, Idle, Stale, StreamStats, SodWindow=None,
+    ObsFilter=None, FilterStats=None):
+
+    # Purpose: receive OBS lines from one or more connections and
+    #          yield the epochs as they are completed (see
+    #          addStreamItem)
+
+    # Parameters
+    # ==========
+    # Address: str
+    #          HOST:PORT for TCP, path for Unix-domain sockets
+    # Depth: int
+    #        Maximum number of lines waiting to be assembled
+    # Idle: float
+    #       Seconds to wait for new connections once all of them are
+    #       closed before ending the stream (0: wait forever)
+    # Stale: float
+    #        Seconds a silent connection holds back the epochs
+    #        (0: until it closes)
+    # StreamStats: dict
+    #              Stream counters (see initStreamStats), updated
+    # SodWindow: list
+    #            [First SoD, Last SoD] of the epochs to read (optional)
+    # ObsFilter: dict
+    #            OBS reader filters (see buildObsFilter) (optional)
+    # FilterStats: dict
+    #              OBS reader filters statistics, needed with ObsFilter
+
+    # Returns
+    # =======
+    # EpochInfo: list (one per iteration)
+    #            list of the split lines (see readObsEpochs)
+
+    Server = openStreamServer(Address)
+    LineQueue = Queue(maxsize=int(Depth))
+    Stop = Event()
+    Accept = Thread(target=runStreamAccept, args=(Server, LineQueue, Stop), daemon=True)
+    Accept.start()
+
+    # Display Message
+    print("INFO: Listening for OBS streams on: %s..." % Address)
+    sys.stdout.flush()
+
+    Assembler = initStreamEpochs()
+
+    try:
+        while True:
+            try:
+                ConnId, Item, Arrival = LineQueue.get(timeout=STREAM_POLL)
+                EpochsInfo = addStreamItem(Assembler, ConnId, Item, StreamStats, Stale)
+
+            except Empty:
+                # End of stream when no sender came back in time
+                if isStreamIdle(Assembler, StreamStats, Idle):
+                    break
+
+                # Epochs held back by silent connections
+                Arrival = time.time()
+                EpochsInfo = completeStreamEpochs(Assembler, Stale)
+
+            StreamStats["QUEUE"] = LineQueue.qsize()
+
+            for EpochInfo in EpochsInfo:
+                EpochInfo = selectObsEpoch(EpochInfo, SodWindow, ObsFilter, FilterStats)
+                if len(EpochInfo) > 0:
+                    # Completed by the item just received or by the
+                    # silence of a connection
+                    StreamStats["EPOCHS"] = StreamStats["EPOCHS"] + 1
+                    StreamStats["ARRIVAL"] = Arrival
+                    yield EpochInfo
+
+        # End of while True:
+
+    finally:
+        Stop.set()
+        Server.close()
+        removeStreamAddress(Address)
+
+# End of streamObsEpochs()
+
+########################################################################
+# End of Stream.py
+########################################################################
@@ -0,0 +1,179 @@
+########################################################################
+# PETRUS/SRC/tests/conftest.py:
+# Small synthetic scenario and helpers to run PETRUS in the tests
+#
+#  Project:        PETRUS
+#  File:           conftest.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import sys
+import time
+import math
+import random
+import subprocess
+import pytest
+
+SrcDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# PETRUS needs the COMMON library next to its sources
+if not os.path.isdir(os.path.join(SrcDir, "COMMON")):
+    collect_ignore_glob = ["test_*.py"]
+
+# Scenario: 2 receivers, 2 days of GPS observations every 30 seconds
+# over the first hours of the day
+ScenCfg = """# Test scenario
+INI_DATE 01/01/2021
+END_DATE 02/01/2021
+SAMPLING_RATE 30
+PREPRO_OUT 1
+RCVR_FILE RCVR.dat
+NCHANNELS_GPS 9
+NCHANNELS_GAL 9
+MIN_CNR 1 20
+MIN_NCS_TH 1 1 3
+MAX_PSR_OUTRNG 1 330000000
+MAX_CODE_RATE 1 952
+MAX_CODE_RATE_STEP 1 10
+MAX_PHASE_RATE 1 952
+MAX_PHASE_RATE_STEP 1 10
+HATCH_GAP_TH 90
+HATCH_TIME 100
+HATCH_STATE_F 3
+"""
+
+ScenRcvrs = "# ACR FLAG ID LON LAT ALT MASK ACQ\n"\
+    "TLSA 1 1 1.48 43.56 200 5 10\n"\
+    "MADR 1 2 -3.7 40.4 650 10 10\n"
+
+ObsHdr = "#  SOD DOY YEAR C PRN ELEV AZIM C1 L1 P2 L2 S1 S2\n"
+ObsLineFmt = "%6d %3d %4d %s %02d %8.3f %8.3f %15.3f %15.3f %15.3f %15.3f %6.2f %6.2f\n"
+
+L1Wave = 0.190293672798
+L2Wave = 0.244210213425
+
+def writeObsFile(Path, Doy, Seed, Step=30, Duration=10800):
+
+    # Function writing a synthetic OBS file of one day: satellites
+    # rising and setting, with some missing lines and cycle slips
+
+    Rnd = random.Random(Seed)
+    Phase = dict([(Prn, Rnd.uniform(0, 2 * math.pi)) for Prn in range(1, 33)])
+    Amb = dict([(Prn, Rnd.randint(-100000, 100000)) for Prn in range(1, 33)])
+
+    with open(Path, 'w') as f:
+        f.write(ObsHdr)
+        for Sod in range(0, Duration, Step):
+            for Prn in range(1, 33):
+                Elev = 90 * math.sin(2 * math.pi * (Sod + 86400 * (Doy - 1)) / 43080.0 + \
+                    Phase[Prn]) - 20
+                if Elev < 0 or Rnd.random() < 0.003:
+                    continue
+                Azim = (Phase[Prn] * 57 + Sod / 200.0) % 360
+                Range = 2.0e7 + 5.0e6 * math.cos(math.radians(Elev)) + \
+                    300 * math.sin(Sod / 5000.0 + Prn)
+                if Rnd.random() < 0.002:
+                    Amb[Prn] = Amb[Prn] + Rnd.randint(2, 50)
+                C1 = Range + Rnd.gauss(0, 0.5)
+                L1 = Range / L1Wave + Amb[Prn]
+                L2 = (Range + 2.0 + math.sin(Sod / 3000.0)) / L2Wave + Amb[Prn] * 0.7
+                S1 = 30 + Elev / 4 + Rnd.gauss(0, 1)
+                f.write(ObsLineFmt % (Sod, Doy, 2021, "G", Prn, Elev, Azim, C1, L1,
+                    C1 + 3.0, L2, S1, S1 - 5))
+
+def createScen(Path, CfgExtra=""):
+
+    # Function creating the test scenario in Path, with the extra conf
+    # lines given. Returns the path to the scenario
+
+    for Dir in ["CFG", "INP/RCVR", "INP/OBS", "OUT/PPVE"]:
+        os.makedirs(os.path.join(Path, Dir), exist_ok=True)
+
+    with open(os.path.join(Path, "CFG", "petrus.cfg"), 'w') as f:
+        f.write(ScenCfg + CfgExtra)
+
+    with open(os.path.join(Path, "INP", "RCVR", "RCVR.dat"), 'w') as f:
+        f.write(ScenRcvrs)
+
+    for Seed, Rcvr in enumerate(["TLSA", "MADR"]):
+        for Doy in [1, 2]:
+            writeObsFile(os.path.join(Path, "INP", "OBS", "OBS_%s_Y21D%03d.dat" % (Rcvr, Doy)),
+                Doy, 100 * Seed + Doy)
+
+    return str(Path)
+
+def getPreproFiles(Scen):
+
+    # Function returning the contents of the PREPRO OBS files of a
+    # scenario, by file name
+
+    PreproDir = os.path.join(Scen, "OUT", "PPVE")
+    Files = {}
+    for Name in sorted(os.listdir(PreproDir)):
+        if Name.startswith("PREPRO_OBS_") and Name.endswith((".dat", ".bin")):
+            with open(os.path.join(PreproDir, Name), 'rb') as f:
+                Files[Name] = f.read()
+
+    return Files
+
+def startPetrus(Scen, *Args):
+
+    # Function starting PETRUS on a scenario, without waiting for it
+
+    Env = dict(os.environ, MPLBACKEND="Agg")
+
+    return subprocess.Popen([sys.executable, os.path.join(SrcDir, "Petrus.py"), Scen] + \
+        list(Args), cwd=os.path.dirname(Scen), env=Env, stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, universal_newlines=True)
+
+def runPetrus(Scen, *Args):
+
+    # Function running PETRUS on a scenario. Returns the exit code and
+    # the output
+
+    Process = startPetrus(Scen, *Args)
+    Output = Process.communicate(timeout=600)[0]
+
+    return Process.returncode, Output
+
+def waitPath(Path, Process, Timeout=60):
+
+    # Function waiting for a path (e.g. the socket of a stream) to be
+    # created by a running PETRUS
+
+    Start = time.time()
+    while not os.path.exists(Path):
+        assert Process.poll() is None, Process.communicate()[0]
+        assert time.time() - Start < Timeout, "%s not created" % Path
+        time.sleep(0.1)
+
+def sendObsFile(Address, ObsFile):
+
+    # Function replaying an OBS file to PETRUS over a stream
+
+    return subprocess.run([sys.executable, os.path.join(SrcDir, "PetrusTools.py"), "send",
+        Address, ObsFile], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True, timeout=600)
+
+@pytest.fixture(scope="session")
+def ref(tmp_path_factory):
+
+    # Baseline run of the test scenario: LINE reader and text outputs.
+    # Returns the path to the scenario
+
+    Scen = createScen(tmp_path_factory.mktemp("REF") / "SCEN", "OBS_READER LINE\n")
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+
+    return Scen
+
+@pytest.fixture
+def scen(tmp_path):
+
+    # Test scenario in a temporary folder
+
+    return createScen(tmp_path / "SCEN")
@@ -0,0 +1,99 @@
+########################################################################
+# PETRUS/SRC/tests/test_batch.py:
+# Batch mode job queue (Petrus.py --batch) with several local nodes
+#
+#  Project:        PETRUS
+#  File:           test_batch.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import time
+from conftest import createScen, getPreproFiles, startPetrus, runPetrus
+
+Jobs = ["MADR_2459216", "MADR_2459217", "TLSA_2459216", "TLSA_2459217"]
+
+def readJobManifest(Scen):
+
+    # Function returning the records of the job queue manifest
+
+    with open(os.path.join(Scen, "OUT", "JOBS", "MANIFEST.txt"), 'r') as f:
+        return [Line.split() for Line in f if not Line.startswith('#')]
+
+def checkJobQueue(Scen, Statuses=["DONE"]):
+
+    # Function checking that every job is DONE once, and recorded once
+    # in the manifest with one of the Statuses given
+
+    JobsDir = os.path.join(Scen, "OUT", "JOBS")
+    assert sorted(os.listdir(os.path.join(JobsDir, "DONE"))) == Jobs
+    for Dir in ["TODO", "CLAIMED", "FAILED"]:
+        assert os.listdir(os.path.join(JobsDir, Dir)) == []
+
+    Records = readJobManifest(Scen)
+    assert sorted([Record[0] for Record in Records]) == Jobs
+    assert all([Record[2] in Statuses for Record in Records])
+
+    return Records
+
+def test_batch_nodes(tmp_path):
+
+    # Three nodes on the same queue: every job is processed once, and
+    # the outputs are those of the serial run
+    Scen = createScen(tmp_path / "SCEN")
+    Nodes = [startPetrus(Scen, "--batch", "--node", "node%d" % i) for i in range(3)]
+    NDone = 0
+    for Node in Nodes:
+        Output = Node.communicate(timeout=600)[0]
+        assert Node.returncode == 0, Output
+        NDone = NDone + int(Output.split("finished: ")[1].split()[0])
+
+    assert NDone == len(Jobs)
+    Records = checkJobQueue(Scen)
+    assert set([Record[1] for Record in Records]) <= set(["node0", "node1", "node2"])
+
+    SerialScen = createScen(tmp_path / "SERIAL")
+    assert runPetrus(SerialScen)[0] == 0
+    assert getPreproFiles(Scen) == getPreproFiles(SerialScen)
+
+def test_batch_expired_claim(tmp_path):
+
+    # A job claimed by a node that died goes back to the queue once
+    # its claim expires, and the manifest is rebuilt with it
+    Scen = createScen(tmp_path / "SCEN", "JOB_HEARTBEAT 1\nJOB_TIMEOUT 2\n")
+    assert runPetrus(Scen, "--batch", "--node", "first")[0] == 0
+
+    JobsDir = os.path.join(Scen, "OUT", "JOBS")
+    Claim = os.path.join(JobsDir, "CLAIMED", "TLSA_2459217@dead")
+    os.rename(os.path.join(JobsDir, "DONE", "TLSA_2459217"), Claim)
+    open(Claim, 'w').close()
+    os.utime(Claim, (time.time() - 60, time.time() - 60))
+
+    Code, Output = runPetrus(Scen, "--batch", "--node", "second")
+    assert Code == 0, Output
+    assert "Claim expired" in Output
+
+    # The outputs of the job were left up to date by the first node
+    Records = dict([(Record[0], Record) for Record in checkJobQueue(Scen, ["DONE", "SKIP"])])
+    assert Records["TLSA_2459217"][2] == "SKIP"
+    assert Records["TLSA_2459217"][1] == "second"
+    assert Records["TLSA_2459216"][1] == "first"
+
+def test_batch_requeue(tmp_path):
+
+    # Finished jobs are only processed again when queued again
+    Scen = createScen(tmp_path / "SCEN")
+    assert runPetrus(Scen, "--batch", "--node", "first")[0] == 0
+
+    Code, Output = runPetrus(Scen, "--batch", "--node", "second")
+    assert Code == 0, Output
+    assert "finished: 0 jobs done" in Output
+
+    Code, Output = runPetrus(Scen, "--batch", "--node", "third", "--force")
+    assert Code == 0, Output
+    assert "finished: %d jobs done" % len(Jobs) in Output
+    assert "Up to date" not in Output
+    assert set([Record[1] for Record in checkJobQueue(Scen)]) == set(["third"])
@@ -0,0 +1,91 @@
+########################################################################
+# PETRUS/SRC/tests/test_engine.py:
+# Real-time engine of many receivers (Petrus.py --engine)
+#
+#  Project:        PETRUS
+#  File:           test_engine.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import threading
+import pytest
+from conftest import createScen, getPreproFiles, runPetrus, startPetrus, \
+    waitPath, sendObsFile
+
+def sendObsFiles(Scen, Rcvr, Address, Senders):
+
+    # Function replaying the OBS files of a receiver, day after day
+
+    for Doy in [1, 2]:
+        Senders.append(sendObsFile(Address, os.path.join(Scen, "INP", "OBS",
+            "OBS_%s_Y21D%03d.dat" % (Rcvr, Doy))))
+
+@pytest.mark.parametrize("Workers", [0, 2])
+def test_engine_stream(ref, tmp_path, Workers):
+
+    # The receivers streamed concurrently give the outputs of the
+    # baseline run
+    Scen = createScen(tmp_path / "SCEN", "STREAM_IDLE 5\nENGINE_WORKERS %d\n" % Workers)
+    Addresses = dict([(Rcvr, str(tmp_path / (Rcvr + ".sock"))) for Rcvr in ["TLSA", "MADR"]])
+    Process = startPetrus(Scen, "--engine", ",".join(["%s@%s" % Item \
+        for Item in Addresses.items()]))
+
+    Senders = []
+    Threads = []
+    for Rcvr, Address in Addresses.items():
+        waitPath(Address, Process)
+        Threads.append(threading.Thread(target=sendObsFiles,
+            args=(Scen, Rcvr, Address, Senders)))
+        Threads[-1].start()
+    for Thread in Threads:
+        Thread.join()
+    for Sender in Senders:
+        assert Sender.returncode == 0, Sender.stdout
+
+    Output = Process.communicate(timeout=600)[0]
+    assert Process.returncode == 0, Output
+    assert getPreproFiles(Scen) == getPreproFiles(ref)
+
+def test_engine_tail(ref, tmp_path):
+
+    # The receivers followed concurrently give the outputs of the
+    # baseline run
+    Scen = createScen(tmp_path / "SCEN", "TAIL_POLL 0.05\n")
+    for Rcvr in ["TLSA", "MADR"]:
+        with open(os.path.join(Scen, "INP", "OBS", "OBS_%s_Y21D003.dat" % Rcvr), 'w') as f:
+            f.write("#  SOD DOY YEAR C PRN ELEV AZIM C1 L1 P2 L2 S1 S2\n")
+
+    Code, Output = runPetrus(Scen, "--engine", "ALL")
+    assert Code == 0, Output
+    assert getPreproFiles(Scen) == getPreproFiles(ref)
+
+def test_engine_failed_source(scen, tmp_path):
+
+    # A receiver whose stream cannot be opened fails the run
+    Address = str(tmp_path / "MISSING" / "TLSA.sock")
+    Code, Output = runPetrus(scen, "--engine", "TLSA@" + Address)
+    assert Code != 0, Output
+    assert "TLSA: Failed receiving the OBS stream" in Output
+    assert "Some receivers could not be processed" in Output
+
+def test_engine_failed_receiver(ref, tmp_path):
+
+    # The other receivers are processed when one of them fails
+    Scen = createScen(tmp_path / "SCEN", "STREAM_IDLE 5\n")
+    Address = str(tmp_path / "TLSA.sock")
+    Process = startPetrus(Scen, "--engine", "TLSA@" + Address + \
+        ",MADR@" + str(tmp_path / "MISSING" / "MADR.sock"))
+    waitPath(Address, Process)
+    Senders = []
+    sendObsFiles(Scen, "TLSA", Address, Senders)
+
+    Output = Process.communicate(timeout=600)[0]
+    assert Process.returncode != 0, Output
+    assert "MADR: Failed receiving the OBS stream" in Output
+    Files = getPreproFiles(ref)
+    assert getPreproFiles(Scen) == dict([(Name, Files[Name]) for Name in Files \
+        if "_TLSA_" in Name])
@@ -0,0 +1,41 @@
+########################################################################
+# PETRUS/SRC/tests/test_jobs.py:
+# Receivers and days run in parallel processes (Petrus.py --jobs N)
+#
+#  Project:        PETRUS
+#  File:           test_jobs.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+from conftest import createScen, getPreproFiles, runPetrus
+
+def test_jobs_serial(tmp_path):
+
+    # The outputs of the parallel jobs are those of the serial run
+    Scen = createScen(tmp_path / "SCEN")
+    Code, Output = runPetrus(Scen, "--jobs", "2")
+    assert Code == 0, Output
+
+    SerialScen = createScen(tmp_path / "SERIAL")
+    assert runPetrus(SerialScen)[0] == 0
+
+    Files = getPreproFiles(Scen)
+    assert len(Files) == 4
+    assert Files == getPreproFiles(SerialScen)
+
+def test_jobs_failed(tmp_path):
+
+    # A job that fails does not stop the others, but Petrus exits with
+    # an error
+    Scen = createScen(tmp_path / "SCEN")
+    with open(os.path.join(Scen, "INP", "OBS", "OBS_MADR_Y21D002.dat"), 'a') as f:
+        f.write("corrupted line\n")
+
+    Code, Output = runPetrus(Scen, "--jobs", "2")
+    assert Code != 0
+    assert "ERROR: Some receivers and days could not be processed" in Output
+    assert "PREPRO_OBS_TLSA_Y21D002.dat" in getPreproFiles(Scen)
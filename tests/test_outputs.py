@@ -0,0 +1,90 @@
+########################################################################
+# PETRUS/SRC/tests/test_outputs.py:
+# Binary PREPRO OBS outputs (PREPRO_FORMAT, PREPRO_BIN_COMPRESS) and
+# outputs in segments (PREPRO_SEGMENTS), against the baseline text
+# outputs
+#
+#  Project:        PETRUS
+#  File:           test_outputs.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import sys
+import json
+import pytest
+from conftest import SrcDir, createScen, getPreproFiles, runPetrus
+
+sys.path.insert(0, SrcDir)
+from InputOutput import readPreproBinFile, writePreproTxtFile
+
+def getBinText(PreproObsFile, tmp_path):
+
+    # Function returning the text PREPRO OBS file of the columns of a
+    # binary file
+
+    Hdr, PreproData = readPreproBinFile(PreproObsFile)
+    Path = str(tmp_path / (os.path.basename(PreproObsFile) + ".dat"))
+    writePreproTxtFile(Path, PreproData)
+    with open(Path, 'rb') as f:
+        return f.read()
+
+@pytest.mark.parametrize("Cfg", ["PREPRO_FORMAT BOTH\n",
+    "PREPRO_FORMAT BIN\nPREPRO_BIN_COMPRESS ALL\n",
+    "PREPRO_FORMAT BIN\nPREPRO_BIN_COMPRESS SOD PRN C1\n"])
+def test_bin(ref, tmp_path, Cfg):
+
+    # The binary files hold the columns of the text files
+    Scen = createScen(tmp_path / "SCEN", Cfg)
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+
+    RefFiles = getPreproFiles(ref)
+    Files = getPreproFiles(Scen)
+    for Name, Data in RefFiles.items():
+        BinName = Name[:-len(".dat")] + ".bin"
+        assert BinName in Files
+        assert getBinText(os.path.join(Scen, "OUT", "PPVE", BinName), tmp_path) == Data
+        if "BOTH" in Cfg:
+            assert Files[Name] == Data
+        else:
+            assert Name not in Files
+
+def test_segments(ref, tmp_path):
+
+    # The segments of a day hold the rows of its outputs, in order
+    Scen = createScen(tmp_path / "SCEN", "PREPRO_FORMAT BOTH\nPREPRO_SEGMENTS 1 3600\n")
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+
+    Files = getPreproFiles(Scen)
+    for Name, Data in getPreproFiles(ref).items():
+        assert Files[Name] == Data
+
+        SegmentsDir = os.path.join(Scen, "OUT", "PPVE", "SEGMENTS", Name[:-len(".dat")])
+        with open(os.path.join(SegmentsDir, "MANIFEST.json")) as f:
+            Manifest = json.load(f)
+        assert Manifest["COMPLETE"]
+        assert Manifest["DURATION"] == 3600
+        assert [Segment["START"] for Segment in Manifest["SEGMENTS"]] == [0, 3600, 7200]
+
+        Lines = Data.decode().splitlines(True)
+        Rows = Lines[1:]
+        for Segment in Manifest["SEGMENTS"]:
+            assert sorted(Segment["FILES"]) == [Name[:-len(".dat")] + "_%02d00%s" % \
+                (Segment["START"] // 3600, Ext) for Ext in [".bin", ".dat"]]
+            SegmentPath = os.path.join(SegmentsDir, sorted(Segment["FILES"])[1])
+            with open(SegmentPath, 'rb') as f:
+                SegmentLines = f.read().decode().splitlines(True)
+            assert SegmentLines[0] == Lines[0]
+            assert SegmentLines[1:] == Rows[:Segment["NROWS"]]
+            assert len(SegmentLines) - 1 == Segment["NROWS"]
+            assert getBinText(SegmentPath[:-len(".dat")] + ".bin", tmp_path) == \
+                "".join(SegmentLines).encode()
+            for Line in SegmentLines[1:]:
+                assert Segment["START"] <= int(Line.split()[0]) < Segment["END"]
+            Rows = Rows[Segment["NROWS"]:]
+        assert Rows == []
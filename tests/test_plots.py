@@ -0,0 +1,102 @@
+########################################################################
+# PETRUS/SRC/tests/test_plots.py:
+# Preprocessing plots generated from memory, from the PREPRO OBS files,
+# in plot worker processes (PLOT_WORKERS) and in the background plot
+# process (PLOT_QUEUE)
+#
+#  Project:        PETRUS
+#  File:           test_plots.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import sys
+import subprocess
+import pytest
+from conftest import SrcDir, createScen
+
+# Petrus run with the plot settings given, instead of those of ConPlots
+PlotScript = """
+import sys, runpy
+sys.path.insert(0, %r)
+import ConPlots
+ConPlots.Conf.update(%r)
+sys.argv = [%r] + %r
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+# Preprocessing plots of a PREPRO OBS file read from disk
+FileScript = """
+import sys
+sys.path.insert(0, %r)
+sys.argv = ["Petrus.py", %r]
+from PreprocessingPlots import generatePreproPlots
+generatePreproPlots(%r)
+"""
+
+def runScript(Script, Path):
+
+    # Function running a python script. Returns the exit code and the
+    # output
+
+    with open(Path, 'w') as f:
+        f.write(Script)
+
+    Process = subprocess.run([sys.executable, Path], cwd=os.path.dirname(Path),
+        env=dict(os.environ, MPLBACKEND="Agg"), stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, universal_newlines=True, timeout=600)
+
+    return Process.returncode, Process.stdout
+
+def getFigures(Scen):
+
+    # Function returning the contents of the figures of a scenario, by
+    # path under the figures folder
+
+    FiguresDir = os.path.join(Scen, "OUT", "PPVE", "Figures")
+    Figures = {}
+    for Dir, Dirs, Names in os.walk(FiguresDir):
+        for Name in Names:
+            with open(os.path.join(Dir, Name), 'rb') as f:
+                Figures[os.path.relpath(os.path.join(Dir, Name), FiguresDir)] = f.read()
+
+    return Figures
+
+def test_figures(ref):
+
+    # Every plot of every receiver and day is generated
+    Figures = getFigures(ref)
+    assert len(Figures) == 12 * 4
+    for Name, Data in Figures.items():
+        assert Name.endswith(".png")
+        assert len(Data) > 0
+
+def test_figures_from_file(ref, tmp_path):
+
+    # The figures are also generated from the PREPRO OBS files, whose
+    # rounded values may move some points by a pixel
+    Scen = createScen(tmp_path / "SCEN")
+    PreproDir = os.path.join(ref, "OUT", "PPVE")
+    for Name in sorted(os.listdir(PreproDir)):
+        if Name.startswith("PREPRO_OBS_") and Name.endswith(".dat"):
+            Code, Output = runScript(FileScript % (SrcDir, Scen,
+                os.path.join(PreproDir, Name)), str(tmp_path / "plot.py"))
+            assert Code == 0, Output
+
+    assert sorted(getFigures(Scen).keys()) == sorted(getFigures(ref).keys())
+
+@pytest.mark.parametrize("PlotConf,Args", [({"PLOT_WORKERS": 2}, []),
+    ({"PLOT_QUEUE": 1}, []), ({"PLOT_WORKERS": 2, "PLOT_QUEUE": 1}, []),
+    ({"PLOT_WORKERS": 2}, ["--jobs", "2"])])
+def test_plot_processes(ref, tmp_path, PlotConf, Args):
+
+    # The figures generated in other processes are those generated in
+    # the Petrus process
+    Scen = createScen(tmp_path / "SCEN")
+    Code, Output = runScript(PlotScript % (SrcDir, PlotConf,
+        os.path.join(SrcDir, "Petrus.py"), [Scen] + Args), str(tmp_path / "run.py"))
+    assert Code == 0, Output
+    assert getFigures(Scen) == getFigures(ref)
@@ -0,0 +1,52 @@
+########################################################################
+# PETRUS/SRC/tests/test_prepro.py:
+# Preprocessing of observations rejected at the first epoch of the
+# satellites, within a day and carried over the days (CONTINUOUS)
+#
+#  Project:        PETRUS
+#  File:           test_prepro.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import pytest
+from conftest import createScen, getPreproFiles, runPetrus
+
+def clearFirstL2(ObsFile):
+
+    # Function setting to 0 the L2 phase of the first observation of
+    # every satellite in an OBS file
+
+    with open(ObsFile) as f:
+        Lines = f.readlines()
+
+    Seen = set()
+    for i, Line in enumerate(Lines):
+        Fields = Line.split()
+        if Line.startswith('#') or Fields[4] in Seen:
+            continue
+        Seen.add(Fields[4])
+        Lines[i] = " ".join(Fields[:10] + ["0.000"] + Fields[11:]) + "\n"
+
+    with open(ObsFile, 'w') as f:
+        f.writelines(Lines)
+
+@pytest.mark.parametrize("Cfg", ["", "CONTINUOUS 1\n", "PIPELINE 1\n"])
+def test_first_l2_missing(tmp_path, Cfg):
+
+    # Satellites without L2 phase at their first epoch are processed
+    Scen = createScen(tmp_path / "SCEN", Cfg)
+    ObsDir = os.path.join(Scen, "INP", "OBS")
+    for Name in os.listdir(ObsDir):
+        clearFirstL2(os.path.join(ObsDir, Name))
+
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+
+    Files = getPreproFiles(Scen)
+    assert len(Files) == 4
+    for Name, Data in Files.items():
+        assert len(Data.splitlines()) > 1, Name
@@ -0,0 +1,108 @@
+########################################################################
+# PETRUS/SRC/tests/test_readers.py:
+# OBS readers (OBS_READER), epochs index and time window (OBS_INDEX,
+# OBS_WINDOW), cache of parsed OBS files (OBS_CACHE) and compressed
+# OBS inputs, against the baseline LINE reader
+#
+#  Project:        PETRUS
+#  File:           test_readers.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import gzip
+import shutil
+import pytest
+from conftest import createScen, getPreproFiles, runPetrus
+
+@pytest.mark.parametrize("Cfg", ["OBS_READER BULK\n", "OBS_READER MMAP\n",
+    "OBS_READER BULK\nOBS_INDEX 1\n", "OBS_READER MMAP\nOBS_INDEX 1\n",
+    "OBS_READER MMAP\nOBS_SATS G\nOBS_COLUMNS SOD\n"])
+def test_reader(ref, tmp_path, Cfg):
+
+    # Every reader gives the outputs of the LINE reader
+    Scen = createScen(tmp_path / "SCEN", Cfg)
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+    assert getPreproFiles(Scen) == getPreproFiles(ref)
+
+def test_mask_filter(tmp_path):
+
+    # The satellites below the mask angle are left out by every reader
+    Filter = "OBS_MASK_FILTER 1\n"
+    LineScen = createScen(tmp_path / "LINE", Filter + "OBS_READER LINE\n")
+    Code, Output = runPetrus(LineScen)
+    assert Code == 0, Output
+
+    Files = getPreproFiles(LineScen)
+    assert len(Files) == 4
+    for Name, Data in Files.items():
+        Mask = 5 if "TLSA" in Name else 10
+        Elevs = [float(Line.split()[4]) for Line in Data.decode().splitlines()[1:]]
+        assert Elevs, Name
+        assert min(Elevs) >= Mask, Name
+
+    for Cfg in ["OBS_READER BULK\n", "OBS_READER MMAP\n"]:
+        Scen = createScen(tmp_path / Cfg.split()[1], Filter + Cfg)
+        Code, Output = runPetrus(Scen)
+        assert Code == 0, Output
+        assert getPreproFiles(Scen) == Files, Cfg
+
+def test_window(tmp_path):
+
+    # The epochs of the time window are read by every reader, with and
+    # without the epochs index
+    Window = "OBS_WINDOW 3600 7199\n"
+    LineScen = createScen(tmp_path / "LINE", Window + "OBS_READER LINE\n")
+    Code, Output = runPetrus(LineScen)
+    assert Code == 0, Output
+
+    Files = getPreproFiles(LineScen)
+    assert len(Files) == 4
+    for Name, Data in Files.items():
+        Sods = [int(Line.split()[0]) for Line in Data.decode().splitlines()[1:]]
+        assert Sods, Name
+        assert min(Sods) >= 3600 and max(Sods) <= 7199, Name
+
+    for Cfg in ["OBS_READER BULK\nOBS_INDEX 1\n", "OBS_READER MMAP\nOBS_INDEX 1\n"]:
+        Scen = createScen(tmp_path / Cfg.split()[1], Window + Cfg)
+        Code, Output = runPetrus(Scen)
+        assert Code == 0, Output
+        assert getPreproFiles(Scen) == Files, Cfg
+
+def test_cache(ref, tmp_path):
+
+    # The OBS files are parsed and cached by the first run, and read
+    # from the cache by the next one
+    Scen = createScen(tmp_path / "SCEN", "OBS_CACHE 1\n")
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+    assert getPreproFiles(Scen) == getPreproFiles(ref)
+
+    CacheDir = os.path.join(Scen, "CACHE")
+    assert len(os.listdir(CacheDir)) > 0
+
+    shutil.rmtree(os.path.join(Scen, "OUT", "PPVE"))
+    os.makedirs(os.path.join(Scen, "OUT", "PPVE"))
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+    assert getPreproFiles(Scen) == getPreproFiles(ref)
+
+@pytest.mark.parametrize("Reader", ["LINE", "BULK", "MMAP"])
+def test_compressed(ref, tmp_path, Reader):
+
+    # Gzip compressed OBS files give the outputs of the plain files
+    Scen = createScen(tmp_path / "SCEN", "OBS_READER %s\n" % Reader)
+    ObsDir = os.path.join(Scen, "INP", "OBS")
+    for Name in os.listdir(ObsDir):
+        with open(os.path.join(ObsDir, Name), 'rb') as f:
+            with gzip.open(os.path.join(ObsDir, Name + ".gz"), 'wb') as g:
+                shutil.copyfileobj(f, g)
+        os.remove(os.path.join(ObsDir, Name))
+
+    Code, Output = runPetrus(Scen)
+    assert Code == 0, Output
+    assert getPreproFiles(Scen) == getPreproFiles(ref)
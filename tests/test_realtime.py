@@ -0,0 +1,79 @@
+########################################################################
+# PETRUS/SRC/tests/test_realtime.py:
+# Real-time modes following growing OBS files (Petrus.py --tail) and
+# receiving OBS streams (Petrus.py --stream), against the outputs of
+# the baseline run
+#
+#  Project:        PETRUS
+#  File:           test_realtime.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import time
+import shutil
+from conftest import createScen, getPreproFiles, runPetrus, startPetrus, \
+    waitPath, sendObsFile
+
+def getRcvrFiles(Scen, Rcvr):
+
+    # Function returning the PREPRO OBS files of a receiver
+
+    return dict([(Name, Data) for Name, Data in getPreproFiles(Scen).items() \
+        if "_%s_" % Rcvr in Name])
+
+def test_tail(ref, tmp_path):
+
+    # The OBS files written while they are followed give the outputs of
+    # the complete files
+    Scen = createScen(tmp_path / "SCEN", "TAIL_POLL 0.05\n")
+    ObsDir = os.path.join(Scen, "INP", "OBS")
+    SrcObsDir = str(tmp_path / "OBS")
+    shutil.move(ObsDir, SrcObsDir)
+    os.makedirs(ObsDir)
+
+    Process = startPetrus(Scen, "--tail", "TLSA")
+    for Doy in [1, 2]:
+        Name = "OBS_TLSA_Y21D%03d.dat" % Doy
+        with open(os.path.join(SrcObsDir, Name)) as f:
+            Lines = f.readlines()
+        with open(os.path.join(ObsDir, Name), 'w') as f:
+            for Ini in range(0, len(Lines), 1000):
+                f.writelines(Lines[Ini:Ini + 1000])
+                f.flush()
+                time.sleep(0.05)
+
+    # The second day ends when the OBS file of the next day appears
+    with open(os.path.join(ObsDir, "OBS_TLSA_Y21D003.dat"), 'w') as f:
+        f.write(Lines[0])
+
+    Output = Process.communicate(timeout=600)[0]
+    assert Process.returncode == 0, Output
+    assert getPreproFiles(Scen) == getRcvrFiles(ref, "TLSA")
+
+def test_stream(ref, tmp_path):
+
+    # The OBS lines received over a stream give the outputs of the
+    # OBS files
+    Scen = createScen(tmp_path / "SCEN", "STREAM_IDLE 5\n")
+    Address = str(tmp_path / "TLSA.sock")
+    Process = startPetrus(Scen, "--stream", "TLSA", Address)
+    waitPath(Address, Process)
+    for Doy in [1, 2]:
+        Sender = sendObsFile(Address, os.path.join(Scen, "INP", "OBS",
+            "OBS_TLSA_Y21D%03d.dat" % Doy))
+        assert Sender.returncode == 0, Sender.stdout
+
+    Output = Process.communicate(timeout=600)[0]
+    assert Process.returncode == 0, Output
+    assert getPreproFiles(Scen) == getRcvrFiles(ref, "TLSA")
+
+def test_stream_failed(scen, tmp_path):
+
+    # A stream that cannot be opened fails the run
+    Address = str(tmp_path / "MISSING" / "TLSA.sock")
+    Code, Output = runPetrus(scen, "--stream", "TLSA", Address)
+    assert Code != 0, Output
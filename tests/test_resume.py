@@ -0,0 +1,73 @@
+########################################################################
+# PETRUS/SRC/tests/test_resume.py:
+# Checkpoints of the Preprocessing of a day (CHECKPOINT) and resume of
+# an interrupted run (Petrus.py --resume)
+#
+#  Project:        PETRUS
+#  File:           test_resume.py
+#
+#  Author: GNSS Academy
+#  Copyright 2021 GNSS Academy
+#
+########################################################################
+
+import os
+import sys
+import subprocess
+from conftest import SrcDir, createScen, getPreproFiles, runPetrus
+
+# Checkpoint every 50 epochs, text and binary outputs
+ResumeCfg = "CHECKPOINT 50\nPREPRO_FORMAT BOTH\n"
+
+# Petrus stopped by an error in the middle of the first day, after
+# writing StopEpochs epochs
+StopScript = """
+import sys, runpy
+sys.path.insert(0, %r)
+import InputOutput
+
+StopEpochs = %d
+generatePreproOutputs = InputOutput.generatePreproOutputs
+
+def stopPreproOutputs(PreproOut, PreproObsInfo):
+    global StopEpochs
+    if StopEpochs == 0:
+        raise RuntimeError("Stopped")
+    StopEpochs = StopEpochs - 1
+    generatePreproOutputs(PreproOut, PreproObsInfo)
+
+InputOutput.generatePreproOutputs = stopPreproOutputs
+sys.argv = [%r, %r]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+def test_resume(tmp_path):
+
+    # A day resumed from its last checkpoint gives the outputs of the
+    # run that was not interrupted
+    Scen = createScen(tmp_path / "SCEN", ResumeCfg)
+    Script = os.path.join(str(tmp_path), "stop.py")
+    with open(Script, 'w') as f:
+        f.write(StopScript % (SrcDir, 175, os.path.join(SrcDir, "Petrus.py"), Scen))
+
+    Process = subprocess.run([sys.executable, Script], cwd=str(tmp_path),
+        env=dict(os.environ, MPLBACKEND="Agg"), stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, universal_newlines=True, timeout=600)
+    assert Process.returncode != 0
+    assert "RuntimeError: Stopped" in Process.stdout
+
+    # Stopped in the first day, after its third checkpoint
+    PreproDir = os.path.join(Scen, "OUT", "PPVE")
+    assert sorted(os.listdir(PreproDir)) == ["PREPRO_OBS_TLSA_Y21D001.chk",
+        "PREPRO_OBS_TLSA_Y21D001.dat", "PREPRO_OBS_TLSA_Y21D001.jrn"]
+
+    Code, Output = runPetrus(Scen, "--resume")
+    assert Code == 0, Output
+    assert "Resuming from checkpoint at SoD 4470" in Output
+
+    FullScen = createScen(tmp_path / "FULL", ResumeCfg)
+    assert runPetrus(FullScen)[0] == 0
+
+    Files = getPreproFiles(Scen)
+    assert len(Files) == 8
+    assert Files == getPreproFiles(FullScen)